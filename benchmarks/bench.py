@@ -0,0 +1,236 @@
+# benchmarks/bench.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from main import ShippingKnowledgeGraph
+from src.memory_backend import MemoryGraph
+from benchmarks.synthetic import FILE_NAMES, generate
+
+try:
+    import resource
+except ImportError:  # Windows 上没有 resource 模块，不报告进程峰值内存
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程到目前为止的峰值常驻内存（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class StageResult:
+    name: str
+    rows: Optional[int]
+    seconds: float
+    peak_rss_mb: Optional[float]
+    traced_peak_mb: Optional[float] = None  # 仅 trace_memory=True 时：该阶段内 Python 分配的峰值
+
+    @property
+    def throughput(self) -> Optional[float]:
+        if self.rows is None or self.seconds <= 0:
+            return None
+        return self.rows / self.seconds
+
+
+@dataclass
+class LatencyResult:
+    name: str
+    samples_ms: List[float] = field(repr=False)
+
+    def summary(self) -> Dict[str, float]:
+        samples = np.asarray(self.samples_ms)
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        total = samples.sum() / 1000
+        return {
+            "count": len(samples),
+            "mean_ms": float(samples.mean()),
+            "p50_ms": float(p50),
+            "p90_ms": float(p90),
+            "p99_ms": float(p99),
+            "max_ms": float(samples.max()),
+            "qps": len(samples) / total if total > 0 else float("inf"),
+        }
+
+
+class Benchmark:
+    """
+    记录各阶段耗时、吞吐量和内存，以及单次查询的延迟分布
+
+    quiet=True 时屏蔽被测代码自身的打印输出，避免 I/O 干扰计时。
+    """
+
+    def __init__(self, quiet=True, trace_memory=False):
+        self.quiet = quiet
+        self.trace_memory = trace_memory
+        self.stages: List[StageResult] = []
+        self.latencies: List[LatencyResult] = []
+
+    def _silenced(self):
+        return contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+
+    def stage(self, name, run: Callable[[], Any], rows: Optional[int] = None):
+        """执行一个阶段；run 返回整数且未给出 rows 时以返回值作为行数"""
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with self._silenced():
+            result = run()
+        seconds = time.perf_counter() - start
+        traced = None
+        if self.trace_memory:
+            traced = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        if rows is None and isinstance(result, int):
+            rows = result
+        self.stages.append(StageResult(name, rows, seconds, peak_rss_mb(), traced))
+        return result
+
+    def latency(self, name, run: Callable, calls: Iterable[tuple]):
+        """对每组参数调用一次 run(*args)，记录每次调用的延迟"""
+        samples = []
+        with self._silenced():
+            for args in calls:
+                start = time.perf_counter()
+                run(*args)
+                samples.append((time.perf_counter() - start) * 1000)
+        if samples:
+            self.latencies.append(LatencyResult(name, samples))
+        return samples
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "stages": [dict(asdict(stage), throughput=stage.throughput) for stage in self.stages],
+            "latencies": {result.name: result.summary() for result in self.latencies},
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def print_report(self):
+        traced_header = f"{'分配峰值(MB)':>14}" if self.trace_memory else ""
+        print(f"{'阶段':<24}{'行数':>12}{'耗时(秒)':>12}{'行/秒':>14}{'峰值RSS(MB)':>14}{traced_header}")
+        for stage in self.stages:
+            rows = "-" if stage.rows is None else f"{stage.rows}"
+            rate = "-" if stage.throughput is None else f"{stage.throughput:,.0f}"
+            rss = "-" if stage.peak_rss_mb is None else f"{stage.peak_rss_mb:,.1f}"
+            traced = f"{stage.traced_peak_mb:>14,.1f}" if stage.traced_peak_mb is not None else ""
+            print(f"{stage.name:<24}{rows:>12}{stage.seconds:>12.3f}{rate:>14}{rss:>14}{traced}")
+        if self.latencies:
+            print(f"\n{'查询':<24}{'次数':>8}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}"
+                  f"{'max(ms)':>10}{'QPS':>12}")
+            for result in self.latencies:
+                s = result.summary()
+                print(f"{result.name:<24}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p90_ms']:>10.3f}"
+                      f"{s['p99_ms']:>10.3f}{s['max_ms']:>10.3f}{s['qps']:>12,.0f}")
+
+
+def run_benchmark(kg, files: Dict[str, str], bench: Benchmark, queries: int = 1000, seed: int = 0):
+    """
+    在给定的图对象上依次计时：建模式、各数据源导入、关系构建、航线网络加载、
+    航线/备选航线/可停靠查询延迟，以及一次无变化的增量同步
+    """
+    rng = random.Random(seed)
+    bench.stage("clear_database", kg.clear_database)
+    bench.stage("ensure_schema", kg.ensure_schema)
+    loaders = [
+        ("companies", kg.import_companies),
+        ("ports", kg.import_ports),
+        ("cargo", kg.import_cargo),
+        ("ships", kg.import_ships),
+        ("routes", kg.import_routes),
+        ("visits", kg.import_ship_port_visits),
+    ]
+    for name, loader in loaders:
+        if name in files:
+            bench.stage(f"import_{name}", lambda: loader(files[name]))
+    if "companies" in files and "ships" in files:
+        bench.stage("owns", lambda: kg.create_company_ship_relationships(files["ships"], files["companies"])[0])
+
+    graph = bench.stage("load_route_graph", kg.load_route_graph)
+    bench.stage("load_docking_index", lambda: kg.docking_index)
+    codes = list(graph.codes)
+    imos = list(kg.docking_index.ship_ids)
+    if imos:
+        sample = rng.sample(imos, min(len(imos), 100))
+        bench.stage("materialize_can_dock", lambda: kg.materialize_can_dock(kg.docking_index.pairs(sample)))
+
+    if len(codes) >= 2:
+        pairs = [tuple(rng.sample(codes, 2)) for _ in range(queries)]
+        bench.latency("find_optimal_route", kg.find_optimal_route, pairs)
+        bench.latency("find_alternative_routes", lambda a, b: kg.find_alternative_routes(a, b, k=3),
+                      pairs[:max(1, queries // 10)])
+        bench.stage("find_routes_batch", lambda: len(kg.find_routes(pairs)))
+    if imos:
+        bench.latency("ports_for_ship", kg.ports_for_ship, [(rng.choice(imos),) for _ in range(queries)])
+        bench.latency("ports_for_ship_server", lambda imo: kg.ports_for_ship(imo, server_side=True),
+                      [(rng.choice(imos),) for _ in range(max(1, queries // 10))])
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        state_file = os.path.join(state_dir, "sync_state.json")
+        bench.stage("sync_all_initial",
+                    lambda: sum(r["upserted"] for r in kg.sync_all(files, state_file).values()))
+        bench.stage("sync_all_unchanged",
+                    lambda: sum(r["unchanged"] for r in kg.sync_all(files, state_file).values()))
+    return bench
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入与查询性能基准测试")
+    parser.add_argument("--rows", type=int, default=10000, help="合成数据规模，10**3 ~ 10**7")
+    parser.add_argument("--data", help="已有的数据目录（结构同 data/），给出时不生成合成数据")
+    parser.add_argument("--out", help="合成数据输出目录；不给出时写入临时目录，测试结束后删除")
+    parser.add_argument("--queries", type=int, default=1000, help="每类查询的次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--neo4j", action="store_true", help="使用 config.settings 中的 Neo4j，而不是内存后端")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--trace-memory", action="store_true", help="用 tracemalloc 记录各阶段的分配峰值（较慢）")
+    parser.add_argument("--verbose", action="store_true", help="保留被测代码的输出")
+    parser.add_argument("--output", help="把结果写入该 JSON 文件")
+    args = parser.parse_args(argv)
+
+    bench = Benchmark(quiet=not args.verbose, trace_memory=args.trace_memory)
+    with contextlib.ExitStack() as stack:
+        if args.data:
+            files = {name: os.path.join(args.data, file_name) for name, file_name in FILE_NAMES.items()
+                     if os.path.exists(os.path.join(args.data, file_name))}
+        else:
+            # 合成数据默认不落在仓库目录中
+            out = args.out or stack.enter_context(tempfile.TemporaryDirectory(prefix="kg-bench-"))
+            files = bench.stage("generate", lambda: generate(out, rows=args.rows, seed=args.seed))
+
+        if args.neo4j:
+            from config.settings import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+            kg = ShippingKnowledgeGraph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, batch_size=args.batch_size)
+        else:
+            kg = ShippingKnowledgeGraph(None, None, None, batch_size=args.batch_size, backend=MemoryGraph())
+        try:
+            run_benchmark(kg, files, bench, queries=args.queries, seed=args.seed)
+        finally:
+            kg.close()
+
+    bench.print_report()
+    if args.output:
+        report = bench.report()
+        report["config"] = vars(args)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return bench
+
+
+if __name__ == "__main__":
+    # 在项目根目录运行：python -m benchmarks.bench --rows 100000 --output bench.json
+    main()
@@ -0,0 +1,251 @@
+# benchmarks/synthetic.py
+import os
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.adapt全球航线数据 import calculate_ratings
+
+# 与 data/ 中的文件同名、同列
+FILE_NAMES = {
+    "companies": "航运公司数据.CSV",
+    "ships": "船舶信息.CSV",
+    "ports": "全球港口信息.CSV",
+    "routes": "全球航线数据_rated.CSV",
+    "cargo": "全球货物数据.CSV",
+    "visits": os.path.join("relationships", "船舶港口挂靠记录.CSV"),
+}
+
+# 船型: (占比, 载重吨对数正态中位数, sigma, 最小值, 最大值, 设计航速中位数)
+SHIP_TYPES = {
+    "集装箱船": (0.30, 60000, 0.70, 8000, 240000, 22.0),
+    "油轮": (0.22, 110000, 0.75, 5000, 320000, 15.0),
+    "散货船": (0.30, 75000, 0.60, 10000, 400000, 14.0),
+    "液化气船": (0.08, 60000, 0.50, 5000, 100000, 18.0),
+    "化学品船": (0.10, 25000, 0.55, 3000, 55000, 14.5),
+}
+
+CARGO_TYPES = {
+    "危险货物": ("易燃液体", "腐蚀品", "压缩气体", "锂电池"),
+    "冷藏货物": ("冷冻肉类", "水果", "乳制品", "疫苗"),
+    "液体货物": ("原油", "成品油", "植物油", "液态化学品"),
+    "集装箱货": ("日用品", "电子产品", "服装", "家具"),
+    "固体散货": ("铁矿石", "煤炭", "粮食", "铝土矿"),
+    "特殊货物": ("风电叶片", "大型设备", "游艇", "钢结构"),
+}
+
+HEADQUARTERS = ("中国上海", "中国香港", "新加坡", "丹麦哥本哈根", "瑞士日内瓦", "法国马赛",
+                "德国汉堡", "日本东京", "韩国首尔", "中国台北", "希腊雅典", "美国纽约")
+
+_NAME_PREFIXES = ("M/V", "M/T", "M/S")
+_NAME_WORDS = ("Ocean", "Pacific", "Atlantic", "Star", "Pioneer", "Glory", "Fortune", "Horizon",
+               "Harmony", "Spirit", "Dragon", "Phoenix", "Aurora", "Voyager", "Trader", "Majesty")
+
+
+@dataclass(frozen=True)
+class Scale:
+    """各数据源的行数"""
+    companies: int
+    ships: int
+    ports: int
+    routes: int
+    visits: int
+    cargo: int
+
+    @classmethod
+    def from_rows(cls, rows: int) -> "Scale":
+        """
+        由总规模推导各数据源行数，比例接近真实航运数据：
+        挂靠记录最多，船舶约为其 1/20，港口数随规模开方增长，每个港口平均 8 条出航线
+        """
+        if rows < 100:
+            raise ValueError(f"规模至少为 100 行: {rows}")
+        ships = max(20, rows // 20)
+        ports = max(20, int(np.sqrt(rows) * 2))
+        return cls(
+            companies=max(5, ships // 25),
+            ships=ships,
+            ports=ports,
+            routes=ports * 8,
+            visits=rows,
+            cargo=max(10, rows // 2),
+        )
+
+    def total(self) -> int:
+        return sum(asdict(self).values())
+
+
+def _imo_numbers(rng, count) -> np.ndarray:
+    """带正确校验位的 7 位 IMO 编号，互不重复"""
+    if count > 900000:
+        raise ValueError(f"IMO 编号最多 900000 个: {count}")
+    base = rng.choice(np.arange(100000, 1000000), size=count, replace=False)
+    digits = (base[:, None] // (10 ** np.arange(5, -1, -1))) % 10
+    check = (digits * np.arange(7, 1, -1)).sum(axis=1) % 10
+    return base * 10 + check
+
+
+def _port_codes(count) -> np.ndarray:
+    """五位码：两位国家 + 三位地点，按编号的 26 进制展开保证唯一"""
+    if count > 26 ** 5:
+        raise ValueError(f"五位码最多 {26 ** 5} 个: {count}")
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return np.array(["".join(letters[(i // 26 ** p) % 26] for p in range(4, -1, -1)) for i in range(count)])
+
+
+def _chunks(total, chunk_size) -> Iterator[slice]:
+    for start in range(0, total, chunk_size):
+        yield slice(start, min(start + chunk_size, total))
+
+
+def companies_frame(rng, scale: Scale) -> pd.DataFrame:
+    index = np.arange(1, scale.companies + 1)
+    return pd.DataFrame({
+        "公司注册码": [f"CO_{i:06d}" for i in index],
+        "公司名称": [f"合成航运公司{i}" for i in index],
+        "总部所在地": rng.choice(HEADQUARTERS, size=scale.companies),
+    })
+
+
+def ships_frame(rng, scale: Scale, company_codes) -> pd.DataFrame:
+    names = list(SHIP_TYPES)
+    shares = np.array([SHIP_TYPES[n][0] for n in names])
+    types = rng.choice(len(names), size=scale.ships, p=shares / shares.sum())
+    median, sigma, low, high, speed = (np.array([SHIP_TYPES[n][k] for n in names])[types] for k in range(1, 6))
+    # 每种船型的载重吨呈对数正态分布，并截断在该船型的合理范围内
+    dwt = np.clip(median * np.exp(rng.normal(0, sigma)), low, high).round(-2).astype(np.int64)
+    gross_tonnage = (dwt * rng.uniform(0.45, 0.9, size=scale.ships)).round(-2).astype(np.int64)
+    power = (dwt ** 0.6 * rng.uniform(40, 70, size=scale.ships)).round(-2).astype(np.int64)
+    ship_index = np.arange(scale.ships)
+    return pd.DataFrame({
+        "IMO编号": _imo_numbers(rng, scale.ships),
+        "船舶名称": [f"{_NAME_PREFIXES[i % 3]} {_NAME_WORDS[i % 16]} {_NAME_WORDS[(i // 16) % 16]} {i}"
+                 for i in ship_index],
+        "船舶类型": np.array(names)[types],
+        "设计航速(节)": np.round(speed * rng.uniform(0.85, 1.15, size=scale.ships), 1),
+        "主机功率(kW)": power,
+        "总吨位": gross_tonnage,
+        "载重吨位(DWT)": dwt,
+        "所属公司ID": rng.choice(company_codes, size=scale.ships),
+    })
+
+
+def ports_frame(rng, scale: Scale) -> pd.DataFrame:
+    codes = _port_codes(scale.ports)
+    # 大多数港口只能接纳中型船舶，少数枢纽港能接纳 VLCC/Valemax
+    max_dwt = np.clip(150000 * np.exp(rng.normal(0, 0.6, size=scale.ports)), 20000, 500000)
+    return pd.DataFrame({
+        "五位码": codes,
+        "港口名称": [f"{code}港" for code in codes],
+        "拥挤程度(1-10)": rng.integers(1, 11, size=scale.ports),
+        "最大靠泊能力(DWT)": max_dwt.round(-3).astype(np.int64),
+    })
+
+
+def routes_frame(rng, scale: Scale, port_codes) -> pd.DataFrame:
+    n = len(port_codes)
+    # 港口随机分布在球面上，航线距离为大圆距离乘以绕航系数
+    lat = np.degrees(np.arcsin(rng.uniform(-0.9, 0.9, size=n)))
+    lon = rng.uniform(-180, 180, size=n)
+    source = rng.integers(0, n, size=scale.routes)
+    target = (source + rng.integers(1, n, size=scale.routes)) % n
+    phi1, phi2 = np.radians(lat[source]), np.radians(lat[target])
+    dlon = np.radians(lon[target] - lon[source])
+    angle = np.arccos(np.clip(np.sin(phi1) * np.sin(phi2) + np.cos(phi1) * np.cos(phi2) * np.cos(dlon), -1, 1))
+    distance = np.maximum(50, angle * 3440.065 * rng.uniform(1.05, 1.3, size=scale.routes)).astype(np.int64)
+    weather = rng.integers(1, 11, size=scale.routes)
+    ratings = calculate_ratings(distance, weather)["balanced"]
+    names = np.char.add(np.char.add(np.char.add(port_codes[source].astype(str), "港-"),
+                                    port_codes[target].astype(str)), "港航线")
+    frame = pd.DataFrame({
+        "航线编号": "",
+        "航线名称": names,
+        "起始港口五位码": port_codes[source],
+        "目的港口五位码": port_codes[target],
+        "航线距离(海里)": distance,
+        "航线天气影响评分(1-10)": weather,
+        "评分": ratings.to_numpy(),
+    })
+    # 同一对港口只保留一条航线，航线名称因此唯一
+    frame = frame.drop_duplicates(["起始港口五位码", "目的港口五位码"], ignore_index=True)
+    frame["航线编号"] = [f"R{i:07d}" for i in range(1, len(frame) + 1)]
+    return frame
+
+
+def visits_frame(rng, count, imos, port_codes, congestion) -> pd.DataFrame:
+    # 越拥挤的港口挂靠越多
+    weights = congestion / congestion.sum()
+    arrival = (np.datetime64("2024-01-01T00:00") +
+               rng.integers(0, 365 * 24, size=count).astype("timedelta64[h]"))
+    duration = np.clip(rng.gamma(2.0, 18.0, size=count), 2, 240).astype(np.int64)
+    departure = arrival + duration.astype("timedelta64[h]")
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return pd.DataFrame({
+        "船舶编号": rng.choice(imos, size=count),
+        "港口五位码": rng.choice(port_codes, size=count, p=weights),
+        "到达时间": pd.Series(arrival).dt.strftime(fmt),
+        "离开时间": pd.Series(departure).dt.strftime(fmt),
+        "停靠时长(小时)": duration,
+    })
+
+
+def cargo_frame(rng, start, count) -> pd.DataFrame:
+    types = list(CARGO_TYPES)
+    type_index = rng.integers(0, len(types), size=count)
+    name_index = rng.integers(0, 4, size=count)
+    return pd.DataFrame({
+        "货物编号": [f"C{i:08d}" for i in range(start + 1, start + count + 1)],
+        "货物名称": [CARGO_TYPES[types[t]][k] for t, k in zip(type_index, name_index)],
+        "货物类型": np.array(types)[type_index],
+        "重量(吨)": np.clip(40000 * np.exp(rng.normal(0, 0.9, size=count)), 100, 300000).astype(np.int64),
+    })
+
+
+def _write(frame, path, first, encoding):
+    frame.to_csv(path, mode="w" if first else "a", header=first, index=False,
+                 encoding=encoding if first else "utf-8")
+
+
+def generate(out_dir, rows: Optional[int] = None, scale: Optional[Scale] = None, seed: int = 0,
+             chunk_size: int = 1000000) -> Dict[str, str]:
+    """
+    生成一套合成航运数据，列与 data/ 中的CSV完全相同，可直接交给 import_all
+
+    参数:
+    out_dir: 输出目录，结构与 data/ 相同
+    rows: 总规模（约等于挂靠记录数），10**3 ~ 10**7；也可直接给出 scale
+    seed: 随机种子，相同参数生成相同数据
+    chunk_size: 挂靠记录和货物按块生成、追加写入，内存占用与总规模无关
+
+    返回:
+    数据源名 -> 文件路径
+    """
+    if scale is None:
+        if rows is None:
+            raise ValueError("需要 rows 或 scale")
+        scale = Scale.from_rows(rows)
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(out_dir, "relationships"), exist_ok=True)
+    files = {name: os.path.join(out_dir, file_name) for name, file_name in FILE_NAMES.items()}
+
+    companies = companies_frame(rng, scale)
+    _write(companies, files["companies"], True, "utf-8")
+    ships = ships_frame(rng, scale, companies["公司注册码"].to_numpy())
+    _write(ships, files["ships"], True, "utf-8")
+    ports = ports_frame(rng, scale)
+    _write(ports, files["ports"], True, "utf-8")
+    # 已评分的航线文件和原数据一样带 BOM
+    _write(routes_frame(rng, scale, ports["五位码"].to_numpy()), files["routes"], True, "utf-8-sig")
+
+    imos, port_codes = ships["IMO编号"].to_numpy(), ports["五位码"].to_numpy()
+    congestion = ports["拥挤程度(1-10)"].to_numpy(dtype=np.float64)
+    for i, part in enumerate(_chunks(scale.visits, chunk_size)):
+        _write(visits_frame(rng, part.stop - part.start, imos, port_codes, congestion),
+               files["visits"], i == 0, "utf-8")
+    for i, part in enumerate(_chunks(scale.cargo, chunk_size)):
+        _write(cargo_frame(rng, part.start, part.stop - part.start), files["cargo"], i == 0, "utf-8")
+
+    print(f"已生成合成数据 {scale.total()} 行 -> {out_dir}: {asdict(scale)}")
+    return files
@@ -4,4 +4,12 @@ import os
 # Neo4j配置
 NEO4J_URI = os.getenv("NEO4J_URI", "0.0.0.0:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "2003.guo")  # 替换为你的密码
\ No newline at end of file
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "2003.guo")  # 替换为你的密码
+
+# 连接池配置：所有组件共享同一个 driver，以下参数作用于这个共享连接池
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))  # 获取连接的最长等待秒数
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+NEO4J_KEEP_ALIVE = os.getenv("NEO4J_KEEP_ALIVE", "true").lower() == "true"
+# execute_write 遇到死锁等瞬时错误时自动重试的最长秒数，超时后抛出异常
+NEO4J_MAX_TRANSACTION_RETRY_TIME = float(os.getenv("NEO4J_MAX_TRANSACTION_RETRY_TIME", "30"))
\ No newline at end of file
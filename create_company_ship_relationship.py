@@ -1,64 +1,69 @@
 from neo4j import GraphDatabase
-import pandas as pd
-import os
+from src import sources
+from src.sources import iter_chunks
+from src.staging import read_batches
+
+# 一个事务内合并一批公司-船舶关系，返回两端节点都存在、实际合并的行数
+OWNS_QUERY = """
+UNWIND $rows AS row
+MATCH (c:Company {code: row.company_id})
+MATCH (s:Ship {imo: row.imo})
+MERGE (c)-[:OWNS]->(s)
+RETURN count(*) AS merged
+"""
 
 class RelationshipCreator:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri=None, user=None, password=None, driver=None):
+        # 优先复用注入的共享 driver（由调用方关闭），否则自己创建一个
+        self._owns_driver = driver is None
+        self.driver = driver if driver is not None else GraphDatabase.driver(uri, auth=(user, password))
     
     def close(self):
-        self.driver.close()
+        if self._owns_driver:
+            self.driver.close()
     
-    def create_company_ship_relationship(self, ships_file, companies_file):
-        """创建公司与船舶的关系"""
-        # 读取船舶和公司数据
-        ships_df = pd.read_csv(ships_file)
-        companies_df = pd.read_csv(companies_file)
+    def create_company_ship_relationship(self, ships_file, companies_file, staging=None, batch_size=10000):
+        """
+        创建公司与船舶的关系；传入 staging（src.staging.StagingCache）时读取已暂存的数据，不重新解析CSV
         
-        # 检查数据
-        if '所属公司ID' not in ships_df.columns:
-            raise ValueError("船舶数据中缺少'所属公司ID'列")
-        if '公司注册码' not in companies_df.columns:
-            raise ValueError("公司数据中缺少'公司注册码'列")
+        ShippingKnowledgeGraph 导入船舶时已同时合并 OWNS，这里只用于单独补建关系。
+        每 batch_size 行通过 UNWIND 在一个写事务内提交。
+        """
+        # 读取船舶和公司数据（缺少列时 SourceSpec 会抛出 ValueError）
+        ships = [row for batch in read_batches(sources.SHIPS, ships_file, batch_size, staging) for row in batch]
         
         # 获取所有公司注册码
-        company_codes = set(companies_df['公司注册码'])
+        company_codes = {row['code'] for batch in read_batches(sources.COMPANIES, companies_file, batch_size, staging)
+                         for row in batch}
         print(f"已加载 {len(company_codes)} 家公司的注册码")
         
-        # 建立关系
+        # 统计成功和失败的数量
+        success_count = 0
+        failure_count = 0
+        rows = []
+        for ship in ships:
+            # 检查公司ID是否存在
+            if ship['company_id'] not in company_codes:
+                print(f"警告：公司ID {ship['company_id']} 不存在，无法为船舶 {ship['imo']} 建立关系")
+                failure_count += 1
+                continue
+            rows.append({"company_id": ship['company_id'], "imo": ship['imo']})
+        
+        # 按批建立关系
         with self.driver.session() as session:
-            # 统计成功和失败的数量
-            success_count = 0
-            failure_count = 0
-            
-            for _, ship in ships_df.iterrows():
-                ship_imo = ship['IMO编号']
-                company_id = ship['所属公司ID']
-                
-                # 检查公司ID是否存在
-                if company_id not in company_codes:
-                    print(f"警告：公司ID {company_id} 不存在，无法为船舶 {ship_imo} 建立关系")
-                    failure_count += 1
-                    continue
-                
-                # 创建关系
-                query = """
-                MATCH (c:Company {code: $company_id})
-                MATCH (s:Ship {imo: $ship_imo})
-                MERGE (c)-[:OWNS]->(s)
-                """
+            for chunk in iter_chunks(rows, batch_size):
                 try:
-                    session.run(query, {
-                        "company_id": company_id,
-                        "ship_imo": ship_imo
-                    })
-                    success_count += 1
+                    merged = session.execute_write(
+                        lambda tx: tx.run(OWNS_QUERY, rows=chunk).single()["merged"])
                 except Exception as e:
-                    print(f"为船舶 {ship_imo} 建立关系时出错: {str(e)}")
-                    failure_count += 1
-            
-            print(f"关系建立完成: 成功 {success_count} 条, 失败 {failure_count} 条")
-            return success_count, failure_count
+                    print(f"为 {len(chunk)} 艘船舶建立关系时出错: {str(e)}")
+                    failure_count += len(chunk)
+                    continue
+                success_count += merged
+                failure_count += len(chunk) - merged  # 船舶节点不存在
+        
+        print(f"关系建立完成: 成功 {success_count} 条, 失败 {failure_count} 条")
+        return success_count, failure_count
 
 
 # 使用示例
@@ -1,248 +1,572 @@
 import pandas as pd
-from neo4j import GraphDatabase
 import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
 from dotenv import load_dotenv
 from create_company_ship_relationship import RelationshipCreator
+from src import sources
+from src.sources import iter_chunks, prefetch
+from src.pipeline import ImportPipeline, run_partitioned
+from src.database import create_driver
+from src.backend import Neo4jBackend
+from src.cache import is_read_only
+from src.sync import IncrementalSync
+from src.staging import read_batches
+from src.routing import RouteGraph
+from src.route_matrix import MATRIX_METHODS, RouteMatrix
+from src.docking import DockingIndex
+from src.planner import RoutePlanner
+from src.allocation import COMPATIBLE_SHIP_TYPES, CargoAllocator
+from src.snapshot import SNAPSHOT_RELATIONS, export_snapshot
+from src.visits import VisitTimeline, from_seconds, to_seconds
 # 加载环境变量（如果有）
 load_dotenv()
 
 class ShippingKnowledgeGraph:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.relationship_creator = RelationshipCreator(uri, user, password)  # 初始化关系创建器
+    def __init__(self, uri, user, password, batch_size=1000, workers=4, cache=None,
+                 driver=None, staging=None, backend=None, metrics=None, **pool_config):
+        # 所有会话（包括关系创建器）共用一个带连接池的 driver；
+        # 传入 driver 时复用调用方的连接池，pool_config 见 src.database.create_driver。
+        # 传入 backend（如 src.memory_backend.MemoryGraph）时不连接数据库
+        if backend is not None:
+            self._owns_driver = False
+            self.driver = driver
+            self.relationship_creator = None
+            self.backend = backend
+        else:
+            self._owns_driver = driver is None
+            self.driver = driver if driver is not None else create_driver(uri, user, password, **pool_config)
+            self.relationship_creator = RelationshipCreator(driver=self.driver)  # 初始化关系创建器
+            self.backend = Neo4jBackend(self._execute_query, self._write_batch, self._stream_query)
+        self._local = threading.local()  # 每个线程绑定的批量写入会话
+        self.batch_size = batch_size  # 每个事务通过 UNWIND 写入的行数
+        self.workers = workers  # 关系导入的并发分区数
+        self._route_graph = None  # 内存航线网络，首次查询时从数据库加载
+        self._route_matrix = None  # 预计算航线表，见 use_route_matrix
+        self._docking_index = None  # 船舶-港口可停靠索引，首次查询时从数据库加载
+        self._route_planner = None  # 载重吨约束下的多目标航线规划器，首次规划时构建
+        self._visit_timeline = None  # 挂靠时间索引，首次查询时从数据库加载
+        self._max_dwell = None  # 数据库中最长的停靠时长（秒），服务端窗口查询的下界
+        self.cache = cache  # 可选的只读查询缓存（src.cache.QueryCache）
+        self.staging = staging  # 可选的列式暂存区（src.staging.StagingCache），每个CSV只解析一次
+        self.metrics = metrics  # 可选的语句/批次指标（src.metrics.QueryMetrics）
     
     def close(self):
-        self.driver.close()
-        if hasattr(self, 'relationship_creator'):
+        if getattr(self, 'relationship_creator', None) is not None:
             self.relationship_creator.close()
+        self.backend.close()
+        if self._owns_driver:
+            self.driver.close()
     
-    def _execute_query(self, query, parameters=None):
+    @contextmanager
+    def bulk_session(self):
+        """在当前线程内复用同一个会话执行多批写入，嵌套使用时沿用外层会话"""
+        session = getattr(self._local, "session", None)
+        if session is not None or self.driver is None:
+            yield session
+            return
+        with self.driver.session() as session:
+            self._local.session = session
+            try:
+                yield session
+            finally:
+                self._local.session = None
+    
+    def _run_query(self, query, parameters=None):
         with self.driver.session() as session:
+            if self.metrics is not None:
+                return self.metrics.execute(session.run, query, parameters)
             return session.run(query, parameters or {}).data()
     
-    def clear_database(self):
-        """清空数据库，用于重新导入"""
-        query = "MATCH (n) DETACH DELETE n"
-        self._execute_query(query)
-        print("数据库已清空")
+    def _stream_query(self, query, parameters=None):
+        """逐条产出结果的值元组，不在内存中保留整个结果集，用于快照等大批量只读导出"""
+        with self.driver.session() as session:
+            if self.metrics is not None:
+                yield from self.metrics.stream(session.run, query, parameters)
+                return
+            for record in session.run(query, parameters or {}):
+                yield tuple(record.values())
+    
+    def _execute_query(self, query, parameters=None):
+        """执行查询；启用缓存时只读查询走缓存，写入语句执行后清空缓存"""
+        if self.cache is None:
+            return self._run_query(query, parameters)
+        if is_read_only(query):
+            return self.cache.get_or_load(query, parameters, lambda: self._run_query(query, parameters))
+        try:
+            return self._run_query(query, parameters)
+        finally:
+            self.cache.invalidate()
+    
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+    
+    def cache_stats(self):
+        """查询缓存的命中/未命中统计，未启用缓存时返回 None"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def _write_batch(self, query, rows):
+        try:
+            with self.bulk_session() as session:
+                if self.metrics is not None:
+                    session.execute_write(lambda tx: self.metrics.execute(tx.run, query, {"rows": rows}, len(rows)))
+                else:
+                    session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+        finally:
+            self._invalidate_cache()
+    
+    def _import_batches(self, spec, file_path, batch_size=None, workers=None):
+        """
+        流式按批导入：边解析CSV边写入，每批作为一个 $rows 参数在一个事务内 UNWIND
+        
+        数据源定义了 partition_key 且 workers>1 时，按该键分区并发写入。
+        """
+        batch_size = batch_size or self.batch_size
+        workers = workers or self.workers
+        batches = prefetch(read_batches(spec, file_path, batch_size, self.staging))
+        write = partial(self.backend.write, spec)
+        if self.metrics is not None:
+            write = self.metrics.timed_batches(spec.name, write)
+        start = time.perf_counter()
+        try:
+            if spec.partition_key and workers > 1:
+                count = run_partitioned(batches, spec.partition_key, write,
+                                        workers, batch_size, worker_context=self.bulk_session)
+            else:
+                count = 0
+                with self.bulk_session():
+                    for chunk in batches:
+                        write(chunk)
+                        count += len(chunk)
+        finally:
+            self._invalidate_cache()
+            self._reset_derived(spec)
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else float("inf")
+        print(f"{spec.name}: 写入 {count} 行，耗时 {elapsed:.2f} 秒，{rate:.0f} 行/秒")
+        return count
+    
+    def _reset_derived(self, spec=None):
+        """
+        丢弃由数据库内容派生的进程内结构，下次使用时重新加载
+        
+        参数:
+        spec: 刚写入的数据源，只丢弃依赖它的结构；为 None 时全部丢弃
+        """
+        if spec is None or spec is sources.ROUTES:
+            self._route_graph = None
+            self._route_matrix = None
+        if spec is None or spec in (sources.ROUTES, sources.SHIPS, sources.PORTS):
+            self._route_planner = None
+        if spec is None or spec in (sources.SHIPS, sources.PORTS):
+            self._docking_index = None
+        if spec is None or spec is sources.SHIP_PORT_VISITS:
+            self._visit_timeline = None
+            self._max_dwell = None
     
-    def import_companies(self, file_path):
+    def clear_database(self, labels=None, rel_types=None, batch_size=10000):
+        """
+        分批清空数据库，用于重新导入
+        
+        参数:
+        labels: 只删除这些标签的节点，如 ["Cargo"]
+        rel_types: 只删除这些类型的关系，如 ["VISITED"]
+        batch_size: 每个事务最多删除的节点/关系数
+        """
+        try:
+            deleted = self.backend.clear(labels, rel_types, batch_size)
+        finally:
+            self._invalidate_cache()
+        self._reset_derived()
+        print("数据库已清空" if labels is None and rel_types is None else f"已清理: {deleted}")
+        return deleted
+    
+    def ensure_schema(self):
+        """为所有合并键创建唯一约束和查找索引（幂等），并确认索引已上线"""
+        names = self.backend.ensure_schema()
+        print(f"已确认 {len(names)} 个约束/索引在线")
+        return names
+    
+    def import_companies(self, file_path, batch_size=None):
         """导入航运公司数据"""
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():#当你使用 df.iterrows() 时，它返回一个生成器（generator）对象。这个生成器会逐行产生数据，每次迭代返回一个元组 (index, row)
-            query = """
-            MERGE (c:Company {code: $code})
-            SET c.name = $name, c.headquarters = $headquarters
-            """
-            self._execute_query(query, {
-                "code": row['公司注册码'],
-                "name": row['公司名称'],
-                "headquarters": row['总部所在地']
-            })
-        print(f"成功导入 {len(df)} 家航运公司")
-    
-    def import_ships(self, file_path):
+        count = self._import_batches(sources.COMPANIES, file_path, batch_size)
+        print(f"成功导入 {count} 家航运公司")
+        return count
+    
+    def import_ships(self, file_path, batch_size=None):
         """导入船舶数据并关联公司"""
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():
-            # 创建船舶节点
-            query = """
-            MERGE (s:Ship {imo: $imo})
-            SET s.name = $name, s.type = $type, 
-                s.speed = $speed, s.power = $power,
-                s.gross_tonnage = $gross_tonnage,
-                s.dwt = $dwt
-            """
-            self._execute_query(query, {
-                "imo": row['IMO编号'],
-                "name": row['船舶名称'],
-                "type": row['船舶类型'],
-                "speed": row['设计航速(节)'],
-                "power": row['主机功率(kW)'],
-                "gross_tonnage": row['总吨位'],
-                "dwt": row['载重吨位(DWT)']
-            })
-            
-            # 关联公司
-            query = """
-            MATCH (c:Company {code: $company_id})
-            MATCH (s:Ship {imo: $imo})
-            MERGE (c)-[:OWNS]->(s)
-            """
-            self._execute_query(query, {
-                "company_id": row['所属公司ID'],
-                "imo": row['IMO编号']
-            })
-        print(f"成功导入 {len(df)} 艘船舶")
-    
-    def import_ports(self, file_path):
+        count = self._import_batches(sources.SHIPS, file_path, batch_size)
+        print(f"成功导入 {count} 艘船舶")
+        return count
+    
+    def import_ports(self, file_path, batch_size=None):
         """导入港口数据"""
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():
-            query = """
-            MERGE (p:Port {code: $code})
-            SET p.name = $name, p.congestion = $congestion,
-                p.max_dwt = $max_dwt
-            """
-            self._execute_query(query, {
-                "code": row['五位码'],
-                "name": row['港口名称'],
-                "congestion": row['拥挤程度(1-10)'],
-                "max_dwt": row['最大靠泊能力(DWT)']
-            })
-        print(f"成功导入 {len(df)} 个港口")
-    def import_routes(self, file_path):
-        """导入航线数据，使用评分列作为权重（修正循环逻辑）"""
-        df = pd.read_csv(file_path)
-        print(f"成功读取 {len(df)} 条航线数据")
-
-        # 检查列名（调试用）
-        print(f"CSV列名: {list(df.columns)}")
-        required_columns = ['起始港口五位码', '目的港口五位码', '航线名称', '航线距离(海里)', '航线天气影响评分(1-10)', '评分']
-        missing = [col for col in required_columns if col not in df.columns]
-        if missing:
-            raise ValueError(f"缺少列: {missing}")
-
-        with self.driver.session() as session:
-            for i, row in df.iterrows():
-                query = """
-                MERGE (from:Port {code: $from_code})
-                MERGE (to:Port {code: $to_code})
-                MERGE (from)-[r:ROUTE {name: $route_name}]->(to)
-                SET r.distance = $distance,
-                    r.weather_score = $weather_score,
-                    r.rating = toFloat($rating)  
-                """
-                # 关键：在循环内执行session.run
-                session.run(query, {
-                    "from_code": row['起始港口五位码'],
-                    "to_code": row['目的港口五位码'],
-                    "route_name": row['航线名称'],
-                    "distance": row['航线距离(海里)'],
-                    "weather_score": row['航线天气影响评分(1-10)'],
-                    "rating": row['评分']
-                })
-                # 打印进度（每10条）
-                if (i+1) % 10 == 0:
-                    print(f"已导入 {i+1}/{len(df)} 条航线")
+        count = self._import_batches(sources.PORTS, file_path, batch_size)
+        print(f"成功导入 {count} 个港口")
+        return count
+    def import_routes(self, file_path, batch_size=None):
+        """导入航线数据，使用评分列作为权重"""
+        self._import_batches(sources.ROUTES, file_path, batch_size)
     
         # 验证导入结果
-        with self.driver.session() as session:
-            result = session.run("MATCH ()-[r:ROUTE]->() RETURN count(r) as cnt")
-            print(f"成功导入 {result.single()['cnt']} 条航线")        
+        count = self.backend.relationship_count("ROUTE")
+        print(f"成功导入 {count} 条航线")
+        return count
     
 
     
-    def import_ship_port_adaptation(self, file_path):
-        """导入船舶与港口的适配关系"""
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():
-            query = """
-            MATCH (s:Ship {imo: $imo})
-            MATCH (p:Port {code: $port_code})
-            MERGE (s)-[r:CAN_DOCK]-(p)
-            SET r.ship_dwt = $ship_dwt, r.port_max_dwt = $port_max_dwt,
-                r.can_dock = $can_dock
-            """
-            self._execute_query(query, {
-                "imo": row['船舶编号'],
-                "port_code": row['港口五位码'],
-                "ship_dwt": row['船舶载重吨(DWT)'],
-                "port_max_dwt": row['港口最大靠泊能力(DWT)'],
-                "can_dock": row['是否可停靠'] == "是"
-            })
-        print(f"成功导入 {len(df)} 条船舶港口适配记录")
-    
-    def import_ship_port_visits(self, file_path):
+    def import_ship_port_adaptation(self, file_path, batch_size=None, workers=None):
+        """
+        导入船舶与港口的适配关系（旧流程）
+        
+        适配表是 船舶×港口 的全量组合，可停靠关系完全由 Ship.dwt 和 Port.max_dwt 决定，
+        新代码请用 ports_for_ship / ships_for_port 查询，必要时用 materialize_can_dock
+        只为需要的配对建立关系。
+        """
+        count = self._import_batches(sources.SHIP_PORT_ADAPTATION, file_path, batch_size, workers)
+        print(f"成功导入 {count} 条船舶港口适配记录")
+        return count
+    
+    def import_ship_port_visits(self, file_path, batch_size=None, workers=None):
         """导入船舶挂靠港口记录"""
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():
-            query = """
-            MATCH (s:Ship {imo: $imo})
-            MATCH (p:Port {code: $port_code})
-            MERGE (s)-[r:VISITED {arrival: $arrival, departure: $departure}]-(p)
-            SET r.duration = $duration
-            """
-            self._execute_query(query, {
-                "imo": row['船舶编号'],
-                "port_code": row['港口五位码'],
-                "arrival": row['到达时间'],
-                "departure": row['离开时间'],
-                "duration": row['停靠时长(小时)']
-            })
-        print(f"成功导入 {len(df)} 条船舶挂靠记录")
-    
-    def import_cargo(self, file_path):
+        count = self._import_batches(sources.SHIP_PORT_VISITS, file_path, batch_size, workers)
+        print(f"成功导入 {count} 条船舶挂靠记录")
+        return count
+    
+    def import_cargo(self, file_path, batch_size=None):
         """导入货物数据"""
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():
-            query = """
-            MERGE (c:Cargo {id: $id})
-            SET c.name = $name, c.type = $type, c.weight = $weight
-            """
-            self._execute_query(query, {
-                "id": row['货物编号'],
-                "name": row['货物名称'],
-                "type": row['货物类型'],
-                "weight": row['重量(吨)']
-            })
-        print(f"成功导入 {len(df)} 条货物记录")
+        count = self._import_batches(sources.CARGO, file_path, batch_size)
+        print(f"成功导入 {count} 条货物记录")
+        return count
     def create_company_ship_relationships(self, ships_file, companies_file):
             """创建公司与船舶的关系"""
             print("开始创建公司与船舶的关系...")
-            success, failure = self.relationship_creator.create_company_ship_relationship(
-                ships_file, companies_file
-            )
+            if self.relationship_creator is None:
+                # 非 Neo4j 后端：OWNS 已按 SHIPS 的写入描述随船舶一起合并
+                success = self.backend.relationship_count("OWNS")
+                print(f"成功创建 {success} 条公司-船舶关系，0 条失败")
+                return success, 0
+            try:
+                success, failure = self.relationship_creator.create_company_ship_relationship(
+                    ships_file, companies_file, staging=self.staging
+                )
+            finally:
+                self._invalidate_cache()
             print(f"成功创建 {success} 条公司-船舶关系，{failure} 条失败")
             return success, failure    
-    def find_optimal_route(self, from_port_code, to_port_code):
-        """查找最优航线（基于评分列）"""
-        query = """
-        MATCH (from:Port {code: $from_code}), (to:Port {code: $to_code})
-        // 使用评分列作为权重，评分越高表示路径越好
-        MATCH path = shortestPath((from)-[r:ROUTE*]->(to))
-        UNWIND relationships(path) AS route
-        WITH path, 
-             sum(route.distance) as total_distance,
-             sum(route.weather_score) as total_weather_score,
-             sum(route.rating) as total_rating
-        RETURN path, total_distance, total_weather_score, total_rating
-        ORDER BY total_rating DESC  // 按评分降序排列
-        LIMIT 1
+    def import_all(self, files, max_workers=None):
         """
-        with self.driver.session() as session:
-            result = session.run(query, {
-                "from_code": from_port_code,
-                "to_code": to_port_code
-            })
-            record = result.single()
-            
-            if record:
-                path = record["path"]
-                total_distance = record["total_distance"]
-                total_weather_score = record["total_weather_score"]
-                total_rating = record["total_rating"]
-                
-                print(f"找到最优航线：总距离 {total_distance} 海里，总天气评分 {total_weather_score}，总评分 {total_rating:.2f}")
-                return {
-                    "path": path,
-                    "total_distance": total_distance,
-                    "total_weather_score": total_weather_score,
-                    "total_rating": total_rating
-                }
-            else:
+        按依赖关系并发导入全部数据
+        
+        公司、港口、货物互不依赖，同时导入；船舶依赖公司（公司-船舶关系随船舶一起合并），
+        航线依赖港口，适配/挂靠关系在两端节点都导入后才开始。
+        
+        参数:
+        files: 字典，键为 companies/ships/ports/routes/cargo/adaptation/visits，
+               缺少的数据源不导入（adaptation 通常不需要，见 ports_for_ship）
+        max_workers: 同时运行的阶段数
+        """
+        loaders = {
+            "companies": self.import_companies,
+            "ports": self.import_ports,
+            "cargo": self.import_cargo,
+            "ships": self.import_ships,
+            "routes": self.import_routes,
+            "adaptation": self.import_ship_port_adaptation,
+            "visits": self.import_ship_port_visits,
+        }
+        pipeline = ImportPipeline(max_workers)
+        for name, depends_on in sources.DEPENDENCIES.items():
+            if name in files:
+                pipeline.add(name, partial(loaders[name], files[name]),
+                             [dep for dep in depends_on if dep in files])
+        return pipeline.run()
+    def _sync_source(self, syncer, spec, file_path):
+        if spec is sources.SHIP_PORT_VISITS and not syncer.migrated("visit_times"):
+            # 未变化的行不会重新写入，旧版本以字符串保存的挂靠时间需要先原地转换；
+            # 转换要扫描全部 VISITED 关系，每个状态文件只做一次
+            self.convert_visit_times()
+            syncer.mark_migrated("visit_times")
+        def write(query, rows):
+            # IncrementalSync 以 write(query, rows) 回调写入/删除，映射到后端操作
+            try:
+                if query == spec.delete_query:
+                    self.backend.delete(spec, rows)
+                else:
+                    self.backend.write(spec, rows)
+            finally:
+                self._invalidate_cache()
+        with self.bulk_session():
+            return syncer.sync(spec, file_path, write, self.batch_size, self.staging)
+    
+    def sync_all(self, files, state_file, max_workers=None):
+        """
+        增量同步全部数据源，替代 clear_database() + 全量导入
+        
+        每个数据源只写入内容有变化的行、删除源文件中已消失的实体，
+        上次导入的行指纹保存在 state_file 中。
+        
+        参数:
+        files: 字典，键与 import_all 相同，可以只包含部分数据源
+        state_file: 同步状态文件路径
+        max_workers: 同时运行的数据源数
+        """
+        syncer = IncrementalSync(state_file)
+        pipeline = ImportPipeline(max_workers)
+        for name, depends_on in sources.DEPENDENCIES.items():
+            if name in files:
+                spec = sources.SOURCES[name]
+                pipeline.add(name,
+                             partial(self._sync_source, syncer, spec, files[name]),
+                             [dep for dep in depends_on if dep in files])
+        results = pipeline.run()
+        self._reset_derived()
+        return results
+    def load_route_graph(self):
+        """把全部 ROUTE 边加载到进程内航线网络，之后的路径查询不再访问数据库"""
+        self._route_graph = RouteGraph(self.backend.route_edges())
+        print(f"已加载航线网络：{len(self._route_graph)} 个港口，{self._route_graph.edge_count} 条航段")
+        return self._route_graph
+    
+    @property
+    def route_graph(self):
+        if self._route_graph is None:
+            self.load_route_graph()
+        return self._route_graph
+    
+    @property
+    def docking_index(self):
+        """船舶-港口可停靠索引（按载重吨/靠泊能力排序的数组），首次使用时从数据库加载"""
+        if self._docking_index is None:
+            self._docking_index = DockingIndex.from_records(self.backend.ship_dwt(), self.backend.port_capacity())
+        return self._docking_index
+    
+    def ports_for_ship(self, imo, server_side=False):
+        """
+        这艘船可以停靠的港口代码，按最大靠泊能力升序
+        
+        默认在内存索引上二分查找；server_side=True 时改为数据库端的范围索引查询。
+        """
+        if server_side:
+            return [row["code"] for row in self.backend.ports_for_ship(imo)]
+        return self.docking_index.ports_for_ship(imo)
+    
+    def ships_for_port(self, port_code):
+        """能停靠这个港口的船舶IMO编号，按载重吨升序"""
+        return self.docking_index.ships_for_port(port_code)
+    
+    @property
+    def visit_timeline(self):
+        """按港口/船舶和到达时间排序的挂靠索引（src.visits.VisitTimeline），首次使用时从数据库加载"""
+        if self._visit_timeline is None:
+            self._visit_timeline = VisitTimeline.from_records(self.backend.visits())
+        return self._visit_timeline
+    
+    def convert_visit_times(self, batch_size=10000):
+        """把旧版本以字符串保存的 VISITED 到达/离开时间转换为 LocalDateTime（幂等）"""
+        try:
+            converted = self.backend.convert_visit_times(batch_size)
+        finally:
+            self._invalidate_cache()
+        if converted:
+            self._reset_derived(sources.SHIP_PORT_VISITS)
+        return converted
+    
+    def _max_dwell_seconds(self):
+        if self._max_dwell is None:
+            self._max_dwell = self.backend.max_dwell_seconds() or 0
+        return self._max_dwell
+    
+    def port_occupancy(self, port_code, start, end, server_side=False, max_dwell_hours=None):
+        """
+        [start, end) 期间在该港口停靠过的全部挂靠，按到达时间排序
+        
+        默认在内存挂靠索引上二分查找；server_side=True 时改为存储后端查询，
+        到达时间限定在 [start - 最长停靠时长, end) 内，由 VISITED.arrival 上的范围索引做区间查找。
+        max_dwell_hours 不给出时使用数据库中最长的停靠时长（查询一次后缓存）。
+        """
+        if server_side:
+            start, end = to_seconds(start), to_seconds(end)
+            max_dwell = self._max_dwell_seconds() if max_dwell_hours is None else int(max_dwell_hours * 3600)
+            return self.backend.port_occupancy(port_code, from_seconds(start - max_dwell),
+                                               from_seconds(start), from_seconds(end))
+        return self.visit_timeline.port_occupancy(port_code, start, end)
+    
+    def ship_itinerary(self, imo, start=None, end=None, server_side=False):
+        """船舶在 [start, end) 内到达的港口及停靠时间，按到达时间排序"""
+        if server_side:
+            return self.backend.ship_itinerary(
+                imo,
+                None if start is None else from_seconds(to_seconds(start)),
+                None if end is None else from_seconds(to_seconds(end)),
+            )
+        return self.visit_timeline.ship_itinerary(imo, start, end)
+    
+    def dwell_time(self, port_code, start, end, server_side=False):
+        """[start, end) 内到达该港口的挂靠次数及停靠时长统计（小时）"""
+        if server_side:
+            row = self.backend.dwell_time(port_code, from_seconds(to_seconds(start)),
+                                          from_seconds(to_seconds(end)))
+            return {
+                "visits": int(row["visits"]),
+                "total_hours": float(row["total_hours"]),
+                "mean_hours": float(row["mean_hours"]),
+                "max_hours": float(row["max_hours"]),
+            }
+        return self.visit_timeline.dwell_time(port_code, start, end)
+    
+    def peak_concurrency(self, port_code, start=None, end=None):
+        """窗口内同时在港船舶数的峰值及其出现时刻"""
+        return self.visit_timeline.peak_concurrency(port_code, start, end)
+    
+    def materialize_can_dock(self, pairs):
+        """
+        只为请求的 (船舶, 港口) 配对建立 CAN_DOCK 关系
+        
+        参数:
+        pairs: [{"imo": ..., "port_code": ...}, ...]，如 docking_index.pairs([imo])
+        """
+        rows = list(pairs)
+        with self.bulk_session():
+            for chunk in iter_chunks(rows, self.batch_size):
+                self.backend.materialize_can_dock(chunk)
+                self._invalidate_cache()
+        print(f"成功建立 {len(rows)} 条船舶港口适配关系")
+        return len(rows)
+    
+    def allocate_cargo(self, cargo=None, compatible=COMPATIBLE_SHIP_TYPES, write=True):
+        """
+        把货物分配给船型兼容、载重吨足够的船舶，并批量写入 CARRIES 关系；
+        未分配的货物删除此前的 CARRIES 关系，重新配载后图中只留下本次的结果
+        
+        参数:
+        cargo: 货物记录或 DataFrame（id, type, weight，可选 origin/destination 港口代码），
+               不给出时使用图中全部 Cargo 节点
+        compatible: 货物类型 -> 可承运船型，见 src.allocation.COMPATIBLE_SHIP_TYPES
+        write: 是否把配载结果写入图
+        
+        返回:
+        src.allocation.Allocation
+        """
+        cargo = pd.DataFrame(self.backend.cargo_manifest() if cargo is None else cargo)
+        # 只有带起止港的货物才需要航线网络判定可达性
+        planner = self.route_planner if {"origin", "destination"} <= set(cargo.columns) else None
+        allocation = CargoAllocator(self.backend.ship_capacity(), compatible, planner).allocate(cargo)
+        summary = allocation.summary()
+        print(f"配载完成：{summary['assigned']} 件货物分配到 {summary['ships_used']} 艘船，"
+              f"{summary['unassigned']} 件未分配，耗时 {allocation.seconds:.2f} 秒")
+        if write:
+            with self.bulk_session():
+                for chunk in iter_chunks(allocation.unassigned_rows(), self.batch_size):
+                    self.backend.unassign_cargo(chunk)
+                for chunk in iter_chunks(allocation.rows(), self.batch_size):
+                    self.backend.assign_cargo(chunk)
+            self._invalidate_cache()
+        return allocation
+    
+    def export_snapshot(self, directory, relations=SNAPSHOT_RELATIONS):
+        """
+        把航线网络、船舶挂靠和公司船队流式导出为内存映射的 CSR 快照（src.snapshot），
+        中心性、连通分量等分析在快照上用 src.analytics 离线计算，不占用数据库
+        """
+        snapshot = export_snapshot(self.backend, directory, relations)
+        print(f"快照已保存到 {directory}")
+        return snapshot
+    
+    def use_route_matrix(self, directory, methods=MATRIX_METHODS):
+        """
+        启用预计算航线表：航线未变化时内存映射已有文件，否则重新计算
+        
+        启用后，按这些权重（默认含 rating）的 find_optimal_route 直接查表。
+        """
+        self._route_matrix = RouteMatrix.load_or_build(self.route_graph, directory, methods)
+        return self._route_matrix
+    
+    def find_optimal_route(self, from_port_code, to_port_code, weight="rating"):
+        """
+        查找最优航线（加权最短路径）
+        
+        参数:
+        weight: distance / weather_score / rating，calculate_rating 的评分方法名，
+                或函数 weight(distance, weather_score, rating)；代价越小越好
+        """
+        matrix = self._route_matrix
+        if matrix is not None and weight in matrix.methods:
+            try:
+                route = matrix.route(from_port_code, to_port_code, weight)
+            except KeyError:
+                route = None
+            routes = [route] if route else []
+            if not routes:
                 print(f"未找到从 {from_port_code} 到 {to_port_code} 的航线")
-                return None
-    
-        if result:
-            path = result[0]['path']
-            distance = result[0]['total_distance']
-            weather_score = result[0]['total_weather_score']
-            print(f"找到最优航线：距离 {distance} 海里，天气评分总和 {weather_score}")
-            return path
         else:
-            print(f"未找到从 {from_port_code} 到 {to_port_code} 的航线")
+            routes = self.find_alternative_routes(from_port_code, to_port_code, k=1, weight=weight)
+        if not routes:
             return None
+        route = routes[0]
+        print(f"找到最优航线：{' -> '.join(route['ports'])}，总距离 {route['total_distance']} 海里，"
+              f"总天气评分 {route['total_weather_score']}，总评分 {route['total_rating']:.2f}")
+        return route
+    
+    def find_alternative_routes(self, from_port_code, to_port_code, k=3, weight="rating"):
+        """按代价升序返回前 k 条备选航线"""
+        try:
+            routes = self.route_graph.k_shortest_paths(from_port_code, to_port_code, k, weight)
+        except KeyError:
+            routes = []
+        if not routes:
+            print(f"未找到从 {from_port_code} 到 {to_port_code} 的航线")
+        return [route.to_dict() for route in routes]
+    
+    def find_routes(self, pairs=None, sources=None, targets=None, weight="rating", paths=True):
+        """
+        批量查询最优航线，每个不同的起点只搜索一次，参数和返回值见 RouteGraph.route_table
+        
+        例如 find_routes([("CNSHA", "SGSIN"), ("CNSHA", "USNYC")]) 或
+        find_routes(sources=["CNSHA", "HKHKG"], targets=["SGSIN", "USNYC"])
+        """
+        table = self.route_graph.route_table(pairs, sources, targets, weight, paths)
+        print(f"批量航线查询：{len(table)} 个请求，{table['from_code'].nunique()} 次单源搜索，"
+              f"{table['cost'].notna().sum()} 条可达")
+        return table
+    
+    @property
+    def route_planner(self):
+        """多目标航线规划器（src.planner.RoutePlanner），航线网络重新加载后随之重建"""
+        if self._route_planner is None or self._route_planner.graph is not self.route_graph:
+            self._route_planner = RoutePlanner(self.route_graph, self.backend.port_attributes(),
+                                               self.backend.ship_dwt())
+        return self._route_planner
+    
+    def plan_routes(self, imo, from_port_code, to_port_code):
+        """
+        这艘船在距离、天气影响和港口拥挤程度上的全部 Pareto 最优航线
+        
+        只经过靠泊能力足够的港口；结果按总距离升序。
+        """
+        try:
+            routes = self.route_planner.plan(imo, from_port_code, to_port_code)
+        except KeyError:
+            routes = []
+        if not routes:
+            print(f"船舶 {imo} 没有从 {from_port_code} 到 {to_port_code} 的可行航线")
+        return [route.to_dict() for route in routes]
+    
+    def plan_fleet_routes(self, requests):
+        """
+        批量规划整支船队的可行航线，全部在内存中完成，不逐船查询数据库
+        
+        参数:
+        requests: [(imo, from_port_code, to_port_code), ...]
+        
+        返回:
+        与 requests 一一对应的 Pareto 最优航线列表
+        """
+        plans = self.route_planner.plan_fleet(requests)
+        return [[route.to_dict() for route in routes] for routes in plans]
     
 
 # 使用示例
@@ -257,6 +581,8 @@ if __name__ == "__main__":
     try:
         # 清空数据库（可选）
         kg.clear_database()
+        # 导入前建立约束和索引，保证 MERGE/MATCH 走索引
+        kg.ensure_schema()
         
         # 定义数据文件路径（根据你的实际路径调整）
         data_dir = "data"  # 假设data文件夹与脚本同级
@@ -267,21 +593,23 @@ if __name__ == "__main__":
         cargo_file = os.path.join(data_dir, "全球货物数据.CSV")
         
         relationships_dir = os.path.join(data_dir, "relationships")
-        adaption_file = os.path.join(relationships_dir, "船舶港口适配表.CSV")
         visits_file = os.path.join(relationships_dir, "船舶港口挂靠记录.CSV")
         
-        # 导入数据
-        kg.import_companies(companies_file)
-        kg.import_ships(ships_file)
-        kg.import_ports(ports_file)
-        kg.import_routes(routes_file)
-        kg.import_cargo(cargo_file)
-        kg.import_ship_port_adaptation(adaption_file)
-        kg.import_ship_port_visits(visits_file)
-        kg.create_company_ship_relationships(ships_file, companies_file)
+        # 按依赖关系并发导入数据
+        kg.import_all({
+            "companies": companies_file,
+            "ships": ships_file,
+            "ports": ports_file,
+            "routes": routes_file,
+            "cargo": cargo_file,
+            "visits": visits_file,
+        })
         
         # 示例：查找从韶关港到纽约港的最优航线
         optimal_route = kg.find_optimal_route("CNSHA", "USNYC")
         
+        # 示例：可停靠港口由船舶载重吨和港口靠泊能力直接推导，无需导入适配表
+        dockable_ports = kg.ports_for_ship(9857542)
+        
     finally:
         kg.close()
\ No newline at end of file
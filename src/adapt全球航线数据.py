@@ -1,8 +1,19 @@
 import pandas as pd
+import numpy as np
 import os
 from datetime import datetime
 
-def calculate_rating(distance, weather_score, method='balanced'):
+from .sources import SourceSpec
+from .staging import read_batches
+
+# 各评分方法的 (距离权重, 天气权重)
+RATING_WEIGHTS = {
+    'balanced': (0.5, 0.5),  # 平衡距离和天气的影响（各占50%）
+    'distance_weighted': (0.7, 0.3),  # 距离影响占70%，天气占30%
+    'weather_weighted': (0.3, 0.7),  # 天气影响占70%，距离占30%
+}
+
+def calculate_rating(distance, weather_score, method='balanced', max_distance=20000):
     """
     根据航线距离和天气评分计算综合评分
     
@@ -10,67 +21,156 @@ def calculate_rating(distance, weather_score, method='balanced'):
     distance: 航线距离(海里)
     weather_score: 天气影响评分(1-10)
     method: 评分计算方法，可选'balanced'(平衡)、'distance_weighted'(距离优先)、'weather_weighted'(天气优先)
+    max_distance: 标准化用的最大距离(海里)，超过该距离的距离分记为100
     
     返回:
     综合评分(0-100)
     """
-    # 标准化距离到0-100范围（假设最大距离为20000海里）
-    max_distance = 20000
+    if method not in RATING_WEIGHTS:
+        raise ValueError(f"未知的评分方法: {method}")
+    distance_weight, weather_weight = RATING_WEIGHTS[method]
+    
+    # 标准化距离到0-100范围
     distance_score = min(100, (distance / max_distance) * 100)
     
     # 转换天气评分为0-100范围（直接乘以10）
     weather_score_scaled = weather_score * 10
     
-    if method == 'balanced':
-        # 平衡距离和天气的影响（各占50%）
-        return round(0.5 * distance_score + 0.5 * weather_score_scaled, 1)
-    elif method == 'distance_weighted':
-        # 距离影响占70%，天气占30%
-        return round(0.7 * distance_score + 0.3 * weather_score_scaled, 1)
-    elif method == 'weather_weighted':
-        # 天气影响占70%，距离占30%
-        return round(0.3 * distance_score + 0.7 * weather_score_scaled, 1)
-    else:
-        raise ValueError(f"未知的评分方法: {method}")
+    return round(distance_weight * distance_score + weather_weight * weather_score_scaled, 1)
+
+def _round_half_even_1(values):
+    """
+    与 round(x, 1) 逐元素结果一致的向量化舍入
+    
+    np.round 先乘10再取整，恰好落在 .x5 附近的值可能与 round() 的精确十进制规则不同，
+    这些少量的值单独交给 round() 处理。
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in ties:
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+def calculate_ratings(distance, weather_score, methods=('balanced',), weights=None, max_distance=20000):
+    """
+    向量化计算整列评分，一次遍历输出多种评分
+    
+    参数:
+    distance: 航线距离数组或Series
+    weather_score: 天气影响评分数组或Series
+    methods: 要计算的内置评分方法，见 RATING_WEIGHTS
+    weights: 自定义权重，{列名: (距离权重, 天气权重)}
+    max_distance: 标准化用的最大距离；为 None 时使用本列的最大距离
+    
+    返回:
+    DataFrame，每种方法/自定义权重一列，结果与逐行调用 calculate_rating 一致
+    """
+    index = distance.index if isinstance(distance, pd.Series) else None
+    distance = np.asarray(distance, dtype=np.float64)
+    weather_score = np.asarray(weather_score, dtype=np.float64)
+    if max_distance is None:
+        max_distance = distance.max() if len(distance) else 0
+        if not max_distance > 0:
+            max_distance = 1  # 距离全为0（或列为空）时距离分都是0
+    
+    # 两个标准化分量只计算一次，各评分方法只是它们的不同线性组合
+    distance_score = np.minimum(100, (distance / max_distance) * 100)
+    weather_score_scaled = weather_score * 10
+    
+    combos = {}
+    for method in methods:
+        if method not in RATING_WEIGHTS:
+            raise ValueError(f"未知的评分方法: {method}")
+        combos[method] = RATING_WEIGHTS[method]
+    combos.update(weights or {})
+    
+    ratings = {
+        name: _round_half_even_1(distance_weight * distance_score + weather_weight * weather_score_scaled)
+        for name, (distance_weight, weather_weight) in combos.items()
+    }
+    return pd.DataFrame(ratings, index=index)
+
+# 待评分的航线CSV：列名保持原样，只用于读取，不写入图
+RAW_ROUTES = SourceSpec(
+    name="航线原始数据",
+    columns={column: column for column in (
+        '航线编号', '航线名称', '起始港口五位码', '目的港口五位码', '航线距离(海里)', '航线天气影响评分(1-10)')},
+    dtypes={
+        '航线编号': 'str',
+        '航线名称': 'str',
+        '起始港口五位码': 'str',
+        '目的港口五位码': 'str',
+        '航线距离(海里)': 'int64',
+        '航线天气影响评分(1-10)': 'int64',
+    },
+    query="",
+    key=('航线编号',),
+    delete_query="",
+)
 
-def add_rating_column(csv_file, output_file=None, rating_method='balanced'):
+def add_rating_column(csv_file, output_file=None, rating_method='balanced',
+                      extra_methods=(), weights=None, max_distance=20000,
+                      batch_size=10000, staging=None):
     """
     为CSV文件添加评分列
     
+    按批流式读取（列定义见 RAW_ROUTES，其他列不输出），每批评分后追加写入输出文件，
+    内存占用与文件大小无关；给出 staging（src.staging.StagingCache）时读取暂存文件。
+    max_distance 为 None 时先扫描一遍求最大距离，有暂存区时第二遍不再解析CSV。
+    
     参数:
     csv_file: 输入CSV文件路径
     output_file: 输出CSV文件路径，默认为原文件添加_rated后缀
-    rating_method: 评分计算方法，见calculate_rating函数说明
+    rating_method: 评分计算方法，结果写入'评分'列，见calculate_rating函数说明
+    extra_methods: 额外输出的评分方法，每种写入'评分_<方法名>'列
+    weights: 自定义权重 {名称: (距离权重, 天气权重)}，每个写入'评分_<名称>'列
+    batch_size: 每批读取和评分的行数
+    staging: 可选的暂存区，见 src.staging.StagingCache
     """
     try:
-        # 读取CSV文件
-        df = pd.read_csv(csv_file)
-        
-        # 检查必要列是否存在
-        if '航线距离(海里)' not in df.columns or '航线天气影响评分(1-10)' not in df.columns:
-            raise ValueError("CSV文件中缺少'航线距离(海里)'或'航线天气影响评分(1-10)'列")
-        
-        # 计算评分
-        df['评分'] = df.apply(
-            lambda row: calculate_rating(
-                row['航线距离(海里)'], 
-                row['航线天气影响评分(1-10)'],
-                method=rating_method
-            ),
-            axis=1
-        )
+        if max_distance is None:
+            # 先求整列最大距离，与一次读入整个文件时的标准化结果相同
+            max_distance = 0
+            for batch in read_batches(RAW_ROUTES, csv_file, batch_size, staging):
+                max_distance = max([max_distance] + [row['航线距离(海里)'] for row in batch])
+            if not max_distance > 0:
+                max_distance = 1  # 距离全为0（或文件为空）时距离分都是0
         
         # 设置输出文件路径
         if output_file is None:
             file_name, file_ext = os.path.splitext(csv_file)
             output_file = f"{file_name}_rated{file_ext}"
         
-        # 保存结果
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')  # 使用utf-8-sig确保中文CSV正确显示
+        methods = [rating_method] + [m for m in extra_methods if m != rating_method]
+        count, total = 0, 0.0
+        lowest = highest = None
+        # 使用utf-8-sig确保中文CSV正确显示；逐批追加，只在开头写一次表头和BOM
+        with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+            for i, batch in enumerate(read_batches(RAW_ROUTES, csv_file, batch_size, staging)):
+                df = pd.DataFrame(batch, columns=list(RAW_ROUTES.columns))
+                # 计算评分（整批向量化，所有评分列一次算出）
+                ratings = calculate_ratings(
+                    df['航线距离(海里)'],
+                    df['航线天气影响评分(1-10)'],
+                    methods=methods,
+                    weights=weights,
+                    max_distance=max_distance
+                )
+                df['评分'] = ratings[rating_method]
+                for name in ratings.columns:
+                    if name != rating_method:
+                        df[f'评分_{name}'] = ratings[name]
+                df.to_csv(f, index=False, header=i == 0)
+                if len(df):
+                    count += len(df)
+                    total += float(df['评分'].sum())
+                    lowest = df['评分'].min() if lowest is None else min(lowest, df['评分'].min())
+                    highest = df['评分'].max() if highest is None else max(highest, df['评分'].max())
         
         print(f"成功添加评分列，保存到: {output_file}")
         print(f"评分方法: {rating_method}")
-        print(f"评分范围: {df['评分'].min()} - {df['评分'].max()}，平均值: {df['评分'].mean():.2f}")
+        print(f"评分范围: {lowest} - {highest}，平均值: {total / count if count else 0:.2f}")
         
         return output_file
     
@@ -82,6 +182,7 @@ def add_rating_column(csv_file, output_file=None, rating_method='balanced'):
         return None
 
 if __name__ == "__main__":
+    # 在项目根目录下以模块方式运行: python -m src.adapt全球航线数据
     # 设置文件路径（请根据实际情况修改）
     input_file = r"PythonProject\data\全球航线数据.CSV"
     
@@ -0,0 +1,319 @@
+# src/admin_export.py
+import csv
+import json
+import math
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import sources
+
+# neo4j-admin 头部支持的属性类型及其值的校验方式
+_INT_PATTERN = re.compile(r"^-?\d+$")
+_TYPE_CHECKS: Dict[str, Callable[[str], bool]] = {
+    "string": lambda v: True,
+    "long": lambda v: bool(_INT_PATTERN.match(v)),
+    "int": lambda v: bool(_INT_PATTERN.match(v)),
+    "double": lambda v: _is_float(v),
+    "float": lambda v: _is_float(v),
+    "boolean": lambda v: v in ("true", "false"),
+    "localdatetime": lambda v: _is_datetime(v),
+}
+_HEADER_FIELD = re.compile(r"^(?P<name>[^:]*)(?::(?P<kind>[A-Z_]+|[a-z]+)(?:\((?P<space>[^)]*)\))?)?$")
+
+
+def _is_datetime(value: str) -> bool:
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        return False
+    return "T" in value
+
+
+def _is_float(value: str) -> bool:
+    try:
+        return not math.isnan(float(value))
+    except ValueError:
+        return False
+
+
+@dataclass(frozen=True)
+class Column:
+    """导出文件中的一列：头部字段及其取值函数"""
+    header: str
+    value: Callable[[Dict[str, Any]], Any]
+
+
+@dataclass(frozen=True)
+class ExportFile:
+    """
+    一个节点或关系导出文件
+
+    key 决定去重：同一 key 只保留最后出现的行，与 MERGE/SET 导入后写覆盖的结果一致。
+    endpoints 为关系文件的 ((起点ID空间, 行字段), (终点ID空间, 行字段))。
+    """
+    file_name: str
+    source: str  # sources.SOURCES 中的键
+    kind: str  # "nodes" 或 "relationships"
+    columns: Tuple[Column, ...]
+    key: Callable[[Dict[str, Any]], Any]
+    id_space: Optional[str] = None
+    endpoints: Optional[Tuple[Tuple[str, str], Tuple[str, str]]] = None
+
+
+def _field(name):
+    return lambda row: row[name]
+
+
+def _const(value):
+    return lambda row: value
+
+
+NODE_FILES = (
+    ExportFile(
+        "companies.csv", "companies", "nodes",
+        (Column("code:ID(Company)", _field("code")),
+         Column("name", _field("name")),
+         Column("headquarters", _field("headquarters")),
+         Column(":LABEL", _const("Company"))),
+        key=_field("code"), id_space="Company",
+    ),
+    ExportFile(
+        # IMO 作为 ID 时会被存成字符串，因此另存一列 long 型的 imo 属性，与 MERGE 导入的类型一致
+        "ships.csv", "ships", "nodes",
+        (Column(":ID(Ship)", _field("imo")),
+         Column("imo:long", _field("imo")),
+         Column("name", _field("name")),
+         Column("type", _field("type")),
+         Column("speed:double", _field("speed")),
+         Column("power:long", _field("power")),
+         Column("gross_tonnage:long", _field("gross_tonnage")),
+         Column("dwt:long", _field("dwt")),
+         Column(":LABEL", _const("Ship"))),
+        key=_field("imo"), id_space="Ship",
+    ),
+    ExportFile(
+        "ports.csv", "ports", "nodes",
+        (Column("code:ID(Port)", _field("code")),
+         Column("name", _field("name")),
+         Column("congestion:long", _field("congestion")),
+         Column("max_dwt:long", _field("max_dwt")),
+         Column(":LABEL", _const("Port"))),
+        key=_field("code"), id_space="Port",
+    ),
+    ExportFile(
+        "cargo.csv", "cargo", "nodes",
+        (Column("id:ID(Cargo)", _field("id")),
+         Column("name", _field("name")),
+         Column("type", _field("type")),
+         Column("weight:long", _field("weight")),
+         Column(":LABEL", _const("Cargo"))),
+        key=_field("id"), id_space="Cargo",
+    ),
+)
+
+RELATIONSHIP_FILES = (
+    ExportFile(
+        "owns.csv", "ships", "relationships",
+        (Column(":START_ID(Company)", _field("company_id")),
+         Column(":END_ID(Ship)", _field("imo")),
+         Column(":TYPE", _const("OWNS"))),
+        key=_field("imo"),  # 每艘船只有一个所属公司，与 ships.csv 中保留的行一致
+        endpoints=(("Company", "company_id"), ("Ship", "imo")),
+    ),
+    ExportFile(
+        "routes.csv", "routes", "relationships",
+        (Column(":START_ID(Port)", _field("from_code")),
+         Column(":END_ID(Port)", _field("to_code")),
+         Column("name", _field("route_name")),
+         Column("distance:long", _field("distance")),
+         Column("weather_score:long", _field("weather_score")),
+         Column("rating:double", _field("rating")),
+         Column(":TYPE", _const("ROUTE"))),
+        key=lambda row: (row["from_code"], row["to_code"], row["route_name"]),
+        endpoints=(("Port", "from_code"), ("Port", "to_code")),
+    ),
+    ExportFile(
+        "can_dock.csv", "adaptation", "relationships",
+        (Column(":START_ID(Ship)", _field("imo")),
+         Column(":END_ID(Port)", _field("port_code")),
+         Column("ship_dwt:long", _field("ship_dwt")),
+         Column("port_max_dwt:long", _field("port_max_dwt")),
+         Column("can_dock:boolean", lambda row: "true" if row["can_dock"] == "是" else "false"),
+         Column(":TYPE", _const("CAN_DOCK"))),
+        key=lambda row: (row["imo"], row["port_code"]),
+        endpoints=(("Ship", "imo"), ("Port", "port_code")),
+    ),
+    ExportFile(
+        "visited.csv", "visits", "relationships",
+        (Column(":START_ID(Ship)", _field("imo")),
+         Column(":END_ID(Port)", _field("port_code")),
+         Column("arrival:localdatetime", lambda row: row["arrival"].replace(" ", "T")),
+         Column("departure:localdatetime", lambda row: row["departure"].replace(" ", "T")),
+         Column("duration:long", _field("duration")),
+         Column(":TYPE", _const("VISITED"))),
+        key=lambda row: (row["imo"], row["port_code"], row["arrival"], row["departure"]),
+        endpoints=(("Ship", "imo"), ("Port", "port_code")),
+    ),
+)
+
+
+def _format(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+def _write_file(spec: ExportFile, file_path, out_path, batch_size, ids, sample_size):
+    """写出一个文件，返回该文件的统计信息"""
+    stats = {"source": file_path, "written": 0, "duplicates": 0, "dangling": 0, "dangling_samples": []}
+    # 先按 key 缓冲，重复的 key 由后出现的行覆盖
+    latest: Dict[Any, Dict[str, Any]] = {}
+    for batch in sources.SOURCES[spec.source].iter_batches(file_path, batch_size):
+        for row in batch:
+            key = spec.key(row)
+            if key in latest:
+                stats["duplicates"] += 1
+            latest[key] = row
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([column.header for column in spec.columns])
+        for key, row in latest.items():
+            if spec.endpoints:
+                missing = [(space, row[field]) for space, field in spec.endpoints
+                           if row[field] not in ids.get(space, ())]
+                if missing:
+                    stats["dangling"] += 1
+                    if len(stats["dangling_samples"]) < sample_size:
+                        stats["dangling_samples"].append(
+                            {"key": [_format(k) for k in (key if isinstance(key, tuple) else (key,))],
+                             "missing": [f"{space}:{value}" for space, value in missing]})
+                    continue
+            writer.writerow([_format(column.value(row)) for column in spec.columns])
+            stats["written"] += 1
+    if spec.id_space:
+        ids[spec.id_space] = set(latest)
+    return stats
+
+
+def export_admin_import(files: Dict[str, str], out_dir, database="neo4j",
+                        batch_size=10000, sample_size=20) -> Dict[str, Any]:
+    """
+    把项目的源CSV转换为 neo4j-admin database import 所需的节点/关系文件
+
+    节点按各自ID空间（Company/Ship/Port/Cargo）去重，关系按合并键去重，
+    端点不存在的关系（悬空引用）不写出，只记录在报告中。
+
+    参数:
+    files: 字典，键为 companies/ships/ports/routes/cargo/adaptation/visits，缺少的数据源跳过
+    out_dir: 输出目录
+    database: 导入的目标数据库名
+
+    返回:
+    报告字典，同时写入 out_dir/report.json；其中 command 为完整的导入命令
+    """
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    ids: Dict[str, set] = {}
+    report: Dict[str, Any] = {"nodes": {}, "relationships": {}}
+
+    for spec in NODE_FILES + RELATIONSHIP_FILES:
+        if spec.source not in files:
+            continue
+        stats = _write_file(spec, files[spec.source], os.path.join(out_dir, spec.file_name),
+                            batch_size, ids, sample_size)
+        report[spec.kind][spec.file_name] = stats
+        print(f"{spec.file_name}: 写出 {stats['written']} 行，重复 {stats['duplicates']} 行，"
+              f"悬空引用 {stats['dangling']} 行")
+
+    args = [f"--nodes={os.path.join(out_dir, name)}" for name in report["nodes"]]
+    args += [f"--relationships={os.path.join(out_dir, name)}" for name in report["relationships"]]
+    report["command"] = " ".join(["neo4j-admin", "database", "import", "full", *args, database])
+    with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"导出完成，耗时 {time.perf_counter() - start:.2f} 秒\n导入命令: {report['command']}")
+    return report
+
+
+def _parse_header(header: List[str]):
+    fields = []
+    for raw in header:
+        match = _HEADER_FIELD.match(raw)
+        if not match:
+            raise ValueError(f"无法解析的头部字段: {raw}")
+        fields.append((match["name"], match["kind"] or "string", match["space"]))
+    return fields
+
+
+def validate_admin_import(out_dir) -> List[str]:
+    """
+    不连接数据库，检查导出文件能否被 neo4j-admin 正确导入
+
+    检查头部字段与类型、每个值能否按声明类型解析、ID 在各自空间内唯一、
+    关系的起止 ID 均指向已导出的节点。返回问题列表，为空表示通过。
+    """
+    with open(os.path.join(out_dir, "report.json"), encoding="utf-8") as f:
+        report = json.load(f)
+    problems: List[str] = []
+    ids: Dict[str, set] = {}
+
+    def check(file_name, kind):
+        path = os.path.join(out_dir, file_name)
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            try:
+                fields = _parse_header(next(reader))
+            except (StopIteration, ValueError) as exc:
+                problems.append(f"{file_name}: 头部错误 {exc}")
+                return
+            kinds = [k for _, k, _ in fields]
+            required = ("ID", "LABEL") if kind == "nodes" else ("START_ID", "END_ID", "TYPE")
+            for name in required:
+                if name not in kinds:
+                    problems.append(f"{file_name}: 缺少 :{name} 列")
+            for kind_name in kinds:
+                if kind_name not in _TYPE_CHECKS and kind_name not in ("ID", "LABEL", "START_ID", "END_ID", "TYPE"):
+                    problems.append(f"{file_name}: 不支持的类型 {kind_name}")
+            for line, row in enumerate(reader, start=2):
+                if len(row) != len(fields):
+                    problems.append(f"{file_name}:{line}: 列数 {len(row)} 与头部 {len(fields)} 不一致")
+                    continue
+                for value, (name, kind_name, space) in zip(row, fields):
+                    if kind_name == "ID":
+                        space_ids = ids.setdefault(space or "", set())
+                        if value in space_ids:
+                            problems.append(f"{file_name}:{line}: ID {space}:{value} 重复")
+                        space_ids.add(value)
+                    elif kind_name in ("START_ID", "END_ID"):
+                        if value not in ids.get(space or "", ()):
+                            problems.append(f"{file_name}:{line}: {kind_name} {space}:{value} 不存在")
+                    elif value and kind_name in _TYPE_CHECKS and not _TYPE_CHECKS[kind_name](value):
+                        problems.append(f"{file_name}:{line}: {name} 的值 {value!r} 不是 {kind_name}")
+
+    # 先读全部节点文件收集ID，再检查关系
+    for file_name in report["nodes"]:
+        check(file_name, "nodes")
+    for file_name in report["relationships"]:
+        check(file_name, "relationships")
+    return problems
+
+
+if __name__ == "__main__":
+    # 生成并校验离线导入文件：python -m src.admin_export
+    data_dir = "data"
+    relationships_dir = os.path.join(data_dir, "relationships")
+    out_dir = os.path.join(data_dir, "admin_import")
+    export_admin_import({
+        "companies": os.path.join(data_dir, "航运公司数据.CSV"),
+        "ships": os.path.join(data_dir, "船舶信息.CSV"),
+        "ports": os.path.join(data_dir, "全球港口信息.CSV"),
+        "routes": os.path.join(data_dir, "全球航线数据_rated.CSV"),
+        "cargo": os.path.join(data_dir, "全球货物数据.CSV"),
+        "adaptation": os.path.join(relationships_dir, "船舶港口适配表.CSV"),
+        "visits": os.path.join(relationships_dir, "船舶港口挂靠记录.CSV"),
+    }, out_dir)
+    issues = validate_admin_import(out_dir)
+    print("校验通过" if not issues else "\n".join(issues))
@@ -0,0 +1,217 @@
+# src/allocation.py
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .planner import RoutePlanner
+from .sources import CARGO, SHIPS, RelMerge
+from .staging import read_batches
+
+CARRIES = RelMerge("CARRIES", ("Ship", "imo", "imo"), ("Cargo", "id", "cargo_id"),
+                   properties={"weight": "weight"}, exclusive_end=True)
+
+# 货物类型 -> 可承运的船舶类型
+COMPATIBLE_SHIP_TYPES = {
+    "集装箱货": ("集装箱船",),
+    "冷藏货物": ("集装箱船",),
+    "危险货物": ("化学品船", "液化气船", "集装箱船"),
+    "液体货物": ("油轮", "化学品船"),
+    "固体散货": ("散货船",),
+    "特殊货物": ("散货船", "集装箱船"),
+}
+
+# 未配载原因
+NO_SHIP_TYPE = "无兼容船型"
+NO_LANE = "航线不可达"
+TOO_HEAVY = "超过兼容船舶最大载重"
+NO_CAPACITY = "运力不足"
+
+
+@dataclass
+class Allocation:
+    """一次配载的结果"""
+    assignments: pd.DataFrame  # cargo_id, imo, weight
+    unassigned: pd.DataFrame  # cargo_id, type, weight, reason
+    ships: pd.DataFrame  # imo, type, dwt, load, utilization（只含分到货物的船舶）
+    seconds: float
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """queries.CARRIES_QUERY 的 $rows"""
+        return self.assignments.to_dict("records")
+
+    def unassigned_rows(self) -> List[Dict[str, Any]]:
+        """queries.UNASSIGN_CARGO_QUERY 的 $rows：这些货物此前的承运关系要删除"""
+        return [{"cargo_id": cargo_id} for cargo_id in self.unassigned["cargo_id"].tolist()]
+
+    def summary(self) -> Dict[str, Any]:
+        assigned = float(self.assignments["weight"].sum())
+        total = assigned + float(self.unassigned["weight"].sum())
+        return {
+            "assigned": len(self.assignments),
+            "unassigned": len(self.unassigned),
+            "assigned_weight": assigned,
+            "weight_ratio": assigned / total if total else 0.0,
+            "ships_used": len(self.ships),
+            "mean_utilization": float(self.ships["utilization"].mean()) if len(self.ships) else 0.0,
+            "unassigned_reasons": self.unassigned["reason"].value_counts().to_dict(),
+            "seconds": self.seconds,
+        }
+
+
+class CargoAllocator:
+    """
+    把货物分配给船舶：货物类型与船型兼容、单船总重不超过载重吨，
+    货物带有 origin/destination 时，船舶还必须有一条全程可停靠的航线
+
+    先用向量化的二分计数筛掉不可能配载的货物（没有兼容船型、航线不可达、比所有候选船都重），
+    剩下的按重量从大到小做最佳适应装箱（Best-Fit Decreasing）：每件货物装入剩余载重
+    最小但仍装得下的兼容船舶。船舶按 (船型, 靠泊能力等级) 分桶，每桶按剩余载重保存在有序表中。
+    航线上限总是某个港口的靠泊能力，等级不超过上限所在等级的桶里的船舶都满足航线约束，
+    一次装箱为 O(K log n) 次比较，K 为不超过上限的等级数（没有航线约束时只有一个等级）。
+    一艘船的货物可以有不同的起止港，即一次多港挂靠的航次。
+
+    参数:
+    ships: 船舶记录 {"imo", "type", "dwt"}，见 queries.SHIP_CAPACITY_QUERY
+    compatible: 货物类型 -> 可承运船型
+    planner: 用于航线可达性判定的 RoutePlanner，货物没有起止港时可以不给
+    """
+
+    def __init__(self, ships: Iterable[Dict[str, Any]], compatible: Dict[str, Sequence[str]] = COMPATIBLE_SHIP_TYPES,
+                 planner: Optional[RoutePlanner] = None):
+        ships = pd.DataFrame(list(ships), columns=["imo", "type", "dwt"]).dropna(subset=["dwt"])
+        ships = ships.sort_values("dwt", kind="stable").reset_index(drop=True)
+        self.ships = ships
+        self.compatible = {cargo_type: tuple(ship_types) for cargo_type, ship_types in compatible.items()}
+        self.planner = planner
+        self.ship_dwt = ships["dwt"].to_numpy(dtype=np.float64)
+        # 靠泊能力等级，与 RoutePlanner.dwt_class 相同：载重吨不超过 levels[k] 的船舶等级不超过 k
+        self.levels = planner.levels if planner is not None else np.zeros(0)
+        self.ship_class = np.searchsorted(self.levels, self.ship_dwt, side="left")
+        # 船型 -> 该船型船舶在 self.ships 中的下标（按载重吨升序）
+        self._by_type: Dict[str, np.ndarray] = {
+            ship_type: index.to_numpy() for ship_type, index in ships.groupby("type", sort=False).groups.items()
+        }
+
+    @classmethod
+    def from_csv(cls, ships_file, batch_size=10000, staging=None, **kwargs):
+        ships = [{"imo": row["imo"], "type": row["type"], "dwt": row["dwt"]}
+                 for batch in read_batches(SHIPS, ships_file, batch_size, staging) for row in batch]
+        return cls(ships, **kwargs)
+
+    @staticmethod
+    def read_cargo(cargo_file, batch_size=10000, staging=None) -> pd.DataFrame:
+        return pd.DataFrame([row for batch in read_batches(CARGO, cargo_file, batch_size, staging)
+                             for row in batch])
+
+    def _lane_limits(self, cargo: pd.DataFrame) -> np.ndarray:
+        """每件货物允许的最大载重吨：起止港之间全程可停靠的上限，没有起止港时为 inf"""
+        limits = np.full(len(cargo), np.inf)
+        if self.planner is None or "origin" not in cargo or "destination" not in cargo:
+            return limits
+        index = self.planner.graph.index
+        has_lane = cargo["origin"].notna().to_numpy() & cargo["destination"].notna().to_numpy()
+        limits[has_lane] = -np.inf
+        for origin, group in cargo[has_lane].groupby("origin", sort=False):
+            if origin not in index:
+                continue
+            bottleneck = self.planner.bottleneck_capacity(origin)
+            targets = group["destination"].map(index)
+            known = targets.notna().to_numpy()
+            rows = group.index.to_numpy()[known]
+            limits[rows] = bottleneck[targets[known].to_numpy(dtype=np.int64)]
+        return limits
+
+    def _candidates(self, cargo_types: np.ndarray, weights: np.ndarray, limits: np.ndarray) -> np.ndarray:
+        """每件货物载重吨落在 [重量, 上限] 内的兼容船舶数"""
+        counts = np.zeros(len(weights), dtype=np.int64)
+        for cargo_type, ship_types in self.compatible.items():
+            mask = cargo_types == cargo_type
+            if not mask.any():
+                continue
+            for ship_type in ship_types:
+                index = self._by_type.get(ship_type)
+                if index is None:
+                    continue
+                dwt = self.ship_dwt[index]
+                counts[mask] += (np.searchsorted(dwt, limits[mask], side="right")
+                                 - np.searchsorted(dwt, weights[mask], side="left")).clip(min=0)
+        return counts
+
+    def allocate(self, cargo) -> Allocation:
+        """
+        参数:
+        cargo: 货物记录或 DataFrame，列 id, type, weight，可选 origin, destination（港口代码）
+        """
+        start = time.perf_counter()
+        cargo = pd.DataFrame(cargo).reset_index(drop=True)
+        if cargo.empty:
+            # 空的货物清单（如图中没有 Cargo 节点）可能连列都没有
+            cargo = cargo.reindex(columns=list(dict.fromkeys(["id", "type", "weight", *cargo.columns])))
+        cargo_types = cargo["type"].to_numpy(dtype=object)
+        weights = cargo["weight"].to_numpy(dtype=np.float64)
+        limits = self._lane_limits(cargo)
+
+        # 向量化可行性筛选
+        reasons = np.full(len(cargo), None, dtype=object)
+        known_type = cargo["type"].isin(list(self.compatible)).to_numpy()
+        no_lane = known_type & (limits == -np.inf)
+        too_heavy = known_type & ~no_lane & (self._candidates(cargo_types, weights, limits) == 0)
+        reasons[~known_type] = NO_SHIP_TYPE
+        reasons[no_lane] = NO_LANE
+        reasons[too_heavy] = TOO_HEAVY
+
+        # 最佳适应装箱：每种船型、每个靠泊能力等级一个按 (剩余载重, 载重吨, 船舶下标) 排序的表
+        remaining = self.ship_dwt.tolist()
+        ship_class = self.ship_class.tolist()
+        bins: Dict[str, List[List[Tuple[float, float, int]]]] = {}
+        for ship_type, index in self._by_type.items():
+            buckets = bins[ship_type] = [[] for _ in range(len(self.levels) + 1)]
+            for i in index.tolist():
+                buckets[ship_class[i]].append((remaining[i], remaining[i], i))
+            for ship_list in buckets:
+                ship_list.sort()
+        assigned_ship = np.full(len(cargo), -1, dtype=np.int64)
+        candidates = np.flatnonzero(known_type & ~no_lane & ~too_heavy)
+        order = candidates[np.argsort(-weights[candidates], kind="stable")]
+        top_classes = np.searchsorted(self.levels, limits[order], side="left").tolist()
+        for row, cargo_type, weight, top_class in zip(order.tolist(), cargo_types[order].tolist(),
+                                                      weights[order].tolist(), top_classes):
+            best_list, best_j = None, -1
+            for ship_type in self.compatible[cargo_type]:
+                type_list, type_j = None, -1
+                # 剩余载重升序，各等级表中第一条装得下的取最小者就是该船型的最佳适应
+                for ship_list in bins.get(ship_type, ())[:top_class + 1]:
+                    j = bisect_left(ship_list, (weight,))
+                    if j < len(ship_list) and (type_list is None or ship_list[j] < type_list[type_j]):
+                        type_list, type_j = ship_list, j
+                if type_list is not None and (best_list is None or type_list[type_j][0] < best_list[best_j][0]):
+                    best_list, best_j = type_list, type_j
+            if best_list is None:
+                reasons[row] = NO_CAPACITY
+                continue
+            _, dwt, ship = best_list.pop(best_j)
+            remaining[ship] -= weight
+            insort(best_list, (remaining[ship], dwt, ship))
+            assigned_ship[row] = ship
+
+        done = assigned_ship >= 0
+        assignments = pd.DataFrame({
+            "cargo_id": cargo["id"].to_numpy()[done],
+            "imo": self.ships["imo"].to_numpy()[assigned_ship[done]],
+            "weight": cargo["weight"].to_numpy()[done],
+        })
+        unassigned = pd.DataFrame({
+            "cargo_id": cargo["id"].to_numpy()[~done],
+            "type": cargo_types[~done],
+            "weight": cargo["weight"].to_numpy()[~done],
+            "reason": reasons[~done],
+        })
+        used = np.unique(assigned_ship[done])
+        ships = self.ships.iloc[used].copy()
+        ships["load"] = self.ship_dwt[used] - np.asarray(remaining)[used]
+        ships["utilization"] = ships["load"] / ships["dwt"]
+        return Allocation(assignments, unassigned, ships.reset_index(drop=True), time.perf_counter() - start)
@@ -0,0 +1,253 @@
+# src/analytics.py
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .snapshot import Adjacency, GraphSnapshot
+
+
+def _require_unipartite(adjacency: Adjacency):
+    if adjacency.start_label != adjacency.end_label:
+        raise ValueError(f"需要同一标签之间的关系，实际为 {adjacency.start_label} -> {adjacency.end_label}")
+    return len(adjacency.offsets) - 1
+
+
+def _edge_ranges(offsets: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """nodes 中各节点出边在 CSR 中的下标，按 nodes 的顺序拼接"""
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    shift = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return shift + np.arange(total)
+
+
+def pagerank(adjacency: Adjacency, damping: float = 0.85, weighted: bool = False,
+             tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """
+    幂迭代 PageRank，每轮一次 bincount
+
+    weighted=True 时按边权（如航线距离）的倒数分配转移概率，否则按重复边条数；
+    没有出边的节点把得分均匀分给所有节点。
+    """
+    n = _require_unipartite(adjacency)
+    if n == 0:
+        return np.zeros(0)
+    sources = adjacency.sources()
+    targets = np.asarray(adjacency.targets, dtype=np.int64)
+    if weighted and adjacency.weights is not None:
+        weights = 1.0 / np.maximum(np.nan_to_num(np.asarray(adjacency.weights), nan=1.0), 1e-12)
+    else:
+        weights = np.asarray(adjacency.counts, dtype=np.float64)
+    out_weight = np.bincount(sources, weights=weights, minlength=n)
+    transition = weights / out_weight[sources]
+    dangling = out_weight == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = np.bincount(targets, weights=rank[sources] * transition, minlength=n)
+        new = damping * (spread + rank[dangling].sum() / n) + (1 - damping) / n
+        converged = np.abs(new - rank).sum() < tol
+        rank = new
+        if converged:
+            break
+    return rank
+
+
+def weakly_connected_components(adjacency: Adjacency) -> np.ndarray:
+    """
+    忽略方向的连通分量，返回每个节点的分量编号（按分量大小降序编号，0 为最大分量）
+
+    向量化的最小标签传播加指针跳跃，迭代次数与分量直径的对数同阶。
+    """
+    n = _require_unipartite(adjacency)
+    sources = adjacency.sources()
+    targets = np.asarray(adjacency.targets, dtype=np.int64)
+    labels = np.arange(n)
+    while True:
+        smallest = np.minimum(labels[sources], labels[targets])
+        updated = labels.copy()
+        np.minimum.at(updated, sources, smallest)
+        np.minimum.at(updated, targets, smallest)
+        while True:  # 指针跳跃：标签指向的节点的标签
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return _relabel_by_size(labels)
+
+
+def strongly_connected_components(adjacency: Adjacency) -> np.ndarray:
+    """强连通分量（迭代版 Tarjan 算法，O(V + E)），编号规则同 weakly_connected_components"""
+    n = _require_unipartite(adjacency)
+    offsets = np.asarray(adjacency.offsets).tolist()
+    targets = np.asarray(adjacency.targets).tolist()
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    labels = [-1] * n
+    stack = []
+    counter = component = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, offsets[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            v, e = work[-1]
+            if e < offsets[v + 1]:
+                work[-1] = (v, e + 1)
+                w = targets[e]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, offsets[w]))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    labels[w] = component
+                    if w == v:
+                        break
+                component += 1
+    return _relabel_by_size(np.asarray(labels, dtype=np.int64))
+
+
+def _relabel_by_size(labels: np.ndarray) -> np.ndarray:
+    if len(labels) == 0:
+        return labels
+    _, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(counts), dtype=np.int64)
+    rank[np.argsort(-counts, kind="stable")] = np.arange(len(counts))
+    return rank[inverse]
+
+
+def betweenness(adjacency: Adjacency, samples: Optional[int] = None, seed: int = 0,
+                normalized: bool = True) -> np.ndarray:
+    """
+    按跳数计的介数中心性（Brandes 算法）
+
+    samples 给出时只从随机抽取的这么多个源点出发并按 n / samples 放大，得到无偏估计；
+    每个源点的广度优先搜索和依赖回传都按层向量化。
+    """
+    n = _require_unipartite(adjacency)
+    offsets = np.asarray(adjacency.offsets, dtype=np.int64)
+    targets = np.asarray(adjacency.targets, dtype=np.int64)
+    if samples is None or samples >= n:
+        sources = np.arange(n)
+    else:
+        sources = np.random.default_rng(seed).choice(n, size=samples, replace=False)
+    centrality = np.zeros(n)
+    for s in sources.tolist():
+        dist = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        dist[s], sigma[s] = 0, 1.0
+        frontier = np.array([s])
+        levels = []
+        depth = 0
+        while len(frontier):
+            edges = _edge_ranges(offsets, frontier)
+            parents = np.repeat(frontier, offsets[frontier + 1] - offsets[frontier])
+            children = targets[edges]
+            fresh = children[dist[children] == -1]
+            dist[fresh] = depth + 1
+            on_path = dist[children] == depth + 1
+            parents, children = parents[on_path], children[on_path]
+            np.add.at(sigma, children, sigma[parents])
+            levels.append((parents, children))
+            frontier = np.unique(fresh)
+            depth += 1
+        delta = np.zeros(n)
+        for parents, children in reversed(levels):
+            np.add.at(delta, parents, sigma[parents] / sigma[children] * (1 + delta[children]))
+        delta[s] = 0
+        centrality += delta
+    if len(sources) and len(sources) < n:
+        centrality *= n / len(sources)
+    if normalized and n > 2:
+        centrality /= (n - 1) * (n - 2)
+    return centrality
+
+
+def port_centrality(snapshot: GraphSnapshot, relation: str = "routes", samples: Optional[int] = 256,
+                    seed: int = 0) -> pd.DataFrame:
+    """航线网络中每个港口的度、PageRank、（抽样）介数和所属连通分量，按 PageRank 降序"""
+    adjacency = snapshot[relation]
+    n = _require_unipartite(adjacency)
+    in_degree = np.bincount(np.asarray(adjacency.targets, dtype=np.int64), minlength=n)
+    table = pd.DataFrame({
+        "code": snapshot.nodes[adjacency.start_label],
+        "out_degree": adjacency.degree(),
+        "in_degree": in_degree,
+        "pagerank": pagerank(adjacency),
+        "betweenness": betweenness(adjacency, samples, seed),
+        "weak_component": weakly_connected_components(adjacency),
+        "strong_component": strongly_connected_components(adjacency),
+    })
+    return table.sort_values("pagerank", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def company_ports(snapshot: GraphSnapshot, ownership: str = "ownership", visits: str = "visits") -> np.ndarray:
+    """公司 × 港口的挂靠次数矩阵：公司旗下所有船舶在各港口的挂靠次数之和"""
+    owns, visited = snapshot[ownership], snapshot[visits]
+    companies = len(owns.offsets) - 1
+    ports = len(snapshot.nodes[visited.end_label])
+    ships = np.asarray(owns.targets, dtype=np.int64)
+    owners = owns.sources()
+    visit_offsets = np.asarray(visited.offsets, dtype=np.int64)
+    edges = _edge_ranges(visit_offsets, ships)
+    companies_per_edge = np.repeat(owners, visit_offsets[ships + 1] - visit_offsets[ships])
+    matrix = np.zeros((companies, ports))
+    np.add.at(matrix, (companies_per_edge, np.asarray(visited.targets, dtype=np.int64)[edges]),
+              np.asarray(visited.counts, dtype=np.float64)[edges])
+    return matrix
+
+
+def fleet_overlap(snapshot: GraphSnapshot, top: int = 20, block_size: int = 1024) -> pd.DataFrame:
+    """
+    公司两两之间船队挂靠港口的重叠度（Jaccard），返回重叠度最高的 top 对
+
+    公司 × 港口的挂靠矩阵按行分块与自身转置相乘，只保留每块的前 top 对，内存与公司数线性相关。
+    """
+    footprint = (company_ports(snapshot) > 0).astype(np.float32)
+    port_counts = footprint.sum(axis=1)
+    codes = snapshot.nodes[snapshot["ownership"].start_label]
+    best = []
+    for start in range(0, len(footprint), block_size):
+        block = footprint[start:start + block_size]
+        shared = block @ footprint.T
+        rows, cols = np.nonzero(np.triu(shared, k=start + 1))  # 只取全局编号 a < b 的公司对
+        if not len(rows):
+            continue
+        union = port_counts[rows + start] + port_counts[cols] - shared[rows, cols]
+        jaccard = shared[rows, cols] / union
+        keep = np.argsort(-jaccard, kind="stable")[:top]
+        best.extend(zip((rows + start)[keep].tolist(), cols[keep].tolist(),
+                        shared[rows, cols][keep].tolist(), jaccard[keep].tolist()))
+    best.sort(key=lambda item: (-item[3], -item[2]))
+    best = best[:top]
+    return pd.DataFrame({
+        "company_a": [codes[a] for a, _, _, _ in best],
+        "company_b": [codes[b] for _, b, _, _ in best],
+        "shared_ports": [int(s) for _, _, s, _ in best],
+        "ports_a": [int(port_counts[a]) for a, _, _, _ in best],
+        "ports_b": [int(port_counts[b]) for _, b, _, _ in best],
+        "jaccard": [j for _, _, _, j in best],
+    })
@@ -0,0 +1,251 @@
+# src/async_graph.py
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from . import sources
+from .cache import is_read_only
+from .database import create_async_driver
+from .queries import PORTS_FOR_SHIP_QUERY, ROUTE_EDGES_QUERY
+from .routing import RouteGraph
+from .staging import read_batches
+
+
+async def _run_write(tx, query, rows):
+    result = await tx.run(query, rows=rows)
+    await result.consume()
+
+
+async def _next_batch(batches):
+    """在线程中解析下一批CSV，避免阻塞事件循环"""
+    return await asyncio.to_thread(next, batches, None)
+
+
+class AsyncNeo4jConnection:
+    """Neo4jConnection 的 asyncio 版本，基于 neo4j 异步 driver"""
+
+    def __init__(self, driver=None, cache=None, metrics=None):
+        self.driver = driver  # 注入的共享 driver 由调用方负责关闭
+        self._owns_driver = driver is None
+        self.cache = cache
+        self.metrics = metrics
+
+    def connect(self):
+        if self.driver is None:
+            self.driver = create_async_driver()
+            self._owns_driver = True
+        return self.driver
+
+    async def close(self):
+        if self.driver is not None and self._owns_driver:
+            await self.driver.close()
+            self.driver = None
+
+    async def __aenter__(self):
+        self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run(self, query, parameters=None):
+        self.connect()
+        async with self.driver.session() as session:
+            if self.metrics is not None:
+                return await self.metrics.execute_async(session.run, query, parameters)
+            result = await session.run(query, parameters)
+            return await result.data()
+
+    async def execute_query(self, query, parameters=None):
+        """执行Cypher查询"""
+        if self.cache is None:
+            return await self._run(query, parameters)
+        if is_read_only(query):
+            return await self.cache.get_or_load_async(query, parameters, lambda: self._run(query, parameters))
+        try:
+            return await self._run(query, parameters)
+        finally:
+            self.cache.invalidate()
+
+
+class AsyncShippingKnowledgeGraph:
+    """
+    ShippingKnowledgeGraph 的 asyncio 版本
+
+    导入时多个批次同时在途（流水线），一个事件循环即可服务大量并发的
+    航线和查找请求，不需要为每个请求占用一个线程。
+    """
+
+    def __init__(self, uri, user, password, batch_size=1000, concurrency=4, cache=None,
+                 driver=None, staging=None, metrics=None, **pool_config):
+        self._owns_driver = driver is None
+        self.driver = driver if driver is not None else create_async_driver(uri, user, password, **pool_config)
+        self.batch_size = batch_size
+        self.concurrency = concurrency  # 同时在途的写入批次数
+        self.cache = cache
+        self.staging = staging  # 可选的 src.staging.StagingCache
+        self.metrics = metrics  # 可选的 src.metrics.QueryMetrics
+        self._route_graph: Optional[RouteGraph] = None
+        self._route_graph_lock = asyncio.Lock()
+
+    async def close(self):
+        if self._owns_driver:
+            await self.driver.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _run_query(self, query, parameters=None):
+        async with self.driver.session() as session:
+            if self.metrics is not None:
+                return await self.metrics.execute_async(session.run, query, parameters)
+            result = await session.run(query, parameters or {})
+            return await result.data()
+
+    async def _execute_query(self, query, parameters=None):
+        if self.cache is None:
+            return await self._run_query(query, parameters)
+        if is_read_only(query):
+            return await self.cache.get_or_load_async(query, parameters,
+                                                      lambda: self._run_query(query, parameters))
+        try:
+            return await self._run_query(query, parameters)
+        finally:
+            self.cache.invalidate()
+
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    async def _write_batch(self, query, rows):
+        async with self.driver.session() as session:
+            if self.metrics is not None:
+                await session.execute_write(
+                    lambda tx: self.metrics.execute_async(tx.run, query, {"rows": rows}, len(rows)))
+            else:
+                await session.execute_write(_run_write, query, rows)
+
+    async def _import_batches(self, spec, file_path, batch_size=None, concurrency=None):
+        """
+        流水线导入：CSV在线程中逐批解析，最多 concurrency 个批次同时写入
+
+        定义了 partition_key 的关系数据源按该键分区，每个分区由一个协程顺序写入，
+        分区键一端的节点不会被两个并发事务同时加锁（另一端偶发的死锁由 execute_write 重试）。
+        没有 partition_key 的数据源与 ShippingKnowledgeGraph 一样顺序写入：
+        ROUTES 两端都是 Port、SHIPS 同时 MERGE OWNS 到 Company，批次并发写入会互相死锁。
+        """
+        batch_size = batch_size or self.batch_size
+        concurrency = (concurrency or self.concurrency) if spec.partition_key else 1
+        batches = read_batches(spec, file_path, batch_size, self.staging)
+        start = time.perf_counter()
+        queues = [asyncio.Queue(maxsize=2) for _ in range(concurrency)]
+        written = [0] * concurrency
+
+        async def writer(index):
+            while True:
+                rows = await queues[index].get()
+                if rows is None:
+                    return
+                start = time.perf_counter()
+                await self._write_batch(spec.query, rows)
+                if self.metrics is not None:
+                    self.metrics.record_batch(spec.name, time.perf_counter() - start, len(rows))
+                written[index] += len(rows)
+
+        async def dispatch():
+            buffers = [[] for _ in range(concurrency)]
+            while True:
+                batch = await _next_batch(batches)
+                if batch is None:
+                    break
+                if spec.partition_key is None:
+                    await queues[0].put(batch)
+                    continue
+                for row in batch:
+                    index = hash(row[spec.partition_key]) % concurrency
+                    buffers[index].append(row)
+                    if len(buffers[index]) >= batch_size:
+                        await queues[index].put(buffers[index])
+                        buffers[index] = []
+            for index, rows in enumerate(buffers):
+                if rows:
+                    await queues[index].put(rows)
+            for q in queues:
+                await q.put(None)
+
+        tasks = [asyncio.create_task(dispatch())]
+        tasks += [asyncio.create_task(writer(i)) for i in range(concurrency)]
+        try:
+            # 任一协程失败时 gather 立即抛出，finally 中取消其余协程
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._invalidate_cache()
+            if spec is sources.ROUTES:
+                self._route_graph = None
+        count = sum(written)
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else float("inf")
+        print(f"{spec.name}: 写入 {count} 行，耗时 {elapsed:.2f} 秒，{rate:.0f} 行/秒")
+        return count
+
+    async def import_source(self, name, file_path, batch_size=None, concurrency=None):
+        """导入一个数据源，name 为 sources.SOURCES 中的键"""
+        return await self._import_batches(sources.SOURCES[name], file_path, batch_size, concurrency)
+
+    async def import_all(self, files: Dict[str, str]) -> Dict[str, int]:
+        """按 sources.DEPENDENCIES 并发导入：每个数据源等待其依赖完成后立即开始"""
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(name):
+            await asyncio.gather(*(tasks[dep] for dep in sources.DEPENDENCIES[name] if dep in tasks))
+            return await self.import_source(name, files[name])
+
+        for name in sources.DEPENDENCIES:
+            if name in files:
+                tasks[name] = asyncio.ensure_future(run(name))
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(tasks, results))
+
+    async def load_route_graph(self) -> RouteGraph:
+        graph = RouteGraph(await self._execute_query(ROUTE_EDGES_QUERY))
+        self._route_graph = graph
+        return graph
+
+    async def route_graph(self) -> RouteGraph:
+        # 并发的首批请求只触发一次加载
+        async with self._route_graph_lock:
+            if self._route_graph is None:
+                await self.load_route_graph()
+        return self._route_graph
+
+    async def find_optimal_route(self, from_port_code, to_port_code, weight="rating") -> Optional[Dict[str, Any]]:
+        """在内存航线网络上求加权最短路径，航线网络只在首次调用时从数据库加载"""
+        graph = await self.route_graph()
+        try:
+            route = graph.shortest_path(from_port_code, to_port_code, weight)
+        except KeyError:
+            return None
+        return route.to_dict() if route else None
+
+    async def find_alternative_routes(self, from_port_code, to_port_code, k=3,
+                                      weight="rating") -> List[Dict[str, Any]]:
+        graph = await self.route_graph()
+        try:
+            routes = graph.k_shortest_paths(from_port_code, to_port_code, k, weight)
+        except KeyError:
+            return []
+        return [route.to_dict() for route in routes]
+
+    async def ports_for_ship(self, imo) -> List[str]:
+        """这艘船可以停靠的港口代码（数据库端范围索引查询）"""
+        return [row["code"] for row in await self._execute_query(PORTS_FOR_SHIP_QUERY, {"imo": imo})]
@@ -0,0 +1,230 @@
+# src/backend.py
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import queries
+from .maintenance import _quote, clear_graph, convert_visit_times
+from .schema import ensure_schema
+from .snapshot import Relation, edge_query, node_keys_query
+from .sources import SourceSpec
+
+
+class GraphBackend(ABC):
+    """
+    图存储后端接口
+
+    ShippingKnowledgeGraph 的导入、同步、清理、航线和可停靠查询只通过这些操作访问存储，
+    Neo4jBackend 把它们翻译成项目已有的Cypher语句，MemoryGraph 在进程内按相同语义执行。
+    """
+
+    @abstractmethod
+    def write(self, spec: SourceSpec, rows: List[Dict[str, Any]]) -> None:
+        """按 spec.query 的语义合并一批行"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, spec: SourceSpec, rows: List[Dict[str, Any]]) -> None:
+        """按 spec.delete_query 的语义删除一批实体，rows 中每行只含 spec.key 字段"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def materialize_can_dock(self, rows: List[Dict[str, Any]]) -> None:
+        """为 {"imo", "port_code"} 配对建立 CAN_DOCK 关系，属性取自两端节点"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def assign_cargo(self, rows: List[Dict[str, Any]]) -> None:
+        """为 {"imo", "cargo_id", "weight"} 建立 CARRIES 关系，每件货物只保留一艘承运船舶"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def unassign_cargo(self, rows: List[Dict[str, Any]]) -> None:
+        """删除 {"cargo_id"} 货物的 CARRIES 关系"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def route_edges(self) -> List[Dict[str, Any]]:
+        """全部 ROUTE 边，字段同 queries.ROUTE_EDGES_QUERY"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def ship_dwt(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def port_capacity(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def ship_capacity(self) -> List[Dict[str, Any]]:
+        """{"imo", "type", "dwt"}，字段同 queries.SHIP_CAPACITY_QUERY"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def cargo_manifest(self) -> List[Dict[str, Any]]:
+        """{"id", "type", "weight"}，字段同 queries.CARGO_QUERY"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def port_attributes(self) -> List[Dict[str, Any]]:
+        """全部港口的 {"code", "congestion", "max_dwt"}，字段同 queries.PORT_ATTRIBUTES_QUERY"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def ports_for_ship(self, imo) -> List[Dict[str, Any]]:
+        """能停靠这艘船的港口 {"code", "max_dwt"}，按 max_dwt 升序"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def visits(self) -> List[Dict[str, Any]]:
+        """全部 VISITED 关系 {"imo", "port_code", "arrival", "departure"}，字段同 queries.VISITS_QUERY"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def max_dwell_seconds(self) -> Optional[float]:
+        """全部挂靠中最长的停靠时长（秒），没有挂靠时为 None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def port_occupancy(self, port_code, earliest: datetime, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """
+        到达时间在 [earliest, end) 内、离开晚于 start 的挂靠 {"imo", "arrival", "departure", "duration"}，
+        按到达时间排序，字段同 queries.PORT_OCCUPANCY_QUERY
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def ship_itinerary(self, imo, start: Optional[datetime], end: Optional[datetime]) -> List[Dict[str, Any]]:
+        """船舶在 [start, end) 内到达的挂靠，字段同 queries.SHIP_ITINERARY_QUERY；为 None 的边界不限制"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def dwell_time(self, port_code, start: datetime, end: datetime) -> Dict[str, Any]:
+        """[start, end) 内到达该港口的挂靠次数及停靠时长统计（小时），字段同 queries.DWELL_TIME_QUERY"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def relationship_count(self, rel_type: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def node_keys(self, label: str, key: str) -> Iterable:
+        """逐个产出该标签全部节点的合并键，供 src.snapshot 流式构建快照"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def edge_pairs(self, relation: Relation) -> Iterable[Tuple]:
+        """逐条产出该关系的 (起点键, 终点键, 边权)，没有边权时为 None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self, labels: Optional[Iterable[str]] = None, rel_types: Optional[Iterable[str]] = None,
+              batch_size: int = 10000) -> Dict[str, int]:
+        """语义同 src.maintenance.clear_graph"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def convert_visit_times(self, batch_size: int = 10000) -> int:
+        """把以字符串保存的挂靠时间转换为 LocalDateTime，返回转换的关系数"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def ensure_schema(self, timeout: int = 300) -> List[str]:
+        """确保合并键上有唯一约束/索引，返回约束和索引名"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class Neo4jBackend(GraphBackend):
+    """
+    基于 Neo4j 的后端
+
+    参数:
+    run: 执行查询的函数 run(query, parameters=None) -> list[dict]
+    write: 在写事务中执行 UNWIND 批量语句的函数 write(query, rows)
+    stream: 逐条产出结果值元组的函数 stream(query, parameters=None)，不给出时退回 run
+    """
+
+    def __init__(self, run: Callable, write: Callable, stream: Optional[Callable] = None):
+        self._run = run
+        self._write = write
+        self._stream = stream
+
+    def write(self, spec, rows):
+        self._write(spec.query, rows)
+
+    def delete(self, spec, rows):
+        self._write(spec.delete_query, rows)
+
+    def materialize_can_dock(self, rows):
+        self._write(queries.MATERIALIZE_CAN_DOCK_QUERY, rows)
+
+    def assign_cargo(self, rows):
+        self._write(queries.CARRIES_QUERY, rows)
+
+    def unassign_cargo(self, rows):
+        self._write(queries.UNASSIGN_CARGO_QUERY, rows)
+
+    def route_edges(self):
+        return self._run(queries.ROUTE_EDGES_QUERY)
+
+    def ship_dwt(self):
+        return self._run(queries.SHIP_DWT_QUERY)
+
+    def port_capacity(self):
+        return self._run(queries.PORT_CAPACITY_QUERY)
+
+    def ship_capacity(self):
+        return self._run(queries.SHIP_CAPACITY_QUERY)
+
+    def cargo_manifest(self):
+        return self._run(queries.CARGO_QUERY)
+
+    def port_attributes(self):
+        return self._run(queries.PORT_ATTRIBUTES_QUERY)
+
+    def ports_for_ship(self, imo):
+        return self._run(queries.PORTS_FOR_SHIP_QUERY, {"imo": imo})
+
+    def visits(self):
+        return self._run(queries.VISITS_QUERY)
+
+    def max_dwell_seconds(self):
+        rows = self._run(queries.MAX_DWELL_QUERY)
+        return rows[0]["seconds"] if rows else None
+
+    def port_occupancy(self, port_code, earliest, start, end):
+        return self._run(queries.PORT_OCCUPANCY_QUERY, {"port_code": port_code, "earliest": earliest,
+                                                        "start": start, "end": end})
+
+    def ship_itinerary(self, imo, start, end):
+        return self._run(queries.SHIP_ITINERARY_QUERY, {"imo": imo, "start": start, "end": end})
+
+    def dwell_time(self, port_code, start, end):
+        return self._run(queries.DWELL_TIME_QUERY, {"port_code": port_code, "start": start, "end": end})[0]
+
+    def relationship_count(self, rel_type):
+        return self._run(f"MATCH ()-[r:{_quote(rel_type)}]->() RETURN count(r) AS cnt")[0]["cnt"]
+
+    def _values(self, query):
+        if self._stream is not None:
+            return self._stream(query)
+        return (tuple(row.values()) for row in self._run(query))
+
+    def node_keys(self, label, key):
+        return (values[0] for values in self._values(node_keys_query(label, key)))
+
+    def edge_pairs(self, relation):
+        return self._values(edge_query(relation))
+
+    def clear(self, labels=None, rel_types=None, batch_size=10000):
+        return clear_graph(self._run, labels, rel_types, batch_size)
+
+    def convert_visit_times(self, batch_size=10000):
+        return convert_visit_times(self._run, batch_size)
+
+    def ensure_schema(self, timeout=300):
+        return ensure_schema(self._run, timeout=timeout)
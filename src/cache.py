@@ -0,0 +1,146 @@
+# src/cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# 出现这些子句的语句会修改数据库（SHOW 读取的是会变化的系统状态），
+# 既不缓存，也会让已有缓存失效
+_WRITE_CLAUSES = re.compile(
+    r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|FOREACH|LOAD\s+CSV|CALL|SHOW)\b",
+    re.IGNORECASE,
+)
+
+
+def is_read_only(query: str) -> bool:
+    """粗略判断Cypher语句是否只读且可缓存；含 CALL/SHOW 的语句一律按写入处理"""
+    return _WRITE_CLAUSES.search(query) is None
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class QueryCache:
+    """
+    只读查询结果缓存，按 (查询, 参数) 作键
+
+    超过 maxsize 时淘汰最久未使用的条目，条目写入 ttl 秒后过期。
+    任何经过导入接口的写入都会调用 invalidate() 清空缓存。
+
+    每次 invalidate() 递增 generation：加载前记下的 generation 与写入缓存时不一致，
+    说明加载期间发生过写入，结果可能已过期，不再放入缓存。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError(f"缓存容量必须为正数: {maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_loads = 0  # 因加载期间缓存失效而丢弃的结果数
+
+    @staticmethod
+    def make_key(query: str, parameters: Optional[Dict[str, Any]]) -> Hashable:
+        return query, _freeze(parameters or {})
+
+    def get(self, query, parameters=None):
+        """命中返回 (True, 结果)，未命中返回 (False, None)"""
+        key = self.make_key(query, parameters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, list(value)
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, query, parameters, value, generation: Optional[int] = None) -> bool:
+        """
+        写入缓存；给出 generation 且此后缓存已失效过时不写入
+
+        返回:
+        是否写入
+        """
+        key = self.make_key(query, parameters)
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_loads += 1
+                return False
+            self._entries[key] = (expires, list(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def _lookup(self, query, parameters):
+        """命中返回 (True, 结果, None)，未命中返回 (False, None, 当前 generation)"""
+        with self._lock:
+            generation = self.generation
+        hit, value = self.get(query, parameters)
+        return hit, value, generation
+
+    def get_or_load(self, query, parameters, load: Callable[[], list]):
+        hit, value, generation = self._lookup(query, parameters)
+        if hit:
+            return value
+        value = load()
+        self.put(query, parameters, value, generation)
+        return value
+
+    async def get_or_load_async(self, query, parameters, load: Callable[[], Awaitable[list]]):
+        """get_or_load 的协程版本，load() 返回一个协程"""
+        hit, value, generation = self._lookup(query, parameters)
+        if hit:
+            return value
+        value = await load()
+        self.put(query, parameters, value, generation)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_loads": self.stale_loads,
+            }
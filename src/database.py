@@ -1,33 +1,98 @@
 # src/database.py
-from neo4j import GraphDatabase
-from config.settings import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from config.settings import (NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_MAX_POOL_SIZE,
+                             NEO4J_ACQUISITION_TIMEOUT, NEO4J_MAX_CONNECTION_LIFETIME,
+                             NEO4J_KEEP_ALIVE, NEO4J_MAX_TRANSACTION_RETRY_TIME)
+from .schema import ensure_schema
+from .maintenance import clear_graph
+from .cache import is_read_only
+
+
+def create_driver(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD,
+                  max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                  connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                  max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+                  keep_alive=NEO4J_KEEP_ALIVE,
+                  max_transaction_retry_time=NEO4J_MAX_TRANSACTION_RETRY_TIME):
+    """
+    创建带连接池的 driver
+
+    driver 是线程安全的，应在进程内只创建一个，注入到 ShippingKnowledgeGraph、
+    RelationshipCreator 和 Neo4jConnection 中共享，避免重复握手和多份连接池。
+    并发写入偶发的死锁由 execute_write 在 max_transaction_retry_time 秒内自动重试。
+    """
+    return GraphDatabase.driver(
+        uri,
+        auth=(user, password),
+        max_connection_pool_size=max_connection_pool_size,
+        connection_acquisition_timeout=connection_acquisition_timeout,
+        max_connection_lifetime=max_connection_lifetime,
+        keep_alive=keep_alive,
+        max_transaction_retry_time=max_transaction_retry_time,
+    )
+
+
+def create_async_driver(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD,
+                        max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                        connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                        max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+                        keep_alive=NEO4J_KEEP_ALIVE,
+                        max_transaction_retry_time=NEO4J_MAX_TRANSACTION_RETRY_TIME):
+    """create_driver 的 asyncio 版本，供 src.async_graph 使用"""
+    return AsyncGraphDatabase.driver(
+        uri,
+        auth=(user, password),
+        max_connection_pool_size=max_connection_pool_size,
+        connection_acquisition_timeout=connection_acquisition_timeout,
+        max_connection_lifetime=max_connection_lifetime,
+        keep_alive=keep_alive,
+        max_transaction_retry_time=max_transaction_retry_time,
+    )
 
 
 class Neo4jConnection:
-    def __init__(self):
-        self.driver = None
+    def __init__(self, driver=None, cache=None, metrics=None):
+        self.driver = driver  # 注入的共享 driver 由调用方负责关闭
+        self._owns_driver = driver is None
+        self.cache = cache  # 可选的只读查询缓存（QueryCache），写入语句会清空它
+        self.metrics = metrics  # 可选的语句指标（src.metrics.QueryMetrics）
 
     def connect(self):
-        self.driver = GraphDatabase.driver(
-            NEO4J_URI,
-            auth=(NEO4J_USER, NEO4J_PASSWORD)
-        )
+        if self.driver is None:
+            self.driver = create_driver()
+            self._owns_driver = True
         return self.driver
 
     def close(self):
-        if self.driver is not None:
+        if self.driver is not None and self._owns_driver:
             self.driver.close()
+            self.driver = None
 
-    def execute_query(self, query, parameters=None):
-        """执行Cypher查询"""
+    def _run(self, query, parameters=None):
         if self.driver is None:
             self.connect()
 
         with self.driver.session() as session:
+            if self.metrics is not None:
+                return self.metrics.execute(session.run, query, parameters)
             result = session.run(query, parameters)
             return result.data()
 
-    def clear_database(self):
-        """清空数据库中的所有节点和关系"""
-        query = "MATCH (n) DETACH DELETE n"
-        self.execute_query(query)
\ No newline at end of file
+    def execute_query(self, query, parameters=None):
+        """执行Cypher查询"""
+        if self.cache is None:
+            return self._run(query, parameters)
+        if is_read_only(query):
+            return self.cache.get_or_load(query, parameters, lambda: self._run(query, parameters))
+        try:
+            return self._run(query, parameters)
+        finally:
+            self.cache.invalidate()
+
+    def clear_database(self, labels=None, rel_types=None, batch_size=10000):
+        """分批清空数据库中的节点和关系，可只清理指定标签或关系类型"""
+        return clear_graph(self.execute_query, labels, rel_types, batch_size)
+
+    def ensure_schema(self, timeout=300):
+        """创建合并键上的唯一约束和查找索引，并等待其上线"""
+        return ensure_schema(self.execute_query, timeout=timeout)
\ No newline at end of file
@@ -0,0 +1,82 @@
+# src/docking.py
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .sources import PORTS, SHIPS
+from .staging import read_batches
+
+
+class DockingIndex:
+    """
+    船舶-港口可停靠判定：船舶载重吨 <= 港口最大靠泊能力
+
+    港口按最大靠泊能力、船舶按载重吨各排序一次，之后每个查询都是一次
+    二分查找加一段连续切片，O(log n + k)。不再需要导入或物化
+    船舶数 × 港口数 的适配表。
+    """
+
+    def __init__(self, ships: Iterable[Tuple], ports: Iterable[Tuple]):
+        ships, ports = list(ships), list(ports)
+        ship_ids = np.array([imo for imo, _ in ships], dtype=object)
+        ship_dwt = np.array([dwt for _, dwt in ships], dtype=np.float64)
+        order = np.argsort(ship_dwt, kind="stable")
+        self.ship_ids, self.ship_dwt = ship_ids[order], ship_dwt[order]
+        self._ship_dwt = dict(ships)
+
+        port_codes = np.array([code for code, _ in ports], dtype=object)
+        port_capacity = np.array([cap for _, cap in ports], dtype=np.float64)
+        order = np.argsort(port_capacity, kind="stable")
+        self.port_codes, self.port_capacity = port_codes[order], port_capacity[order]
+        self._port_capacity = dict(ports)
+
+    @classmethod
+    def from_csv(cls, ships_file, ports_file, batch_size=10000, staging=None):
+        ships = [(row["imo"], row["dwt"])
+                 for batch in read_batches(SHIPS, ships_file, batch_size, staging) for row in batch]
+        ports = [(row["code"], row["max_dwt"])
+                 for batch in read_batches(PORTS, ports_file, batch_size, staging) for row in batch]
+        return cls(ships, ports)
+
+    @classmethod
+    def from_records(cls, ship_records, port_records):
+        """由 queries.SHIP_DWT_QUERY / PORT_CAPACITY_QUERY 的查询结果构建"""
+        return cls(((r["imo"], r["dwt"]) for r in ship_records),
+                   ((r["code"], r["max_dwt"]) for r in port_records))
+
+    def _dwt(self, imo):
+        if imo not in self._ship_dwt:
+            raise KeyError(f"没有船舶: {imo}")
+        return self._ship_dwt[imo]
+
+    def _capacity(self, port_code):
+        if port_code not in self._port_capacity:
+            raise KeyError(f"没有港口: {port_code}")
+        return self._port_capacity[port_code]
+
+    def ports_for_dwt(self, dwt) -> List[str]:
+        """能停靠给定载重吨船舶的港口，按最大靠泊能力升序"""
+        start = np.searchsorted(self.port_capacity, dwt, side="left")
+        return list(self.port_codes[start:])
+
+    def ports_for_ship(self, imo) -> List[str]:
+        """这艘船可以停靠的港口"""
+        return self.ports_for_dwt(self._dwt(imo))
+
+    def ships_for_port(self, port_code) -> List:
+        """能停靠这个港口的船舶，按载重吨升序"""
+        end = np.searchsorted(self.ship_dwt, self._capacity(port_code), side="right")
+        return list(self.ship_ids[:end])
+
+    def can_dock(self, imo, port_code) -> bool:
+        return self._dwt(imo) <= self._capacity(port_code)
+
+    def compatible_pair_count(self) -> int:
+        """可停靠的船舶-港口对总数，通过一次向量化二分计算，不生成任何配对"""
+        return int(np.searchsorted(self.ship_dwt, self.port_capacity, side="right").sum())
+
+    def pairs(self, imos: Optional[Iterable] = None) -> Iterator[dict]:
+        """逐个生成可停靠的 (船舶, 港口) 配对；imos 为 None 时遍历所有船舶"""
+        for imo in (self.ship_ids if imos is None else imos):
+            for port_code in self.ports_for_ship(imo):
+                yield {"imo": imo, "port_code": port_code}
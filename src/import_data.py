@@ -1,50 +1,104 @@
 # src/import_data.py
-from typing import List
+from typing import List, Union
+
+from .backend import GraphBackend, Neo4jBackend
 from .database import Neo4jConnection
 from .models import Company, Ship
+from .sources import NodeMerge, RelMerge, SourceSpec, iter_chunks
+
+# 按名称合并的模型数据（src.models），与CSV数据源一样整批 UNWIND 写入，
+# 通过 writes 描述的语义也可以写入不执行Cypher的后端（src.memory_backend）
+COMPANY_MODELS = SourceSpec(
+    name="公司模型",
+    columns={},
+    dtypes={},
+    query="""
+    UNWIND $rows AS row
+    MERGE (c:Company {companyName: row.companyName})
+    SET c.establishYear = row.establishYear,
+        c.headquarter = row.headquarter,
+        c.companyType = row.companyType,
+        c.fleetSize = row.fleetSize
+    """,
+    key=("companyName",),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (c:Company {companyName: row.companyName})
+    DETACH DELETE c
+    """,
+    writes=(
+        NodeMerge("Company", ("companyName", "companyName"), {
+            "establishYear": "establishYear",
+            "headquarter": "headquarter",
+            "companyType": "companyType",
+            "fleetSize": "fleetSize",
+        }),
+    ),
+)
+
+# 先合并船舶节点，所属公司已存在时再建立 OWNS 关系
+SHIP_MODELS = SourceSpec(
+    name="船舶模型",
+    columns={},
+    dtypes={},
+    query="""
+    UNWIND $rows AS row
+    MERGE (s:Ship {shipName: row.shipName})
+    SET s.shipType = row.shipType,
+        s.deadweight = row.deadweight,
+        s.length = row.length,
+        s.speed = row.speed,
+        s.buildYear = row.buildYear,
+        s.draft = row.draft
+    WITH s, row
+    MATCH (c:Company {companyName: row.company_name})
+    MERGE (c)-[:OWNS]->(s)
+    """,
+    key=("shipName",),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (s:Ship {shipName: row.shipName})
+    DETACH DELETE s
+    """,
+    writes=(
+        NodeMerge("Ship", ("shipName", "shipName"), {
+            "shipType": "shipType",
+            "deadweight": "deadweight",
+            "length": "length",
+            "speed": "speed",
+            "buildYear": "buildYear",
+            "draft": "draft",
+        }),
+        RelMerge("OWNS", ("Company", "companyName", "company_name"), ("Ship", "shipName", "shipName")),
+    ),
+)
 
 
 class DataImporter:
-    def __init__(self, connection: Neo4jConnection):
-        self.connection = connection
+    """
+    把模型对象批量写入存储后端
+
+    参数:
+    backend: 存储后端（src.backend.GraphBackend）；传入 Neo4jConnection 时包装为 Neo4jBackend
+    batch_size: 每批写入的对象数
+    """
+
+    def __init__(self, backend: Union[GraphBackend, Neo4jConnection], batch_size: int = 1000):
+        if isinstance(backend, Neo4jConnection):
+            connection = backend
+            backend = Neo4jBackend(connection.execute_query,
+                                   lambda query, rows: connection.execute_query(query, {"rows": rows}))
+        self.backend = backend
+        self.batch_size = batch_size
 
     def import_companies(self, companies: List[Company]):
-        """导入公司数据到Neo4j"""
-        for company in companies:
-            query = """
-            MERGE (c:Company {companyName: $companyName})
-            SET c.establishYear = $establishYear,
-                c.headquarter = $headquarter,
-                c.companyType = $companyType,
-                c.fleetSize = $fleetSize
-            RETURN c
-            """
-            self.connection.execute_query(query, company.to_dict())
+        """导入公司数据"""
+        rows = [company.to_dict() for company in companies]
+        for chunk in iter_chunks(rows, self.batch_size):
+            self.backend.write(COMPANY_MODELS, chunk)
 
     def import_ships(self, ships: List[Ship]):
-        """导入船舶数据到Neo4j"""
-        for ship in ships:
-            # 创建船舶节点
-            query = """
-            MERGE (s:Ship {shipName: $shipName})
-            SET s.shipType = $shipType,
-                s.deadweight = $deadweight,
-                s.length = $length,
-                s.speed = $speed,
-                s.buildYear = $buildYear,
-                s.draft = $draft
-            RETURN s
-            """
-            self.connection.execute_query(query, ship.to_dict())
-
-            # 建立公司与船舶的关系
-            relation_query = """
-            MATCH (c:Company {companyName: $company_name}), 
-                  (s:Ship {shipName: $ship_name})
-            MERGE (c)-[:OWNS]->(s)
-            """
-            params = {
-                "company_name": ship.company_name,
-                "ship_name": ship.ship_name
-            }
-            self.connection.execute_query(relation_query, params)
\ No newline at end of file
+        """导入船舶数据，并建立公司与船舶的关系"""
+        rows = [dict(ship.to_dict(), company_name=ship.company_name) for ship in ships]
+        for chunk in iter_chunks(rows, self.batch_size):
+            self.backend.write(SHIP_MODELS, chunk)
@@ -0,0 +1,125 @@
+# src/maintenance.py
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+def _quote(name: str) -> str:
+    """转义标签/关系类型名，防止拼接进Cypher时出错"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _delete_in_batches(run: Callable, count_query: str, delete_query: str,
+                       what: str, batch_size: int) -> int:
+    total = run(count_query)[0]["cnt"]
+    deleted = 0
+    while True:
+        batch = run(delete_query, {"limit": batch_size})[0]["deleted"]
+        if batch == 0:
+            break
+        deleted += batch
+        print(f"已删除 {what} {deleted}/{total}")
+    return deleted
+
+
+def delete_relationships(run: Callable, rel_type: str, batch_size: int = 10000) -> int:
+    """按批删除某一类型的全部关系，每批一个事务"""
+    rel = _quote(rel_type)
+    return _delete_in_batches(
+        run,
+        f"MATCH ()-[r:{rel}]->() RETURN count(r) AS cnt",
+        f"MATCH ()-[r:{rel}]->() WITH r LIMIT $limit DELETE r RETURN count(*) AS deleted",
+        f"{rel_type} 关系",
+        batch_size,
+    )
+
+
+def delete_nodes(run: Callable, label: Optional[str] = None, batch_size: int = 10000) -> int:
+    """
+    按批删除某一标签的全部节点（label 为 None 时删除所有节点）
+
+    先分批删除这些节点上的关系，再分批删除节点本身，
+    避免度数很高的节点（如繁忙港口）让单个 DETACH DELETE 事务过大。
+    """
+    pattern = f"(n:{_quote(label)})" if label else "(n)"
+    what = f"{label} 节点" if label else "节点"
+    _delete_in_batches(
+        run,
+        f"MATCH {pattern}-[r]-() RETURN count(DISTINCT r) AS cnt",
+        f"MATCH {pattern}-[r]-() WITH DISTINCT r LIMIT $limit DELETE r RETURN count(*) AS deleted",
+        f"{what}上的关系",
+        batch_size,
+    )
+    return _delete_in_batches(
+        run,
+        f"MATCH {pattern} RETURN count(n) AS cnt",
+        f"MATCH {pattern} WITH n LIMIT $limit DELETE n RETURN count(*) AS deleted",
+        what,
+        batch_size,
+    )
+
+
+def convert_visit_times(run: Callable, batch_size: int = 10000) -> int:
+    """
+    把早期版本以字符串保存的 VISITED.arrival/departure 按批转换为 LocalDateTime
+
+    增量同步按原始CSV行比较指纹，这些关系不会被重新写入；转换后它们才能走
+    VISITED 上的时间范围索引，并与按 LocalDateTime MERGE 的挂靠视为同一条关系。
+
+    返回:
+    转换的关系数
+    """
+    pending = ("MATCH ()-[r:VISITED]->() "
+               "WHERE r.arrival = toString(r.arrival) OR r.departure = toString(r.departure)")
+    total = run(f"{pending} RETURN count(r) AS cnt")[0]["cnt"]
+    converted = 0
+    while converted < total:
+        batch = run(f"""
+        {pending}
+        WITH r LIMIT $limit
+        SET r.arrival = CASE WHEN r.arrival = toString(r.arrival)
+                             THEN localdatetime(replace(r.arrival, ' ', 'T')) ELSE r.arrival END,
+            r.departure = CASE WHEN r.departure = toString(r.departure)
+                               THEN localdatetime(replace(r.departure, ' ', 'T')) ELSE r.departure END
+        RETURN count(*) AS converted
+        """, {"limit": batch_size})[0]["converted"]
+        if batch == 0:
+            break
+        converted += batch
+        print(f"已转换 VISITED 时间 {converted}/{total}")
+    return converted
+
+
+def clear_graph(run: Callable, labels: Optional[Iterable[str]] = None,
+                rel_types: Optional[Iterable[str]] = None,
+                batch_size: int = 10000) -> Dict[str, int]:
+    """
+    分批清理图数据，替代单事务的 MATCH (n) DETACH DELETE n
+
+    参数:
+    run: 执行Cypher的函数，签名为 run(query, parameters=None) -> list[dict]
+    labels: 只删除这些标签的节点（连同其关系）
+    rel_types: 只删除这些类型的关系，如 ["VISITED"]
+    batch_size: 每个事务最多删除的节点/关系数
+
+    labels 和 rel_types 都为 None 时清空整个数据库。
+
+    返回:
+    标签/关系类型 -> 删除数量
+    """
+    start = time.perf_counter()
+    deleted = {}
+    wipe_all = labels is None and rel_types is None
+    if wipe_all:
+        rel_types = [row["relationshipType"] for row in run("CALL db.relationshipTypes()")]
+        labels = [row["label"] for row in run("CALL db.labels()")]
+
+    for rel_type in rel_types or []:
+        deleted[rel_type] = delete_relationships(run, rel_type, batch_size)
+    for label in labels or []:
+        deleted[label] = delete_nodes(run, label, batch_size)
+    if wipe_all:
+        # 没有标签的残留节点
+        deleted["*"] = delete_nodes(run, None, batch_size)
+
+    print(f"清理完成，共删除 {sum(deleted.values())} 个节点/关系，耗时 {time.perf_counter() - start:.2f} 秒")
+    return deleted
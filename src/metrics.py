@@ -0,0 +1,337 @@
+# src/metrics.py
+import hashlib
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import queries, sources
+from .snapshot import SNAPSHOT_RELATIONS, edge_query, node_keys_query
+
+# 延迟直方图的桶上界（秒），覆盖 1ms 的索引查找到分钟级的整批重导
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 结果摘要中的更新计数器
+UPDATE_COUNTERS = ("nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted",
+                   "properties_set", "labels_added", "labels_removed")
+
+# 模式管理和系统过程不能加 PROFILE
+_NOT_PROFILABLE = re.compile(r"^\s*(PROFILE|EXPLAIN|SHOW|DROP|CREATE\s+(CONSTRAINT|INDEX|\w+\s+INDEX)|CALL\s+db\.)",
+                             re.IGNORECASE)
+
+
+def normalize(query: str) -> str:
+    """合并空白，使同一语句的不同缩进/换行计为同一条"""
+    return " ".join(query.split())
+
+
+def _default_names() -> Dict[str, str]:
+    names = {}
+    for key, spec in sources.SOURCES.items():
+        names[normalize(spec.query)] = f"{key}.write"
+        names[normalize(spec.delete_query)] = f"{key}.delete"
+    for query, name in (
+        (queries.ROUTE_EDGES_QUERY, "route_edges"),
+        (queries.SHIP_DWT_QUERY, "ship_dwt"),
+        (queries.PORT_CAPACITY_QUERY, "port_capacity"),
+        (queries.PORTS_FOR_SHIP_QUERY, "ports_for_ship"),
+        (queries.MATERIALIZE_CAN_DOCK_QUERY, "materialize_can_dock"),
+        (queries.PORT_ATTRIBUTES_QUERY, "port_attributes"),
+        (queries.SHIP_CAPACITY_QUERY, "ship_capacity"),
+        (queries.CARGO_QUERY, "cargo_manifest"),
+        (queries.CARRIES_QUERY, "carries.write"),
+        (queries.UNASSIGN_CARGO_QUERY, "carries.delete"),
+        (queries.VISITS_QUERY, "visits"),
+        (queries.PORT_OCCUPANCY_QUERY, "port_occupancy"),
+        (queries.MAX_DWELL_QUERY, "max_dwell"),
+        (queries.SHIP_ITINERARY_QUERY, "ship_itinerary"),
+        (queries.DWELL_TIME_QUERY, "dwell_time"),
+    ):
+        names[normalize(query)] = name
+    # 快照导出的节点键和边查询
+    for key, relation in SNAPSHOT_RELATIONS.items():
+        names[normalize(edge_query(relation))] = f"snapshot.{key}"
+        for label, prop in ((relation.start_label, relation.start_key), (relation.end_label, relation.end_key)):
+            names[normalize(node_keys_query(label, prop))] = f"snapshot.nodes_{label}"
+    return names
+
+
+def _db_hits(plan) -> int:
+    """PROFILE 计划树上所有算子的 dbHits 之和"""
+    if not plan:
+        return 0
+    return plan.get("dbHits", 0) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    """固定桶的累计直方图"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """按桶上界估计分位数；落在 +Inf 桶时返回观测到的最大值"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class _Stats:
+    def __init__(self, name: str, text: str, buckets):
+        self.name = name
+        self.text = text
+        self.latency = Histogram(buckets)
+        self.rows = 0  # 写入的行数（UNWIND $rows 的长度）或返回的记录数
+        self.db_hits = 0  # 仅 PROFILE 执行时可得
+        self.updates = dict.fromkeys(UPDATE_COUNTERS, 0)
+        self.errors = 0
+
+
+class QueryMetrics:
+    """
+    每条Cypher语句和每个导入批次的延迟直方图、行数、更新计数器和 dbHits
+
+    slow_threshold 不为 None 时，耗时超过它的语句在下一次执行时自动加上 PROFILE，
+    捕获执行计划和 dbHits（PROFILE 会真正执行语句，不会额外运行一次）。
+    结果可导出为 Prometheus 文本格式或 JSON 报告。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, slow_threshold: Optional[float] = None,
+                 names: Optional[Dict[str, str]] = None):
+        self.buckets = tuple(buckets)
+        self.slow_threshold = slow_threshold
+        self._names = _default_names()
+        self._names.update((normalize(query), name) for query, name in (names or {}).items())
+        self._statements: Dict[str, _Stats] = {}
+        self._batches: Dict[str, _Stats] = {}
+        self._pending_profile = set()
+        self.profiles: Dict[str, Dict[str, Any]] = {}  # 语句名 -> 最近一次慢查询的执行计划
+        self._lock = threading.Lock()
+
+    def name(self, query: str) -> str:
+        """已知语句用可读名称（如 ships.write），其余用文本哈希"""
+        text = normalize(query)
+        name = self._names.get(text)
+        if name is None:
+            name = "q_" + hashlib.blake2b(text.encode("utf-8"), digest_size=4).hexdigest()
+        return name
+
+    def _stats(self, table: Dict[str, _Stats], name: str, text: str) -> _Stats:
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = _Stats(name, text, self.buckets)
+        return stats
+
+    def prepare(self, query: str) -> str:
+        """返回实际要执行的语句：被标记为慢的语句加上 PROFILE"""
+        if self.slow_threshold is None:
+            return query
+        with self._lock:
+            if not self._pending_profile:
+                return query
+            if self.name(query) in self._pending_profile and not _NOT_PROFILABLE.match(query):
+                return "PROFILE " + query
+        return query
+
+    def record(self, query: str, seconds: float, summary=None, rows: int = 0, error: bool = False):
+        """记录一次语句执行；summary 为 neo4j ResultSummary（可为 None）"""
+        name = self.name(query)
+        counters = getattr(summary, "counters", None)
+        plan = getattr(summary, "profile", None)
+        with self._lock:
+            stats = self._stats(self._statements, name, normalize(query))
+            stats.latency.observe(seconds)
+            stats.rows += rows
+            stats.errors += error
+            if counters is not None:
+                for counter in UPDATE_COUNTERS:
+                    stats.updates[counter] += getattr(counters, counter, 0)
+            if plan:
+                hits = _db_hits(plan)
+                stats.db_hits += hits
+                self._pending_profile.discard(name)
+                self.profiles[name] = {"seconds": seconds, "db_hits": hits, "plan": plan}
+            elif self.slow_threshold is not None and seconds >= self.slow_threshold:
+                self._pending_profile.add(name)
+
+    def execute(self, run: Callable, query: str, parameters=None, rows_written: int = 0) -> List[Dict]:
+        """
+        通过 run(query, parameters) 执行语句（session.run 或 tx.run）并记录指标
+
+        返回 result.data()；rows_written 为本次写入的行数，为 0 时记录返回的记录数。
+        """
+        start = time.perf_counter()
+        try:
+            result = run(self.prepare(query), parameters or {})
+            records = result.data()
+            summary = result.consume()
+        except Exception:
+            self.record(query, time.perf_counter() - start, error=True)
+            raise
+        self.record(query, time.perf_counter() - start, summary, rows_written or len(records))
+        return records
+
+    async def execute_async(self, run: Callable, query: str, parameters=None, rows_written: int = 0) -> List[Dict]:
+        """execute 的 asyncio 版本，run 为异步 session.run 或 tx.run"""
+        start = time.perf_counter()
+        try:
+            result = await run(self.prepare(query), parameters or {})
+            records = await result.data()
+            summary = await result.consume()
+        except Exception:
+            self.record(query, time.perf_counter() - start, error=True)
+            raise
+        self.record(query, time.perf_counter() - start, summary, rows_written or len(records))
+        return records
+
+    def stream(self, run: Callable, query: str, parameters=None) -> Iterator[Tuple]:
+        """
+        execute 的流式版本：逐条产出记录的值元组，不在内存中保留整个结果集
+
+        迭代结束、出错或被提前关闭时记录一次执行，耗时包含调用方处理记录的时间。
+        """
+        start = time.perf_counter()
+        summary, rows, error = None, 0, False
+        try:
+            result = run(self.prepare(query), parameters or {})
+            for record in result:
+                rows += 1
+                yield tuple(record.values())
+            summary = result.consume()
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(query, time.perf_counter() - start, summary, rows, error)
+
+    def record_batch(self, source: str, seconds: float, rows: int, error: bool = False):
+        """记录一个导入批次（与后端无关，内存后端同样适用）"""
+        with self._lock:
+            stats = self._stats(self._batches, source, source)
+            stats.latency.observe(seconds)
+            stats.rows += rows
+            stats.errors += error
+
+    def timed_batches(self, source: str, write: Callable[[List[Dict]], Any]) -> Callable[[List[Dict]], Any]:
+        """包装 write(rows)，每次调用记录为 source 的一个导入批次"""
+        def timed(rows):
+            start = time.perf_counter()
+            try:
+                result = write(rows)
+            except Exception:
+                self.record_batch(source, time.perf_counter() - start, 0, error=True)
+                raise
+            self.record_batch(source, time.perf_counter() - start, len(rows))
+            return result
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._batches.clear()
+            self._pending_profile.clear()
+            self.profiles.clear()
+
+    @staticmethod
+    def _summary(stats: _Stats, total: float) -> Dict[str, Any]:
+        latency = stats.latency
+        return {
+            "count": latency.count,
+            "errors": stats.errors,
+            "total_seconds": latency.sum,
+            "share": latency.sum / total if total > 0 else 0.0,
+            "mean_seconds": latency.sum / latency.count if latency.count else 0.0,
+            "p50_seconds": latency.quantile(0.5),
+            "p90_seconds": latency.quantile(0.9),
+            "p99_seconds": latency.quantile(0.99),
+            "max_seconds": latency.max,
+            "rows": stats.rows,
+            "rows_per_second": stats.rows / latency.sum if latency.sum > 0 else 0.0,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """JSON 报告：语句和批次按总耗时降序，share 为占全部语句耗时的比例"""
+        with self._lock:
+            statements = sorted(self._statements.values(), key=lambda s: s.latency.sum, reverse=True)
+            batches = sorted(self._batches.values(), key=lambda s: s.latency.sum, reverse=True)
+            statement_total = sum(s.latency.sum for s in statements)
+            batch_total = sum(s.latency.sum for s in batches)
+            return {
+                "statements": [dict(name=s.name, text=s.text, db_hits=s.db_hits, updates=dict(s.updates),
+                                    **self._summary(s, statement_total)) for s in statements],
+                "batches": [dict(source=s.name, **self._summary(s, batch_total)) for s in batches],
+                "profiles": dict(self.profiles),
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.report(), ensure_ascii=False, default=str, **kwargs)
+
+    def to_prometheus(self, prefix: str = "kg") -> str:
+        """Prometheus 文本格式（可直接由 /metrics 端点返回）"""
+        lines = []
+
+        def histogram(metric, label, table, help_text):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for stats in table.values():
+                value = _escape(stats.name)
+                for bound, count in stats.latency.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{{label}="{value}",le="{le}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}="{value}"}} {stats.latency.sum}')
+                lines.append(f'{metric}_count{{{label}="{value}"}} {stats.latency.count}')
+
+        def counter(metric, label, table, help_text, value_of):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for stats in table.values():
+                lines.append(f'{metric}{{{label}="{_escape(stats.name)}"}} {value_of(stats)}')
+
+        with self._lock:
+            histogram(f"{prefix}_query_duration_seconds", "statement", self._statements,
+                      "Cypher statement latency")
+            counter(f"{prefix}_query_rows_total", "statement", self._statements,
+                    "Rows written or returned per statement", lambda s: s.rows)
+            counter(f"{prefix}_query_errors_total", "statement", self._statements,
+                    "Failed executions per statement", lambda s: s.errors)
+            counter(f"{prefix}_query_db_hits_total", "statement", self._statements,
+                    "DB hits from profiled executions", lambda s: s.db_hits)
+            lines.append(f"# HELP {prefix}_query_updates_total Update counters from result summaries")
+            lines.append(f"# TYPE {prefix}_query_updates_total counter")
+            for stats in self._statements.values():
+                for name, value in stats.updates.items():
+                    lines.append(f'{prefix}_query_updates_total{{statement="{_escape(stats.name)}",'
+                                 f'counter="{name}"}} {value}')
+            histogram(f"{prefix}_import_batch_duration_seconds", "source", self._batches,
+                      "Import batch latency")
+            counter(f"{prefix}_import_rows_total", "source", self._batches,
+                    "Rows imported per source", lambda s: s.rows)
+        return "\n".join(lines) + "\n"
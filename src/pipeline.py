@@ -0,0 +1,183 @@
+# src/pipeline.py
+import os
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+
+@dataclass
+class Stage:
+    """导入流水线中的一个阶段"""
+    name: str
+    run: Callable[[], Any]
+    depends_on: Tuple[str, ...] = ()
+    result: Any = None
+    elapsed: float = field(default=0.0, repr=False)
+
+
+class ImportPipeline:
+    """
+    依赖感知的导入调度器
+
+    各阶段组成一个有向无环图，依赖已完成的阶段会立即提交到线程池，
+    互不依赖的阶段（如公司、港口、货物）并发执行。
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.stages: Dict[str, Stage] = {}
+
+    def add(self, name, run, depends_on=()):
+        if name in self.stages:
+            raise ValueError(f"阶段重复: {name}")
+        self.stages[name] = Stage(name, run, tuple(depends_on))
+        return self
+
+    def levels(self) -> List[List[str]]:
+        """按拓扑层级返回阶段名，同一层内的阶段互不依赖"""
+        for stage in self.stages.values():
+            unknown = [dep for dep in stage.depends_on if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"阶段 {stage.name} 依赖未定义的阶段: {unknown}")
+
+        remaining = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        levels = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"阶段之间存在循环依赖: {sorted(remaining)}")
+            levels.append(ready)
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return levels
+
+    def run(self) -> Dict[str, Any]:
+        """执行所有阶段，返回 阶段名 -> 返回值；任一阶段失败时不再提交新阶段并抛出异常"""
+        self.levels()  # 先校验依赖图
+        pending = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        finished = set()
+        running = {}
+        error = None
+        start = time.perf_counter()
+
+        def submit_ready(executor):
+            for name in sorted(pending):
+                if pending[name] <= finished:
+                    del pending[name]
+                    running[executor.submit(self._run_stage, self.stages[name])] = name
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            submit_ready(executor)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as exc:
+                        error = error or exc
+                        print(f"阶段 {name} 失败: {exc}")
+                    else:
+                        finished.add(name)
+                if error is None:
+                    submit_ready(executor)
+
+        if error is not None:
+            raise error
+        print(f"导入流水线完成，{len(finished)} 个阶段，总耗时 {time.perf_counter() - start:.2f} 秒")
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    @staticmethod
+    def _run_stage(stage: Stage):
+        start = time.perf_counter()
+        stage.result = stage.run()
+        stage.elapsed = time.perf_counter() - start
+        print(f"阶段 {stage.name} 完成，耗时 {stage.elapsed:.2f} 秒")
+        return stage.result
+
+
+def run_partitioned(batches, key, write, partitions, batch_size, worker_context=None):
+    """
+    按 row[key] 哈希分区并发写入关系批次
+
+    每个分区由一个专用线程顺序写入，同一个键（如港口五位码）只会出现在
+    一个分区里，该端点上的锁不会被并发事务争抢。关系的另一端点（如船舶）
+    可能出现在多个分区中，仍可能发生锁等待或死锁：Neo4j 检测到死锁后
+    回滚其中一个事务，write 应使用 execute_write，由 driver 在
+    max_transaction_retry_time 内自动重试（见 src.database.create_driver）。
+
+    参数:
+    batches: 可迭代的行批次（list[dict]）
+    key: 用于分区的行字段名
+    write: 写入函数 write(rows)，在分区线程中调用
+    partitions: 分区（线程）数
+    batch_size: 每个分区累积到多少行后提交一次
+    worker_context: 可选，返回上下文管理器的函数，在每个分区线程内进入一次，
+                    用于让该线程的所有批次复用同一个会话
+
+    返回:
+    写入的总行数
+    """
+    queues = [queue.Queue(maxsize=2) for _ in range(partitions)]
+    errors = []
+    written = [0] * partitions
+    done = object()
+
+    finished = [False] * partitions
+
+    def consume(index):
+        while True:
+            rows = queues[index].get()
+            if rows is done:
+                finished[index] = True
+                return
+            if errors:
+                continue  # 其他分区已失败，丢弃剩余批次
+            try:
+                write(rows)
+                written[index] += len(rows)
+            except Exception as exc:
+                errors.append(exc)
+
+    def worker(index):
+        try:
+            with worker_context() if worker_context else nullcontext():
+                consume(index)
+        except Exception as exc:
+            errors.append(exc)
+            if not finished[index]:
+                consume(index)  # 继续取走队列中的批次，避免分发线程阻塞
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(partitions)]
+    for thread in threads:
+        thread.start()
+
+    buffers = [[] for _ in range(partitions)]
+    try:
+        for batch in batches:
+            if errors:
+                break
+            for row in batch:
+                index = hash(row[key]) % partitions
+                buffers[index].append(row)
+                if len(buffers[index]) >= batch_size:
+                    queues[index].put(buffers[index])
+                    buffers[index] = []
+        for index, rows in enumerate(buffers):
+            if rows and not errors:
+                queues[index].put(rows)
+    finally:
+        for q in queues:
+            q.put(done)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return sum(written)
@@ -0,0 +1,231 @@
+# src/planner.py
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .routing import Route, RouteGraph, Weight
+
+
+@dataclass
+class PlannedRoute:
+    """一条 Pareto 最优航线：任何其他可行航线都不会在三项累计值上同时不差且至少一项更好"""
+    ports: List[str]
+    legs: List[str]
+    total_distance: float
+    total_weather_score: float
+    total_congestion: float
+    edges: List[int] = field(default_factory=list, repr=False)
+
+    def to_dict(self):
+        return {
+            "ports": self.ports,
+            "legs": self.legs,
+            "total_distance": self.total_distance,
+            "total_weather_score": self.total_weather_score,
+            "total_congestion": self.total_congestion,
+        }
+
+
+def _dominated(cost: Tuple[float, float, float], labels: List[Tuple[float, float, float]]) -> bool:
+    """cost 是否被 labels 中某个标签弱支配（各项都不大于）"""
+    d, w, c = cost
+    for ld, lw, lc in labels:
+        if ld <= d and lw <= w and lc <= c:
+            return True
+    return False
+
+
+class RoutePlanner:
+    """
+    按船舶载重吨限制可停靠港口的多目标航线规划
+
+    港口按最大靠泊能力分级：载重吨落在同一级的船舶可停靠的港口集合完全相同，
+    每一级的可行港口掩码只计算一次，搜索时不可停靠的港口直接剪掉。
+    多目标搜索是标签设定法（Martins 算法）：标签按 (距离, 天气, 拥挤) 字典序出队，
+    出队时未被同一港口或终点已有标签支配的即为永久标签，终点上的永久标签就是 Pareto 前沿。
+
+    航段的拥挤代价取它驶入港口的拥挤程度，航线的累计拥挤程度另加起始港口。
+
+    参数:
+    graph: 航线网络
+    ports: 港口属性记录 {"code", "congestion", "max_dwt"}，见 queries.PORT_ATTRIBUTES_QUERY
+    ships: 船舶载重吨记录 {"imo", "dwt"}，见 queries.SHIP_DWT_QUERY
+    """
+
+    def __init__(self, graph: RouteGraph, ports: Iterable[Dict[str, Any]], ships: Iterable[Dict[str, Any]]):
+        self.graph = graph
+        n = len(graph)
+        self.capacity = np.full(n, -np.inf)
+        self.congestion = np.zeros(n)
+        for row in ports:
+            i = graph.index.get(row["code"])
+            if i is None:
+                continue
+            if row.get("max_dwt") is not None:
+                self.capacity[i] = row["max_dwt"]
+            if row.get("congestion") is not None:
+                self.congestion[i] = row["congestion"]
+        self._ship_dwt = {row["imo"]: row["dwt"] for row in ships if row.get("dwt") is not None}
+
+        # 靠泊能力分级：第 k 级可停靠的港口为 capacity >= levels[k]
+        self.levels = np.unique(self.capacity[np.isfinite(self.capacity)])
+        self._feasible: Dict[int, np.ndarray] = {}
+        self._banned: Dict[int, frozenset] = {}
+        # 每条边的 (距离, 天气, 驶入港口的拥挤程度)
+        entered = self.congestion[np.asarray(graph.targets, dtype=np.int64)].tolist()
+        self._edge_costs = list(zip(graph.distance, graph.weather_score, entered))
+
+    def dwt(self, imo) -> float:
+        if imo not in self._ship_dwt:
+            raise KeyError(f"没有船舶: {imo}")
+        return self._ship_dwt[imo]
+
+    def dwt_class(self, dwt) -> int:
+        """载重吨所在的靠泊能力等级；等级相同的船舶可停靠的港口相同"""
+        return int(np.searchsorted(self.levels, dwt, side="left"))
+
+    def feasible_ports(self, dwt_class: int) -> np.ndarray:
+        """该等级船舶可停靠港口的布尔掩码（按 graph 的港口编号）"""
+        mask = self._feasible.get(dwt_class)
+        if mask is None:
+            if dwt_class < len(self.levels):
+                mask = self.capacity >= self.levels[dwt_class]
+            else:
+                mask = np.zeros(len(self.capacity), dtype=bool)
+            self._feasible[dwt_class] = mask
+        return mask
+
+    def _banned_ports(self, dwt_class: int) -> frozenset:
+        banned = self._banned.get(dwt_class)
+        if banned is None:
+            banned = self._banned[dwt_class] = frozenset(np.flatnonzero(~self.feasible_ports(dwt_class)).tolist())
+        return banned
+
+    def bottleneck_capacity(self, from_code) -> np.ndarray:
+        """
+        从 from_code 出发到每个港口的各条航线中，途经港口（含两端）最小靠泊能力的最大值
+
+        载重吨不超过该值的船舶才有全程可停靠的航线；不可达的港口为 -inf。
+        """
+        graph = self.graph
+        source = graph._resolve(from_code)
+        capacity = self.capacity.tolist()
+        best = [-np.inf] * len(graph)
+        best[source] = capacity[source]
+        heap = [(-best[source], source)]
+        offsets, targets = graph.offsets, graph.targets
+        while heap:
+            b, u = heapq.heappop(heap)
+            b = -b
+            if b < best[u]:
+                continue
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                nb = min(b, capacity[v])
+                if nb > best[v]:
+                    best[v] = nb
+                    heapq.heappush(heap, (-nb, v))
+        return np.asarray(best)
+
+    def _pareto(self, source: int, target: int, feasible: np.ndarray) -> List[List[int]]:
+        """source 到 target 的 Pareto 最优航段序列，按距离升序"""
+        graph = self.graph
+        offsets, targets, edge_costs = graph.offsets, graph.targets, self._edge_costs
+        permanent: Dict[int, List[Tuple[float, float, float]]] = {}
+        # 标签: (节点, 驶入的边, 父标签)，边和父标签为 -1 表示起点
+        label_node, label_edge, label_parent = [source], [-1], [-1]
+        heap = [(0.0, 0.0, 0.0, 0)]
+        results: List[int] = []
+        while heap:
+            d, w, c, label = heapq.heappop(heap)
+            u = label_node[label]
+            cost = (d, w, c)
+            if _dominated(cost, permanent.get(target, ())) or _dominated(cost, permanent.get(u, ())):
+                continue
+            permanent.setdefault(u, []).append(cost)
+            if u == target:
+                results.append(label)
+                continue
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                if not feasible[v]:
+                    continue
+                ed, ew, ec = edge_costs[e]
+                new = (d + ed, w + ew, c + ec)
+                if _dominated(new, permanent.get(target, ())) or _dominated(new, permanent.get(v, ())):
+                    continue
+                label_node.append(v)
+                label_edge.append(e)
+                label_parent.append(label)
+                heapq.heappush(heap, new + (len(label_node) - 1,))
+
+        paths = []
+        for label in results:
+            path = []
+            while label_edge[label] != -1:
+                path.append(label_edge[label])
+                label = label_parent[label]
+            path.reverse()
+            paths.append(path)
+        return paths
+
+    def _planned(self, path: List[int], source: int) -> PlannedRoute:
+        graph = self.graph
+        return PlannedRoute(
+            ports=[graph.codes[source]] + [graph.codes[graph.targets[e]] for e in path],
+            legs=[graph.names[e] for e in path],
+            total_distance=sum(graph.distance[e] for e in path),
+            total_weather_score=sum(graph.weather_score[e] for e in path),
+            total_congestion=float(self.congestion[source]) + sum(self._edge_costs[e][2] for e in path),
+            edges=path,
+        )
+
+    def _plan(self, dwt_class: int, from_code, to_code) -> List[PlannedRoute]:
+        source, target = self.graph._resolve(from_code), self.graph._resolve(to_code)
+        feasible = self.feasible_ports(dwt_class)
+        if not (feasible[source] and feasible[target]):
+            return []
+        if source == target:
+            return [self._planned([], source)]
+        return [self._planned(path, source) for path in self._pareto(source, target, feasible)]
+
+    def plan(self, imo, from_code, to_code) -> List[PlannedRoute]:
+        """
+        这艘船从 from_code 到 to_code 的全部 Pareto 最优航线，按总距离升序
+
+        只经过靠泊能力不低于船舶载重吨的港口（含起止港口），没有可行航线时返回空列表。
+        """
+        return self._plan(self.dwt_class(self.dwt(imo)), from_code, to_code)
+
+    def plan_fleet(self, requests: Iterable[Sequence]) -> List[List[PlannedRoute]]:
+        """
+        批量规划，requests 为 (imo, from_code, to_code) 序列，返回与之一一对应的航线列表
+
+        按 (靠泊能力等级, 起点, 终点) 分组，同组船舶只搜索一次。
+        """
+        plans: Dict[Tuple, List[PlannedRoute]] = {}
+        results = []
+        for imo, from_code, to_code in requests:
+            key = (self.dwt_class(self.dwt(imo)), from_code, to_code)
+            if key not in plans:
+                plans[key] = self._plan(*key)
+            results.append(plans[key])
+        return results
+
+    def shortest_feasible_path(self, imo, from_code, to_code, weight: Weight = "rating") -> Optional[Route]:
+        """单一权重下只经过可停靠港口的最短路径，不可达时返回 None"""
+        graph = self.graph
+        dwt_class = self.dwt_class(self.dwt(imo))
+        source, target = graph._resolve(from_code), graph._resolve(to_code)
+        feasible = self.feasible_ports(dwt_class)
+        if not (feasible[source] and feasible[target]):
+            return None
+        costs = graph.weights(weight)
+        if source == target:
+            return graph._route([], source, costs)
+        dist, pred = graph._dijkstra(source, target, costs, banned_nodes=self._banned_ports(dwt_class))
+        if target not in dist:
+            return None
+        return graph._route(graph._edge_path(pred, source, target), source, costs)
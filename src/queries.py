@@ -0,0 +1,105 @@
+# src/queries.py
+# 存储后端（src.backend.Neo4jBackend）执行的Cypher语句集中在这里，
+# 后端不必依赖航线、可停靠、规划、配载等功能模块；各模块只依赖查询结果的字段
+
+# 从数据库读取构建 RouteGraph 所需的全部 ROUTE 边
+ROUTE_EDGES_QUERY = """
+MATCH (from:Port)-[r:ROUTE]->(to:Port)
+RETURN from.code AS from_code, to.code AS to_code, r.name AS route_name,
+       r.distance AS distance, r.weather_score AS weather_score, r.rating AS rating
+"""
+
+# 从数据库读取构建 DockingIndex 所需的船舶载重吨和港口最大靠泊能力
+SHIP_DWT_QUERY = "MATCH (s:Ship) WHERE s.dwt IS NOT NULL RETURN s.imo AS imo, s.dwt AS dwt"
+PORT_CAPACITY_QUERY = ("MATCH (p:Port) WHERE p.max_dwt IS NOT NULL "
+                       "RETURN p.code AS code, p.max_dwt AS max_dwt")
+
+# 服务端按需查询：借助 Port.max_dwt 上的范围索引，只扫描能力足够的港口
+PORTS_FOR_SHIP_QUERY = """
+MATCH (s:Ship {imo: $imo})
+MATCH (p:Port)
+WHERE p.max_dwt >= s.dwt
+RETURN p.code AS code, p.max_dwt AS max_dwt
+ORDER BY p.max_dwt
+"""
+
+# 只为实际请求的船舶-港口对物化 CAN_DOCK 关系，属性直接取自节点
+MATERIALIZE_CAN_DOCK_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Ship {imo: row.imo})
+MATCH (p:Port {code: row.port_code})
+MERGE (s)-[r:CAN_DOCK]-(p)
+SET r.ship_dwt = s.dwt, r.port_max_dwt = p.max_dwt,
+    r.can_dock = s.dwt <= p.max_dwt
+"""
+
+# 规划器需要的港口属性；没有靠泊能力的港口视为无法确认能否靠泊，不参与规划
+PORT_ATTRIBUTES_QUERY = """
+MATCH (p:Port)
+RETURN p.code AS code, p.congestion AS congestion, p.max_dwt AS max_dwt
+"""
+
+# 配载需要的船舶载重和货物重量
+SHIP_CAPACITY_QUERY = ("MATCH (s:Ship) WHERE s.dwt IS NOT NULL "
+                       "RETURN s.imo AS imo, s.type AS type, s.dwt AS dwt")
+CARGO_QUERY = ("MATCH (c:Cargo) WHERE c.weight IS NOT NULL "
+               "RETURN c.id AS id, c.type AS type, c.weight AS weight")
+
+# 批量写入配载结果；每件货物只由一艘船承运，重新配载时先删除其他船舶的旧关系
+CARRIES_QUERY = """
+UNWIND $rows AS row
+MATCH (c:Cargo {id: row.cargo_id})
+OPTIONAL MATCH (c)<-[old:CARRIES]-(other:Ship)
+WHERE other.imo <> row.imo
+DELETE old
+WITH DISTINCT c, row
+MATCH (s:Ship {imo: row.imo})
+MERGE (s)-[r:CARRIES]->(c)
+SET r.weight = row.weight
+"""
+
+# 重新配载后未分配的货物：删除它们此前的承运关系
+UNASSIGN_CARGO_QUERY = """
+UNWIND $rows AS row
+MATCH (:Cargo {id: row.cargo_id})<-[r:CARRIES]-(:Ship)
+DELETE r
+"""
+
+# 全部挂靠记录，用于构建进程内 VisitTimeline
+VISITS_QUERY = """
+MATCH (s:Ship)-[r:VISITED]-(p:Port)
+RETURN s.imo AS imo, p.code AS port_code, r.arrival AS arrival, r.departure AS departure
+"""
+
+# 服务端时间窗口查询：与窗口相交的挂靠到达时间落在 [窗口开始 - 最长停靠时长, 窗口结束) 内，
+# 借助 VISITED.arrival 上的范围索引做区间查找；停靠时长由到达/离开时间算出，与 VisitTimeline 一致
+PORT_OCCUPANCY_QUERY = """
+MATCH (s:Ship)-[r:VISITED]-(p:Port {code: $port_code})
+WHERE r.arrival >= $earliest AND r.arrival < $end AND r.departure > $start
+RETURN s.imo AS imo, r.arrival AS arrival, r.departure AS departure,
+       duration.inSeconds(r.arrival, r.departure).seconds / 3600.0 AS duration
+ORDER BY r.arrival
+"""
+
+# 全部挂靠中最长的停靠时长（秒），为 PORT_OCCUPANCY_QUERY 的 $earliest 提供下界
+MAX_DWELL_QUERY = """
+MATCH ()-[r:VISITED]->()
+RETURN max(duration.inSeconds(r.arrival, r.departure).seconds) AS seconds
+"""
+
+# 船舶行程从 Ship 的唯一索引出发，只展开这艘船的挂靠；不给出的边界为 null
+SHIP_ITINERARY_QUERY = """
+MATCH (s:Ship {imo: $imo})-[r:VISITED]-(p:Port)
+WHERE ($start IS NULL OR r.arrival >= $start) AND ($end IS NULL OR r.arrival < $end)
+RETURN p.code AS port_code, r.arrival AS arrival, r.departure AS departure,
+       duration.inSeconds(r.arrival, r.departure).seconds / 3600.0 AS duration
+ORDER BY r.arrival
+"""
+
+DWELL_TIME_QUERY = """
+MATCH (:Ship)-[r:VISITED]-(p:Port {code: $port_code})
+WHERE r.arrival >= $start AND r.arrival < $end
+WITH duration.inSeconds(r.arrival, r.departure).seconds / 3600.0 AS hours
+RETURN count(hours) AS visits, coalesce(sum(hours), 0.0) AS total_hours,
+       coalesce(avg(hours), 0.0) AS mean_hours, coalesce(max(hours), 0.0) AS max_hours
+"""
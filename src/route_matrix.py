@@ -0,0 +1,172 @@
+# src/route_matrix.py
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from .routing import RATING_METHODS, RouteGraph
+from .staging import replace_directory
+
+# 默认预计算的代价：边上的 rating 属性（find_optimal_route 的默认权重）和各评分方法
+MATRIX_METHODS = ("rating",) + RATING_METHODS
+
+
+def graph_fingerprint(graph: RouteGraph) -> str:
+    """航线网络内容指纹：任何港口、航段或边属性变化都会改变它"""
+    h = hashlib.sha256()
+    h.update(json.dumps(graph.codes, ensure_ascii=False).encode("utf-8"))
+    h.update(json.dumps(graph.names, ensure_ascii=False).encode("utf-8"))
+    for arr in (graph.sources, graph.targets, graph.distance, graph.weather_score, graph.rating):
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+class RouteMatrix:
+    """
+    预计算的全源最优航线表
+
+    对每种评分方法 m 保存:
+    costs[m, i, j]    从港口 i 到港口 j 的最小累计代价（不可达为 inf）
+    next_hop[m, i, j] 最优路径上从 i 出发的第一段航段的边编号（不可达为 -1）
+    edges[e]          第 e 条航段的 (终点港口编号, 距离, 天气评分, 评分)
+
+    查询一对港口只需沿 next_hop 逐段走表，复杂度为路径长度。
+    数组以 .npy 保存，加载时使用内存映射，多个进程可以共享同一份页缓存。
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, codes, methods, costs, next_hop, edges, edge_names, fingerprint):
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.methods = list(methods)
+        self.costs = costs
+        self.next_hop = next_hop
+        self.edges = edges
+        self.edge_names = list(edge_names)
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, graph: RouteGraph, methods: Iterable[str] = MATRIX_METHODS):
+        """对每种方法、每个起点各跑一次单源Dijkstra，填满代价表和下一跳表"""
+        start = time.perf_counter()
+        methods = list(methods)
+        n = len(graph)
+        # 代价用 float64 保存，与直接在航线网络上搜索得到的累计值完全相同
+        costs = np.full((len(methods), n, n), np.inf, dtype=np.float64)
+        next_hop = np.full((len(methods), n, n), -1, dtype=np.int32)
+        for m, method in enumerate(methods):
+            for source, code in enumerate(graph.codes):
+                dist, pred = graph.shortest_path_tree(code, method)
+                targets = np.fromiter(dist.keys(), dtype=np.int64, count=len(dist))
+                costs[m, source, targets] = np.fromiter(dist.values(), dtype=np.float64, count=len(dist))
+                for target, edge in graph.first_legs(source, pred).items():
+                    next_hop[m, source, target] = edge
+        print(f"航线表预计算完成：{len(methods)} 种方法 × {n}×{n} 港口对，"
+              f"耗时 {time.perf_counter() - start:.2f} 秒")
+        edges = np.column_stack([
+            np.asarray(graph.targets, dtype=np.float64),
+            np.asarray(graph.distance),
+            np.asarray(graph.weather_score),
+            np.asarray(graph.rating),
+        ])
+        return cls(graph.codes, methods, costs, next_hop, edges, graph.names, graph_fingerprint(graph))
+
+    def save(self, directory):
+        """写入临时目录后整体替换，已内存映射旧表的进程不受影响"""
+        replace_directory(self._write, directory)
+
+    def _write(self, directory):
+        np.save(os.path.join(directory, "costs.npy"), self.costs)
+        np.save(os.path.join(directory, "next_hop.npy"), self.next_hop)
+        np.save(os.path.join(directory, "edges.npy"), self.edges)
+        meta = {
+            "codes": self.codes,
+            "methods": self.methods,
+            "edge_names": self.edge_names,
+            "fingerprint": self.fingerprint,
+        }
+        with open(os.path.join(directory, self.META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def _read_meta(cls, directory):
+        with open(os.path.join(directory, cls.META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        meta = cls._read_meta(directory)
+        return cls(
+            meta["codes"],
+            meta["methods"],
+            np.load(os.path.join(directory, "costs.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, "next_hop.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, "edges.npy"), mmap_mode=mmap_mode),
+            meta["edge_names"],
+            meta["fingerprint"],
+        )
+
+    @classmethod
+    def load_or_build(cls, graph: RouteGraph, directory, methods: Iterable[str] = MATRIX_METHODS):
+        """
+        航线网络未变化且方法齐全时直接内存映射已有文件，否则重新计算并覆盖
+
+        指纹不一致即视为航线已变化，旧表自动失效。
+        """
+        methods = list(methods)
+        if os.path.exists(os.path.join(directory, cls.META_FILE)):
+            meta = cls._read_meta(directory)
+            if meta["fingerprint"] == graph_fingerprint(graph) and set(methods) <= set(meta["methods"]):
+                return cls.load(directory)
+            print("航线网络已变化，重新预计算航线表")
+        matrix = cls.build(graph, methods)
+        matrix.save(directory)
+        return cls.load(directory)
+
+    def _lookup_index(self, from_code, to_code, method):
+        if method not in self.methods:
+            raise ValueError(f"航线表中没有评分方法: {method}")
+        if from_code not in self.index or to_code not in self.index:
+            raise KeyError(f"航线表中没有港口: {from_code if from_code not in self.index else to_code}")
+        return self.methods.index(method), self.index[from_code], self.index[to_code]
+
+    def cost(self, from_code, to_code, method="balanced") -> float:
+        """O(1) 查询最小累计代价，不可达时为 inf"""
+        m, i, j = self._lookup_index(from_code, to_code, method)
+        return float(self.costs[m, i, j])
+
+    def route(self, from_code, to_code, method="balanced") -> Optional[Dict]:
+        """沿下一跳表走出完整航线，不可达时返回 None"""
+        m, i, j = self._lookup_index(from_code, to_code, method)
+        cost = float(self.costs[m, i, j])
+        if not np.isfinite(cost):
+            return None
+        ports, legs = [self.codes[i]], []
+        totals = np.zeros(3)
+        while i != j:
+            if len(legs) >= len(self.codes):
+                raise RuntimeError(f"下一跳表存在环路: {from_code} -> {to_code}")
+            edge = int(self.next_hop[m, i, j])
+            i = int(self.edges[edge, 0])
+            totals += self.edges[edge, 1:]
+            ports.append(self.codes[i])
+            legs.append(self.edge_names[edge])
+        return {
+            "ports": ports,
+            "legs": legs,
+            "cost": cost,
+            "total_distance": float(totals[0]),
+            "total_weather_score": float(totals[1]),
+            "total_rating": float(totals[2]),
+        }
+
+
+if __name__ == "__main__":
+    # 离线预计算：python -m src.route_matrix
+    graph = RouteGraph.from_csv(os.path.join("data", "全球航线数据_rated.CSV"))
+    matrix = RouteMatrix.load_or_build(graph, os.path.join("data", "route_matrix"))
+    print(matrix.route("CNSHA", "USNYC"))
@@ -0,0 +1,288 @@
+# src/routing.py
+import heapq
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import pandas as pd
+
+from .adapt全球航线数据 import RATING_WEIGHTS, calculate_rating, calculate_ratings
+from .sources import ROUTES
+from .staging import read_batches
+
+# 可直接使用的边属性；评分方法见 calculate_rating
+EDGE_ATTRIBUTES = ("distance", "weather_score", "rating")
+RATING_METHODS = tuple(RATING_WEIGHTS)
+
+Weight = Union[str, Callable[[float, float, float], float]]
+
+
+@dataclass
+class Route:
+    """一条航线方案：经过的港口、使用的航段以及各项累计值"""
+    ports: List[str]
+    legs: List[str]
+    cost: float
+    total_distance: float
+    total_weather_score: float
+    total_rating: float
+    edges: List[int] = field(default_factory=list, repr=False)
+
+    def to_dict(self):
+        return {
+            "ports": self.ports,
+            "legs": self.legs,
+            "cost": self.cost,
+            "total_distance": self.total_distance,
+            "total_weather_score": self.total_weather_score,
+            "total_rating": self.total_rating,
+        }
+
+
+class RouteGraph:
+    """
+    航线网络的进程内紧凑邻接结构（CSR）
+
+    港口编号为 0..n-1，第 i 个港口的出边是 targets[offsets[i]:offsets[i+1]]，
+    边属性按同样的顺序存放在定长数组中。所有路径查询都在内存里完成，
+    不需要访问数据库。
+
+    评分（rating）随距离和天气影响增大而增大，在路径搜索中作为代价累加，越小越好。
+    """
+
+    def __init__(self, edges: Iterable[dict]):
+        edges = list(edges)
+        codes = sorted({e["from_code"] for e in edges} | {e["to_code"] for e in edges})
+        self.codes: List[str] = codes
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(codes)}
+
+        edges.sort(key=lambda e: self.index[e["from_code"]])
+        self.offsets = array("l", [0] * (len(codes) + 1))
+        for e in edges:
+            self.offsets[self.index[e["from_code"]] + 1] += 1
+        for i in range(len(codes)):
+            self.offsets[i + 1] += self.offsets[i]
+
+        self.sources = array("l", (self.index[e["from_code"]] for e in edges))
+        self.targets = array("l", (self.index[e["to_code"]] for e in edges))
+        self.distance = array("d", (float(e["distance"]) for e in edges))
+        self.weather_score = array("d", (float(e["weather_score"]) for e in edges))
+        self.rating = array("d", (float(e["rating"]) if e.get("rating") is not None
+                                  else calculate_rating(e["distance"], e["weather_score"])
+                                  for e in edges))
+        self.names: List[str] = [e["route_name"] for e in edges]
+        self._weights: Dict[str, array] = {}
+
+    @classmethod
+    def from_csv(cls, file_path, batch_size=10000, staging=None):
+        """从已评分的航线CSV构建（列定义同 sources.ROUTES），staging 见 src.staging"""
+        return cls(row for batch in read_batches(ROUTES, file_path, batch_size, staging) for row in batch)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def weights(self, weight: Weight = "rating") -> array:
+        """
+        每条边的代价
+
+        weight 可以是 distance / weather_score / rating、calculate_rating 的评分方法名，
+        或者函数 weight(distance, weather_score, rating) -> 代价。
+        """
+        if callable(weight):
+            costs = array("d", (weight(d, w, r) for d, w, r in
+                                zip(self.distance, self.weather_score, self.rating)))
+        elif weight in self._weights:
+            return self._weights[weight]
+        elif weight in EDGE_ATTRIBUTES:
+            costs = getattr(self, weight)
+        elif weight in RATING_METHODS:
+            costs = array("d", calculate_ratings(self.distance, self.weather_score, [weight])[weight])
+        else:
+            raise ValueError(f"未知的权重: {weight}")
+        if any(c < 0 for c in costs):
+            raise ValueError("最短路径要求边代价非负")
+        if not callable(weight):
+            self._weights[weight] = costs
+        return costs
+
+    def _dijkstra(self, source: int, target: Optional[int], costs,
+                  banned_nodes: Set[int] = frozenset(), banned_edges: Set[int] = frozenset()):
+        """返回 (dist, pred_edge)；target 不为 None 时到达即停止"""
+        dist = {source: 0.0}
+        pred: Dict[int, int] = {}
+        heap = [(0.0, source)]
+        offsets, targets = self.offsets, self.targets
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist.get(u, float("inf")):
+                continue
+            if u == target:
+                break
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                if v in banned_nodes or e in banned_edges:
+                    continue
+                nd = d + costs[e]
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    pred[v] = e
+                    heapq.heappush(heap, (nd, v))
+        return dist, pred
+
+    def _edge_path(self, pred, source, target) -> List[int]:
+        path = []
+        node = target
+        while node != source:
+            e = pred[node]
+            path.append(e)
+            node = self.sources[e]
+        path.reverse()
+        return path
+
+    def _route(self, edge_path: List[int], source: int, costs) -> Route:
+        ports = [self.codes[source]] + [self.codes[self.targets[e]] for e in edge_path]
+        return Route(
+            ports=ports,
+            legs=[self.names[e] for e in edge_path],
+            cost=sum(costs[e] for e in edge_path),
+            total_distance=sum(self.distance[e] for e in edge_path),
+            total_weather_score=sum(self.weather_score[e] for e in edge_path),
+            total_rating=sum(self.rating[e] for e in edge_path),
+            edges=edge_path,
+        )
+
+    def _resolve(self, code):
+        if code not in self.index:
+            raise KeyError(f"航线网络中没有港口: {code}")
+        return self.index[code]
+
+    def shortest_path(self, from_code, to_code, weight: Weight = "rating") -> Optional[Route]:
+        """加权最短路径（Dijkstra），不可达时返回 None"""
+        source, target = self._resolve(from_code), self._resolve(to_code)
+        costs = self.weights(weight)
+        if source == target:
+            return self._route([], source, costs)
+        dist, pred = self._dijkstra(source, target, costs)
+        if target not in dist:
+            return None
+        return self._route(self._edge_path(pred, source, target), source, costs)
+
+    def shortest_path_tree(self, from_code, weight: Weight = "rating"):
+        """
+        单源最短路径树
+
+        返回:
+        (dist, pred)：港口编号 -> 最小代价，港口编号 -> 树中指向该港口的边编号
+        """
+        return self._dijkstra(self._resolve(from_code), None, self.weights(weight))
+
+    def first_legs(self, source: int, pred: Dict[int, int]) -> Dict[int, int]:
+        """由最短路径树求每个可达港口的第一段航段（下一跳边编号）"""
+        first: Dict[int, int] = {}
+        for node in pred:
+            chain = []
+            while node not in first and node != source:
+                chain.append(node)
+                node = self.sources[pred[node]]
+            hop = first.get(node)
+            for v in reversed(chain):
+                e = pred[v]
+                hop = e if self.sources[e] == source else hop
+                first[v] = hop
+        return first
+
+    def route_table(self, pairs: Optional[Iterable[Tuple]] = None, sources: Optional[Iterable] = None,
+                    targets: Optional[Iterable] = None, weight: Weight = "rating",
+                    paths: bool = True) -> pd.DataFrame:
+        """
+        批量最短路径：每个不同的起点只做一次单源搜索，各终点的航线沿最短路径树读出
+
+        参数:
+        pairs: [(from_code, to_code), ...]
+        sources, targets: 不给出 pairs 时计算 sources × targets 的全部组合，缺省为全部港口
+        paths: 是否附带每条航线经过的港口和航段
+
+        返回:
+        DataFrame，每个请求一行（顺序同输入）：from_code, to_code, cost, total_distance,
+        total_weather_score, total_rating, hops，paths=True 时另有 ports, legs；
+        不可达或港口不存在时各项为 NaN
+        """
+        if pairs is None:
+            sources = self.codes if sources is None else list(sources)
+            targets = self.codes if targets is None else list(targets)
+            pairs = [(a, b) for a in sources for b in targets]
+        pairs = [tuple(pair) for pair in pairs]
+        costs = self.weights(weight)
+
+        by_source: Dict[object, List[int]] = {}
+        for row, (from_code, _) in enumerate(pairs):
+            by_source.setdefault(from_code, []).append(row)
+
+        nan = float("nan")
+        columns = {name: [nan] * len(pairs) for name in
+                   ("cost", "total_distance", "total_weather_score", "total_rating", "hops")}
+        port_lists: List[Optional[List[str]]] = [None] * len(pairs)
+        leg_lists: List[Optional[List[str]]] = [None] * len(pairs)
+        for from_code, rows in by_source.items():
+            source = self.index.get(from_code)
+            if source is None:
+                continue
+            dist, pred = self._dijkstra(source, None, costs)
+            for row in rows:
+                target = self.index.get(pairs[row][1])
+                if target not in dist:
+                    continue
+                path = self._edge_path(pred, source, target)
+                columns["cost"][row] = dist[target]
+                columns["total_distance"][row] = sum(self.distance[e] for e in path)
+                columns["total_weather_score"][row] = sum(self.weather_score[e] for e in path)
+                columns["total_rating"][row] = sum(self.rating[e] for e in path)
+                columns["hops"][row] = len(path)
+                if paths:
+                    port_lists[row] = [from_code] + [self.codes[self.targets[e]] for e in path]
+                    leg_lists[row] = [self.names[e] for e in path]
+
+        table = pd.DataFrame({
+            "from_code": [a for a, _ in pairs],
+            "to_code": [b for _, b in pairs],
+            **columns,
+        })
+        table["hops"] = table["hops"].astype("Int64")
+        if paths:
+            table["ports"] = port_lists
+            table["legs"] = leg_lists
+        return table
+
+    def k_shortest_paths(self, from_code, to_code, k=3, weight: Weight = "rating") -> List[Route]:
+        """前 k 条无环最短路径（Yen 算法），按代价升序"""
+        source, target = self._resolve(from_code), self._resolve(to_code)
+        costs = self.weights(weight)
+        first = self.shortest_path(from_code, to_code, weight)
+        if first is None:
+            return []
+        found = [first.edges]
+        candidates = []
+        seen = {tuple(first.edges)}
+        while len(found) < k:
+            last = found[-1]
+            for i in range(len(last)):
+                spur = source if i == 0 else self.targets[last[i - 1]]
+                root = last[:i]
+                banned_edges = {path[i] for path in found if path[:i] == root and len(path) > i}
+                banned_nodes = {source} | {self.targets[e] for e in root}
+                banned_nodes.discard(spur)
+                dist, pred = self._dijkstra(spur, target, costs, banned_nodes, banned_edges)
+                if target not in dist:
+                    continue
+                path = root + self._edge_path(pred, spur, target)
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    heapq.heappush(candidates, (sum(costs[e] for e in path), len(path), path))
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates)[2])
+        return [self._route(path, source, costs) for path in found]
@@ -0,0 +1,81 @@
+# src/schema.py
+from typing import Callable, Iterator, List, Tuple
+
+# 导入时 MERGE/MATCH 使用的键：唯一约束同时提供索引
+UNIQUE_KEYS: List[Tuple[str, str]] = [
+    ("Company", "code"),
+    ("Ship", "imo"),
+    ("Port", "code"),
+    ("Cargo", "id"),
+]
+
+# DataImporter 按名称合并节点，只建普通查找索引；
+# 载重吨/靠泊能力上的范围索引供可停靠查询做范围扫描
+LOOKUP_INDEXES: List[Tuple[str, str]] = [
+    ("Company", "companyName"),
+    ("Ship", "shipName"),
+    ("Ship", "dwt"),
+    ("Port", "max_dwt"),
+]
+
+# 关系属性上的范围索引：挂靠的到达/离开时间（原生 LocalDateTime），供时间窗口查询
+REL_LOOKUP_INDEXES: List[Tuple[str, str]] = [
+    ("VISITED", "arrival"),
+    ("VISITED", "departure"),
+]
+
+
+def constraint_name(label: str, prop: str) -> str:
+    return f"{label.lower()}_{prop.lower()}_unique"
+
+
+def index_name(label: str, prop: str) -> str:
+    return f"{label.lower()}_{prop.lower()}_index"
+
+
+def schema_statements(unique_keys=UNIQUE_KEYS, lookup_indexes=LOOKUP_INDEXES,
+                      rel_lookup_indexes=REL_LOOKUP_INDEXES) -> Iterator[str]:
+    """生成幂等的建约束/建索引语句"""
+    for label, prop in unique_keys:
+        yield (
+            f"CREATE CONSTRAINT {constraint_name(label, prop)} IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+        )
+    for label, prop in lookup_indexes:
+        yield (
+            f"CREATE INDEX {index_name(label, prop)} IF NOT EXISTS "
+            f"FOR (n:{label}) ON (n.{prop})"
+        )
+    for rel_type, prop in rel_lookup_indexes:
+        yield (
+            f"CREATE INDEX {index_name(rel_type, prop)} IF NOT EXISTS "
+            f"FOR ()-[r:{rel_type}]-() ON (r.{prop})"
+        )
+
+
+def ensure_schema(run: Callable, unique_keys=UNIQUE_KEYS, lookup_indexes=LOOKUP_INDEXES,
+                  timeout: int = 300, rel_lookup_indexes=REL_LOOKUP_INDEXES) -> List[str]:
+    """
+    创建约束和索引，并等待它们全部上线
+
+    参数:
+    run: 执行Cypher的函数，签名为 run(query, parameters=None) -> list[dict]
+    timeout: 等待索引填充的最长秒数
+
+    返回:
+    已确认上线的索引名列表
+    """
+    for statement in schema_statements(unique_keys, lookup_indexes, rel_lookup_indexes):
+        run(statement)
+    run("CALL db.awaitIndexes($timeout)", {"timeout": timeout})
+
+    expected = {constraint_name(label, prop) for label, prop in unique_keys}
+    expected |= {index_name(label, prop) for label, prop in lookup_indexes}
+    expected |= {index_name(rel_type, prop) for rel_type, prop in rel_lookup_indexes}
+    states = {row["name"]: row["state"]
+              for row in run("SHOW INDEXES YIELD name, state")}
+    not_online = {name: states.get(name, "MISSING")
+                  for name in expected if states.get(name) != "ONLINE"}
+    if not_online:
+        raise RuntimeError(f"索引未上线: {not_online}")
+    return sorted(expected)
@@ -0,0 +1,207 @@
+# src/snapshot.py
+import json
+import os
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .maintenance import _quote
+from .staging import replace_directory
+
+
+@dataclass(frozen=True)
+class Relation:
+    """快照中的一种关系：(start:<start_label>)-[:<type>]->(end:<end_label>)，节点以合并键标识"""
+    start_label: str
+    start_key: str
+    type: str
+    end_label: str
+    end_key: str
+    weight: Optional[str] = None  # 作为边权保存的关系属性，重复边取最小值
+
+
+# 快照默认包含的关系：航线网络、船舶挂靠、公司船队
+SNAPSHOT_RELATIONS = {
+    "routes": Relation("Port", "code", "ROUTE", "Port", "code", weight="distance"),
+    "visits": Relation("Ship", "imo", "VISITED", "Port", "code"),
+    "ownership": Relation("Company", "code", "OWNS", "Ship", "imo"),
+}
+
+
+def node_keys_query(label: str, key: str) -> str:
+    return f"MATCH (n:{_quote(label)}) WHERE n.{_quote(key)} IS NOT NULL RETURN n.{_quote(key)} AS key"
+
+
+def edge_query(relation: Relation) -> str:
+    weight = f", r.{_quote(relation.weight)} AS weight" if relation.weight else ", null AS weight"
+    return (f"MATCH (a:{_quote(relation.start_label)})-[r:{_quote(relation.type)}]->"
+            f"(b:{_quote(relation.end_label)}) "
+            f"RETURN a.{_quote(relation.start_key)} AS source, b.{_quote(relation.end_key)} AS target{weight}")
+
+
+@dataclass
+class Adjacency:
+    """
+    一种关系的 CSR 邻接：起点 i 的终点为 targets[offsets[i]:offsets[i + 1]]（升序、去重），
+    counts 为重复边的条数（如同一船舶对同一港口的挂靠次数），weights 为边权（没有时为 None）
+    """
+    start_label: str
+    end_label: str
+    offsets: np.ndarray
+    targets: np.ndarray
+    counts: np.ndarray
+    weights: Optional[np.ndarray] = None
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def sources(self) -> np.ndarray:
+        """每条边的起点编号，与 targets 一一对应"""
+        return np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+
+    def degree(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def neighbours(self, i: int) -> np.ndarray:
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+
+def _key_array(keys) -> np.ndarray:
+    """合并键数组：全是整数时为 int64，否则为定长字符串，两者都不需要 pickle 即可内存映射"""
+    if keys and all(isinstance(key, (int, np.integer)) for key in keys):
+        return np.asarray(keys, dtype=np.int64)
+    return np.asarray([str(key) for key in keys], dtype=str)
+
+
+class GraphSnapshot:
+    """
+    图的只读分析快照
+
+    节点按标签各存一个合并键数组（编号即下标），每种关系存一份 CSR 邻接。
+    所有数组以 .npy 保存、加载时内存映射，分析在快照上进行，不占用数据库。
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, nodes: Dict[str, np.ndarray], relations: Dict[str, Adjacency],
+                 created: Optional[float] = None):
+        self.nodes = nodes
+        self.relations = relations
+        self.created = created if created is not None else time.time()
+        self._index: Dict[str, Dict[Any, int]] = {}
+
+    def __getitem__(self, name) -> Adjacency:
+        return self.relations[name]
+
+    def index(self, label: str) -> Dict[Any, int]:
+        """合并键 -> 节点编号，首次使用时构建"""
+        index = self._index.get(label)
+        if index is None:
+            index = self._index[label] = {key: i for i, key in enumerate(self.nodes[label].tolist())}
+        return index
+
+    @classmethod
+    def build(cls, node_keys, edge_pairs, relations: Dict[str, Relation] = SNAPSHOT_RELATIONS):
+        """
+        流式构建：逐条读取节点键和边，只在定长数组中累积编号，读完后一次排序成 CSR
+
+        参数:
+        node_keys: 函数 node_keys(label, key) -> 可迭代的合并键
+        edge_pairs: 函数 edge_pairs(relation) -> 可迭代的 (起点键, 终点键, 边权)
+        """
+        start = time.perf_counter()
+        labels: Dict[str, str] = {}
+        for relation in relations.values():
+            labels.setdefault(relation.start_label, relation.start_key)
+            labels.setdefault(relation.end_label, relation.end_key)
+        keys = {label: list(node_keys(label, key)) for label, key in labels.items()}
+        index = {label: {key: i for i, key in enumerate(values)} for label, values in keys.items()}
+
+        adjacency = {}
+        for name, relation in relations.items():
+            sources, targets, weights = array("q"), array("q"), array("d")
+            start_index, end_index = index[relation.start_label], index[relation.end_label]
+            for source, target, weight in edge_pairs(relation):
+                i, j = start_index.get(source), end_index.get(target)
+                if i is None or j is None:
+                    continue
+                sources.append(i)
+                targets.append(j)
+                weights.append(np.nan if weight is None else float(weight))
+            adjacency[name] = cls._csr(relation, np.frombuffer(sources, dtype=np.int64),
+                                       np.frombuffer(targets, dtype=np.int64),
+                                       np.frombuffer(weights, dtype=np.float64),
+                                       len(keys[relation.start_label]))
+        nodes = {label: _key_array(values) for label, values in keys.items()}
+        snapshot = cls(nodes, adjacency)
+        print(f"快照构建完成：{', '.join(f'{label} {len(v)}' for label, v in nodes.items())}；"
+              f"{', '.join(f'{name} {a.edge_count}' for name, a in adjacency.items())}，"
+              f"耗时 {time.perf_counter() - start:.2f} 秒")
+        return snapshot
+
+    @staticmethod
+    def _csr(relation: Relation, sources, targets, weights, node_count) -> Adjacency:
+        # 按 (起点, 终点) 排序并合并重复边
+        order = np.lexsort((targets, sources))
+        sources, targets, weights = sources[order], targets[order], weights[order]
+        first = np.ones(len(sources), dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        starts = np.flatnonzero(first)
+        counts = np.diff(np.append(starts, len(sources))).astype(np.int64)
+        offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[starts], minlength=node_count), out=offsets[1:])
+        merged = None
+        if relation.weight:
+            merged = np.fmin.reduceat(weights, starts) if len(starts) else np.zeros(0)
+        return Adjacency(relation.start_label, relation.end_label, offsets,
+                         targets[starts].astype(np.int32), counts, merged)
+
+    def save(self, directory):
+        """写入临时目录后整体替换：已内存映射旧快照的读者不受影响，旧关系遗留的数组一并清除"""
+        replace_directory(self._write, directory)
+
+    def _write(self, directory):
+        for label, keys in self.nodes.items():
+            np.save(os.path.join(directory, f"nodes_{label}.npy"), keys)
+        meta = {"created": self.created, "nodes": list(self.nodes), "relations": {}}
+        for name, adjacency in self.relations.items():
+            for part in ("offsets", "targets", "counts", "weights"):
+                values = getattr(adjacency, part)
+                if values is not None:
+                    np.save(os.path.join(directory, f"{name}_{part}.npy"), values)
+            meta["relations"][name] = {
+                "start_label": adjacency.start_label,
+                "end_label": adjacency.end_label,
+                "weighted": adjacency.weights is not None,
+                "edges": adjacency.edge_count,
+            }
+        with open(os.path.join(directory, self.META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        with open(os.path.join(directory, cls.META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def load_array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        nodes = {label: load_array(f"nodes_{label}") for label in meta["nodes"]}
+        relations = {
+            name: Adjacency(info["start_label"], info["end_label"],
+                            load_array(f"{name}_offsets"), load_array(f"{name}_targets"),
+                            load_array(f"{name}_counts"),
+                            load_array(f"{name}_weights") if info["weighted"] else None)
+            for name, info in meta["relations"].items()
+        }
+        return cls(nodes, relations, meta["created"])
+
+
+def export_snapshot(backend, directory, relations: Dict[str, Relation] = SNAPSHOT_RELATIONS) -> GraphSnapshot:
+    """从存储后端流式读取并保存快照，返回内存映射加载的快照"""
+    GraphSnapshot.build(backend.node_keys, backend.edge_pairs, relations).save(directory)
+    return GraphSnapshot.load(directory)
@@ -0,0 +1,456 @@
+# src/sources.py
+import queue
+import threading
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+
+# 属性值：row 中的参数名，或由整行计算属性值的函数
+Value = Union[str, Callable[[Dict[str, Any]], Any]]
+
+
+def _value(value: Value, row: Dict[str, Any]):
+    return value(row) if callable(value) else row[value]
+
+
+def _to_float(row_value):
+    """对应 Cypher 的 toFloat，空值保持为空"""
+    return None if row_value is None else float(row_value)
+
+
+def _local_datetime(row_value):
+    """对应 Cypher 的 localdatetime(replace(..., ' ', 'T'))，解析 CSV 中的 "2024-04-20 00:00:00" """
+    if row_value is None or isinstance(row_value, datetime):
+        return row_value
+    return datetime.fromisoformat(row_value)
+
+
+@dataclass(frozen=True)
+class NodeMerge:
+    """MERGE (n:<label> {<key>: row.<参数>}) SET n.<属性> = ..."""
+    label: str
+    key: Tuple[str, str]  # (合并键属性名, 参数名)
+    properties: Dict[str, Value] = field(default_factory=dict)
+
+    def key_value(self, row: Dict[str, Any]):
+        return row[self.key[1]]
+
+    def property_values(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {prop: _value(value, row) for prop, value in self.properties.items()}
+
+
+@dataclass(frozen=True)
+class RelMerge:
+    """
+    MERGE (start)-[r:<type> {<key>...}]->(end) SET r.<属性> = ...
+
+    start/end 为 (标签, 合并键属性名, 参数名)。merge_nodes 为 True 时端点不存在就创建
+    （航线的 MERGE），否则跳过该行（MATCH）。exclusive_end 为 True 时终点只保留一条
+    此类型的关系，换了起点的旧关系先删除（船舶只属于一家公司）。
+    """
+    type: str
+    start: Tuple[str, str, str]
+    end: Tuple[str, str, str]
+    key: Dict[str, Value] = field(default_factory=dict)  # MERGE 模式中的关系属性
+    properties: Dict[str, Value] = field(default_factory=dict)
+    merge_nodes: bool = False
+    exclusive_end: bool = False
+
+    def key_values(self, row: Dict[str, Any]) -> Tuple:
+        return tuple(_value(value, row) for value in self.key.values())
+
+    def property_values(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        values = {prop: _value(value, row) for prop, value in self.key.items()}
+        values.update((prop, _value(value, row)) for prop, value in self.properties.items())
+        return values
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """一个CSV数据源：CSV列名到查询参数的映射，以及按批写入的Cypher语句"""
+    name: str
+    columns: Dict[str, str]  # CSV列名 -> row.<参数名>
+    dtypes: Dict[str, str]  # CSV列名 -> 显式dtype，避免逐块推断类型
+    query: str  # 以 UNWIND $rows AS row 开头，整批在一个事务内执行
+    key: Tuple[str, ...]  # 标识一行对应实体的参数名，用于增量同步
+    delete_query: str  # 按 key 删除实体，$rows 中每行只含 key 字段
+    # 并发写入时按该字段分区：同一港口的关系只由一个分区写入，减少锁争用；
+    # 另一端点（如同一艘船）仍可能被多个分区同时加锁，偶发的死锁由 execute_write 有限时间内重试
+    partition_key: Optional[str] = None
+    # query 的结构化描述，供不执行Cypher的后端（src.memory_backend）按相同语义写入；
+    # 第一项为 NodeMerge 时 delete_query 删除节点，否则删除关系
+    writes: Tuple[Union[NodeMerge, RelMerge], ...] = ()
+
+    def _check_columns(self, columns) -> None:
+        missing = [col for col in self.columns if col not in columns]
+        if missing:
+            raise ValueError(f"{self.name} 缺少列: {missing}")
+
+    def to_rows(self, df) -> List[Dict[str, Any]]:
+        """把DataFrame转换为可直接作为 $rows 参数的字典列表"""
+        self._check_columns(df.columns)
+        return df[list(self.columns)].rename(columns=self.columns).to_dict("records")
+
+    def iter_batches(self, file_path, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        流式读取CSV，每次只解析 batch_size 行并转换为 $rows 批次
+
+        整个文件从不完整加载到内存，第一批在解析完成之前就可以写入数据库。
+        """
+        if batch_size <= 0:
+            raise ValueError(f"批大小必须为正数: {batch_size}")
+        header = pd.read_csv(file_path, nrows=0, encoding="utf-8-sig").columns
+        self._check_columns(header)
+        reader = pd.read_csv(
+            file_path,
+            usecols=list(self.columns),
+            dtype=self.dtypes,
+            chunksize=batch_size,
+            encoding="utf-8-sig",
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk.rename(columns=self.columns).to_dict("records")
+
+    def row_key(self, row: Dict[str, Any]) -> Tuple:
+        return tuple(row[name] for name in self.key)
+
+
+def iter_chunks(rows: List[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """按固定大小切分行列表"""
+    if size <= 0:
+        raise ValueError(f"批大小必须为正数: {size}")
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def prefetch(batches: Iterable, depth: int = 2) -> Iterator:
+    """
+    在后台线程中预读批次，使CSV解析与数据库写入重叠
+
+    队列长度限制为 depth，内存占用最多为 depth+1 个批次。
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for batch in batches:
+                if stop.is_set():
+                    return
+                buffer.put(batch)
+        except BaseException as exc:  # 把解析错误交给消费者线程抛出
+            buffer.put(exc)
+        finally:
+            buffer.put(done)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # 消费者提前退出时清空队列，让生产者线程能够结束
+        while worker.is_alive():
+            try:
+                buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+COMPANIES = SourceSpec(
+    name="航运公司",
+    columns={
+        "公司注册码": "code",
+        "公司名称": "name",
+        "总部所在地": "headquarters",
+    },
+    dtypes={
+        "公司注册码": "str",
+        "公司名称": "str",
+        "总部所在地": "str",
+    },
+    query="""
+    UNWIND $rows AS row
+    MERGE (c:Company {code: row.code})
+    SET c.name = row.name, c.headquarters = row.headquarters
+    """,
+    key=("code",),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (c:Company {code: row.code})
+    DETACH DELETE c
+    """,
+    writes=(
+        NodeMerge("Company", ("code", "code"), {"name": "name", "headquarters": "headquarters"}),
+    ),
+)
+
+SHIPS = SourceSpec(
+    name="船舶",
+    columns={
+        "IMO编号": "imo",
+        "船舶名称": "name",
+        "船舶类型": "type",
+        "设计航速(节)": "speed",
+        "主机功率(kW)": "power",
+        "总吨位": "gross_tonnage",
+        "载重吨位(DWT)": "dwt",
+        "所属公司ID": "company_id",
+    },
+    dtypes={
+        "IMO编号": "int64",
+        "船舶名称": "str",
+        "船舶类型": "str",
+        "设计航速(节)": "float64",
+        "主机功率(kW)": "int64",
+        "总吨位": "int64",
+        "载重吨位(DWT)": "int64",
+        "所属公司ID": "str",
+    },
+    query="""
+    UNWIND $rows AS row
+    MERGE (s:Ship {imo: row.imo})
+    SET s.name = row.name, s.type = row.type,
+        s.speed = row.speed, s.power = row.power,
+        s.gross_tonnage = row.gross_tonnage,
+        s.dwt = row.dwt
+    WITH s, row
+    OPTIONAL MATCH (s)<-[old:OWNS]-(other:Company)
+    WHERE other.code <> row.company_id
+    DELETE old
+    WITH DISTINCT s, row
+    MATCH (c:Company {code: row.company_id})
+    MERGE (c)-[:OWNS]->(s)
+    """,
+    key=("imo",),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (s:Ship {imo: row.imo})
+    DETACH DELETE s
+    """,
+    writes=(
+        NodeMerge("Ship", ("imo", "imo"), {
+            "name": "name", "type": "type", "speed": "speed", "power": "power",
+            "gross_tonnage": "gross_tonnage", "dwt": "dwt",
+        }),
+        RelMerge("OWNS", ("Company", "code", "company_id"), ("Ship", "imo", "imo"), exclusive_end=True),
+    ),
+)
+
+PORTS = SourceSpec(
+    name="港口",
+    columns={
+        "五位码": "code",
+        "港口名称": "name",
+        "拥挤程度(1-10)": "congestion",
+        "最大靠泊能力(DWT)": "max_dwt",
+    },
+    dtypes={
+        "五位码": "str",
+        "港口名称": "str",
+        "拥挤程度(1-10)": "int64",
+        "最大靠泊能力(DWT)": "int64",
+    },
+    query="""
+    UNWIND $rows AS row
+    MERGE (p:Port {code: row.code})
+    SET p.name = row.name, p.congestion = row.congestion,
+        p.max_dwt = row.max_dwt
+    """,
+    key=("code",),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (p:Port {code: row.code})
+    DETACH DELETE p
+    """,
+    writes=(
+        NodeMerge("Port", ("code", "code"), {"name": "name", "congestion": "congestion", "max_dwt": "max_dwt"}),
+    ),
+)
+
+ROUTES = SourceSpec(
+    name="航线",
+    columns={
+        "起始港口五位码": "from_code",
+        "目的港口五位码": "to_code",
+        "航线名称": "route_name",
+        "航线距离(海里)": "distance",
+        "航线天气影响评分(1-10)": "weather_score",
+        "评分": "rating",
+    },
+    dtypes={
+        "起始港口五位码": "str",
+        "目的港口五位码": "str",
+        "航线名称": "str",
+        "航线距离(海里)": "int64",
+        "航线天气影响评分(1-10)": "int64",
+        "评分": "float64",
+    },
+    query="""
+    UNWIND $rows AS row
+    MERGE (from:Port {code: row.from_code})
+    MERGE (to:Port {code: row.to_code})
+    MERGE (from)-[r:ROUTE {name: row.route_name}]->(to)
+    SET r.distance = row.distance,
+        r.weather_score = row.weather_score,
+        r.rating = toFloat(row.rating)
+    """,
+    key=("from_code", "to_code", "route_name"),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (:Port {code: row.from_code})-[r:ROUTE {name: row.route_name}]->(:Port {code: row.to_code})
+    DELETE r
+    """,
+    writes=(
+        RelMerge("ROUTE", ("Port", "code", "from_code"), ("Port", "code", "to_code"),
+                 key={"name": "route_name"},
+                 properties={"distance": "distance", "weather_score": "weather_score",
+                             "rating": lambda row: _to_float(row["rating"])},
+                 merge_nodes=True),
+    ),
+)
+
+CARGO = SourceSpec(
+    name="货物",
+    columns={
+        "货物编号": "id",
+        "货物名称": "name",
+        "货物类型": "type",
+        "重量(吨)": "weight",
+    },
+    dtypes={
+        "货物编号": "str",
+        "货物名称": "str",
+        "货物类型": "str",
+        "重量(吨)": "int64",
+    },
+    query="""
+    UNWIND $rows AS row
+    MERGE (c:Cargo {id: row.id})
+    SET c.name = row.name, c.type = row.type, c.weight = row.weight
+    """,
+    key=("id",),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (c:Cargo {id: row.id})
+    DETACH DELETE c
+    """,
+    writes=(
+        NodeMerge("Cargo", ("id", "id"), {"name": "name", "type": "type", "weight": "weight"}),
+    ),
+)
+
+SHIP_PORT_ADAPTATION = SourceSpec(
+    name="船舶港口适配",
+    columns={
+        "船舶编号": "imo",
+        "港口五位码": "port_code",
+        "船舶载重吨(DWT)": "ship_dwt",
+        "港口最大靠泊能力(DWT)": "port_max_dwt",
+        "是否可停靠": "can_dock",
+    },
+    dtypes={
+        "船舶编号": "int64",
+        "港口五位码": "str",
+        "船舶载重吨(DWT)": "int64",
+        "港口最大靠泊能力(DWT)": "int64",
+        "是否可停靠": "str",
+    },
+    query="""
+    UNWIND $rows AS row
+    MATCH (s:Ship {imo: row.imo})
+    MATCH (p:Port {code: row.port_code})
+    MERGE (s)-[r:CAN_DOCK]-(p)
+    SET r.ship_dwt = row.ship_dwt, r.port_max_dwt = row.port_max_dwt,
+        r.can_dock = row.can_dock = '是'
+    """,
+    key=("imo", "port_code"),
+    delete_query="""
+    UNWIND $rows AS row
+    MATCH (:Ship {imo: row.imo})-[r:CAN_DOCK]-(:Port {code: row.port_code})
+    DELETE r
+    """,
+    partition_key="port_code",
+    writes=(
+        RelMerge("CAN_DOCK", ("Ship", "imo", "imo"), ("Port", "code", "port_code"),
+                 properties={"ship_dwt": "ship_dwt", "port_max_dwt": "port_max_dwt",
+                             "can_dock": lambda row: row["can_dock"] == "是"}),
+    ),
+)
+
+SHIP_PORT_VISITS = SourceSpec(
+    name="船舶挂靠",
+    columns={
+        "船舶编号": "imo",
+        "港口五位码": "port_code",
+        "到达时间": "arrival",
+        "离开时间": "departure",
+        "停靠时长(小时)": "duration",
+    },
+    dtypes={
+        "船舶编号": "int64",
+        "港口五位码": "str",
+        "到达时间": "str",
+        "离开时间": "str",
+        "停靠时长(小时)": "int64",
+    },
+    # 到达/离开时间存为原生 LocalDateTime，VISITED 上的范围索引见 schema.REL_LOOKUP_INDEXES
+    query="""
+    UNWIND $rows AS row
+    MATCH (s:Ship {imo: row.imo})
+    MATCH (p:Port {code: row.port_code})
+    WITH s, p, row,
+         localdatetime(replace(row.arrival, ' ', 'T')) AS arrival,
+         localdatetime(replace(row.departure, ' ', 'T')) AS departure
+    MERGE (s)-[r:VISITED {arrival: arrival, departure: departure}]-(p)
+    SET r.duration = row.duration
+    """,
+    key=("imo", "port_code", "arrival", "departure"),
+    delete_query="""
+    UNWIND $rows AS row
+    WITH row,
+         localdatetime(replace(row.arrival, ' ', 'T')) AS arrival,
+         localdatetime(replace(row.departure, ' ', 'T')) AS departure
+    MATCH (:Ship {imo: row.imo})-[r:VISITED {arrival: arrival, departure: departure}]-(:Port {code: row.port_code})
+    DELETE r
+    """,
+    partition_key="port_code",
+    writes=(
+        RelMerge("VISITED", ("Ship", "imo", "imo"), ("Port", "code", "port_code"),
+                 key={"arrival": lambda row: _local_datetime(row["arrival"]),
+                      "departure": lambda row: _local_datetime(row["departure"])},
+                 properties={"duration": "duration"}),
+    ),
+)
+
+# 数据源名 -> 定义，以及导入顺序上的依赖（关系两端的节点必须先存在）
+SOURCES = {
+    "companies": COMPANIES,
+    "ports": PORTS,
+    "cargo": CARGO,
+    "ships": SHIPS,
+    "routes": ROUTES,
+    "adaptation": SHIP_PORT_ADAPTATION,
+    "visits": SHIP_PORT_VISITS,
+}
+
+DEPENDENCIES = {
+    "companies": (),
+    "ports": (),
+    "cargo": (),
+    "ships": ("companies",),
+    "routes": ("ports",),
+    "adaptation": ("ships", "ports"),
+    "visits": ("ships", "ports"),
+}
@@ -0,0 +1,220 @@
+# src/staging.py
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .sources import SourceSpec
+
+try:  # pyarrow 可选：有则存为可内存映射的 feather 文件，否则退回 pickle
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
+
+# 暂存文件格式变化时递增，使旧文件自动失效
+_FORMAT_VERSION = 2
+
+
+def file_digest(file_path, chunk_size=1 << 20) -> str:
+    """源文件内容的哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _spec_digest(spec: SourceSpec) -> str:
+    """列映射或 dtype 变化时暂存文件也要重建"""
+    signature = json.dumps([_FORMAT_VERSION, spec.columns, spec.dtypes], ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(signature.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class StagingCache:
+    """
+    解析后的数据源的列式暂存区
+
+    每个CSV只用 pd.read_csv 解析一次（显式 dtype、列名已换成查询参数名），
+    结果按 源文件内容哈希 + 数据源定义 存成一个类型化的列式文件。之后的导入、
+    同步、航线网络和可停靠索引都直接内存映射该文件，不再重新解析CSV。
+
+    解析按 chunk_size 行分块进行，每块解析完就追加到暂存文件，
+    暂存时的内存占用与流式读取CSV相同，与文件大小无关。
+    """
+
+    def __init__(self, directory=".staging", chunk_size=100000):
+        if chunk_size <= 0:
+            raise ValueError(f"分块大小必须为正数: {chunk_size}")
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.use_arrow = feather is not None
+        self._digests: Dict[Tuple[str, int, int], str] = {}  # (路径, mtime, 大小) -> 内容哈希
+        self._lock = threading.Lock()
+
+    def _file_digest(self, file_path) -> str:
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = file_digest(file_path)
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def path_for(self, spec: SourceSpec, file_path) -> str:
+        ext = "feather" if self.use_arrow else "pkl"
+        name = f"{spec.name}-{_spec_digest(spec)}-{self._file_digest(file_path)}.{ext}"
+        return os.path.join(self.directory, name)
+
+    def _parse(self, spec: SourceSpec, file_path) -> Iterator[pd.DataFrame]:
+        """按 chunk_size 行分块解析CSV；只有表头的文件也会产出一个空块"""
+        header = pd.read_csv(file_path, nrows=0, encoding="utf-8-sig").columns
+        spec._check_columns(header)
+        reader = pd.read_csv(file_path, usecols=list(spec.columns), dtype=spec.dtypes,
+                             chunksize=self.chunk_size, encoding="utf-8-sig")
+        with reader:
+            for chunk in reader:
+                yield chunk[list(spec.columns)].rename(columns=spec.columns)
+
+    @staticmethod
+    def _write_arrow(chunks: Iterator[pd.DataFrame], path) -> int:
+        # 每块作为 Arrow IPC 文件（即不压缩的 feather）中的一组记录批次追加写入
+        writer, schema, rows = None, None, 0
+        try:
+            for chunk in chunks:
+                # 后续块按第一块的 schema 转换，整个文件类型一致
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(path, schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    @staticmethod
+    def _write_pickle(chunks: Iterator[pd.DataFrame], path) -> int:
+        # 每块单独 pickle 到同一个文件中，读取时逐块加载
+        rows = 0
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+                rows += len(chunk)
+        return rows
+
+    @staticmethod
+    def _read_pickle(path) -> Iterator[pd.DataFrame]:
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def stage(self, spec: SourceSpec, file_path) -> str:
+        """确保暂存文件存在并返回其路径；已暂存过时不再解析CSV"""
+        path = self.path_for(spec, file_path)
+        if os.path.exists(path):
+            return path
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write = self._write_arrow if self.use_arrow else self._write_pickle
+        try:
+            # 不压缩，读取时才能直接内存映射
+            rows = write(self._parse(spec, file_path), tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)  # 原子替换，并发的暂存不会读到半个文件
+        print(f"{spec.name}: 已暂存 {rows} 行 -> {path}")
+        return path
+
+    def _table(self, path):
+        return feather.read_table(path, memory_map=True)
+
+    def frame(self, spec: SourceSpec, file_path) -> pd.DataFrame:
+        """整个数据源的 DataFrame，列名为查询参数名"""
+        path = self.stage(spec, file_path)
+        if self.use_arrow:
+            return self._table(path).to_pandas()
+        return pd.concat(self._read_pickle(path), ignore_index=True)
+
+    def iter_batches(self, spec: SourceSpec, file_path, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """与 SourceSpec.iter_batches 产生相同的 $rows 批次，但读取的是暂存文件"""
+        if batch_size <= 0:
+            raise ValueError(f"批大小必须为正数: {batch_size}")
+        path = self.stage(spec, file_path)
+        if self.use_arrow:
+            # 每次只把一个切片转换为 pandas，内存映射的其余部分不会被读入
+            table = self._table(path)
+            for offset in range(0, table.num_rows, batch_size):
+                yield table.slice(offset, batch_size).to_pandas().to_dict("records")
+            return
+        # 逐块加载，跨块凑满 batch_size 行，批次划分与直接读CSV相同
+        pending: List[Dict[str, Any]] = []
+        for chunk in self._read_pickle(path):
+            pending.extend(chunk.to_dict("records"))
+            while len(pending) >= batch_size:
+                yield pending[:batch_size]
+                pending = pending[batch_size:]
+        if pending:
+            yield pending
+
+    def clear(self) -> int:
+        """删除暂存目录中的全部文件，返回删除的文件数"""
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith((".feather", ".pkl")):
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+        return removed
+
+
+def replace_directory(write: Callable[[str], None], directory):
+    """
+    先在同级的临时目录中写出全部文件，再用 os.replace 把它整体换成 directory
+
+    已经内存映射旧文件的读者不受影响（旧文件在映射关闭前一直有效），
+    也不会读到写了一半的目录；上一版本遗留的多余文件随旧目录一起删除。
+
+    参数:
+    write: 函数 write(tmp_dir)，把全部文件写入 tmp_dir
+    directory: 目标目录
+    """
+    directory = os.path.abspath(directory)
+    parent, name = os.path.split(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{name}.", suffix=".tmp", dir=parent)
+    try:
+        write(tmp_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    old_dir = None
+    if os.path.exists(directory):
+        old_dir = f"{tmp_dir[:-len('.tmp')]}.old"
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_batches(spec: SourceSpec, file_path, batch_size: int,
+                 staging: Optional[StagingCache] = None) -> Iterator[List[Dict[str, Any]]]:
+    """有暂存区时读取暂存文件，否则直接流式解析CSV"""
+    if staging is None:
+        return spec.iter_batches(file_path, batch_size)
+    return staging.iter_batches(spec, file_path, batch_size)
@@ -0,0 +1,167 @@
+# src/sync.py
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .sources import SOURCES, NodeMerge, RelMerge, SourceSpec, iter_chunks
+from .staging import StagingCache, read_batches
+
+
+def row_digest(row: Dict[str, Any]) -> str:
+    """行内容指纹：按列顺序序列化后取短哈希"""
+    payload = json.dumps(list(row.values()), ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def encode_key(key) -> str:
+    return json.dumps(list(key), ensure_ascii=False, default=str)
+
+
+def decode_key(text: str) -> List[Any]:
+    return json.loads(text)
+
+
+class IncrementalSync:
+    """
+    增量同步：记录每个数据源上次导入时每一行的指纹
+
+    再次同步时只写入新增或内容变化的行，并删除源文件中已消失的实体，
+    不再需要 clear_database() + 全量重导。状态保存在一个JSON文件中，
+    只有在数据源全部写入成功后才更新。一次性的数据迁移完成后也记在状态里，
+    之后的同步不再重复执行。
+
+    节点数据源删除的节点会连带删除其上的关系（DETACH DELETE），新增的节点上还没有关系，
+    而关系数据源中引用它们的行内容没有变化。节点数据源有增删时，依赖它的数据源
+    （specs 中以该标签为端点的关系）里引用这些节点的行被标记为失效，下次同步时重新写入；
+    端点参数不在行键中时（如船舶行中的所属公司），整个依赖数据源都要重新写入。
+
+    参数:
+    state_file: 状态文件路径
+    specs: 参与失效传播的全部数据源，默认为 sources.SOURCES
+    """
+
+    MIGRATIONS = "__migrations__"  # 状态中记录已完成迁移的条目，不会与数据源名冲突
+    INVALIDATED = ""  # 失效行的指纹，与任何真实指纹都不相等
+
+    def __init__(self, state_file, specs: Iterable[SourceSpec] = SOURCES.values()):
+        self.state_file = state_file
+        self.specs = list(specs)
+        self._lock = threading.Lock()
+        if os.path.exists(state_file):
+            with open(state_file, encoding="utf-8") as f:
+                self.state: Dict[str, Dict[str, Any]] = json.load(f)
+        else:
+            self.state = {}
+
+    def save(self):
+        with self._lock:
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False)
+            os.replace(tmp_file, self.state_file)  # 原子替换，中断时不会留下半个状态文件
+
+    def migrated(self, name: str) -> bool:
+        with self._lock:
+            return name in self.state.get(self.MIGRATIONS, {})
+
+    def mark_migrated(self, name: str):
+        """记录一次性迁移已完成，之后 migrated(name) 为 True"""
+        with self._lock:
+            self.state.setdefault(self.MIGRATIONS, {})[name] = time.time()
+        self.save()
+
+    def sync(self, spec: SourceSpec, file_path, write: Callable[[str, List[Dict[str, Any]]], None],
+             batch_size: int = 1000, staging: Optional[StagingCache] = None) -> Dict[str, int]:
+        """
+        同步一个数据源
+
+        参数:
+        spec: 数据源定义
+        file_path: 当前版本的CSV文件
+        write: 写入函数 write(query, rows)，rows 最多 batch_size 行
+        batch_size: 每批写入的行数
+        staging: 可选的暂存区（src.staging.StagingCache），有则不重新解析CSV
+
+        返回:
+        {"unchanged": 未变化行数, "upserted": 写入行数, "deleted": 删除行数}
+        """
+        start = time.perf_counter()
+        previous = self.state.get(spec.name, {})
+        current: Dict[str, str] = {}
+        pending: List[Dict[str, Any]] = []
+        written = set()
+        upserted = unchanged = 0
+
+        for batch in read_batches(spec, file_path, batch_size, staging):
+            # 同一合并键出现多次时只保留最后一行，与全量导入中 MERGE/SET 后写覆盖的结果一致
+            latest: Dict[str, Dict[str, Any]] = {}
+            for row in batch:
+                latest[encode_key(spec.row_key(row))] = row
+            for key, row in latest.items():
+                digest = row_digest(row)
+                repeated = key in current
+                current[key] = digest
+                # 重复键跨批出现且前一批已写入时，后面的行也要写入，保证最后一行生效
+                if previous.get(key) != digest or key in written:
+                    pending.append(row)
+                    written.add(key)
+                elif not repeated:
+                    unchanged += 1
+            if len(pending) >= batch_size:
+                write(spec.query, pending)
+                upserted += len(pending)
+                pending = []
+        if pending:
+            write(spec.query, pending)
+            upserted += len(pending)
+
+        vanished = [dict(zip(spec.key, decode_key(key))) for key in previous if key not in current]
+        for chunk in iter_chunks(vanished, batch_size):
+            write(spec.delete_query, chunk)
+
+        added = [decode_key(key) for key in current if key not in previous]
+        with self._lock:
+            self.state[spec.name] = current
+            self._invalidate_dependents(spec, [list(row.values()) for row in vanished] + added)
+        self.save()
+
+        stats = {
+            "unchanged": unchanged,
+            "upserted": upserted,
+            "deleted": len(vanished),
+        }
+        print(f"{spec.name} 增量同步: 未变化 {unchanged} 行，写入 {upserted} 行，"
+              f"删除 {len(vanished)} 行，耗时 {time.perf_counter() - start:.2f} 秒")
+        return stats
+
+    def _invalidate_dependents(self, spec: SourceSpec, changed_keys: List[List[Any]]) -> None:
+        """把引用了 spec 中新增或删除节点的依赖行标记为失效（调用方持有锁）"""
+        if not changed_keys or not spec.writes or not isinstance(spec.writes[0], NodeMerge):
+            return
+        node = spec.writes[0]
+        position = spec.key.index(node.key[1])
+        changed: Set[Any] = {key[position] for key in changed_keys}
+        for dependent in self.specs:
+            entries = self.state.get(dependent.name)
+            if dependent.name == spec.name or not entries:
+                continue
+            params = [endpoint[2] for merge in dependent.writes if isinstance(merge, RelMerge)
+                      for endpoint in (merge.start, merge.end) if endpoint[0] == node.label]
+            if not params:
+                continue
+            if not all(param in dependent.key for param in params):
+                invalidated = len(entries)
+                self.state[dependent.name] = dict.fromkeys(entries, self.INVALIDATED)
+            else:
+                positions = [dependent.key.index(param) for param in params]
+                invalidated = 0
+                for key in entries:
+                    values = decode_key(key)
+                    if any(values[i] in changed for i in positions):
+                        entries[key] = self.INVALIDATED
+                        invalidated += 1
+            if invalidated:
+                print(f"{spec.name} 的节点有增删，{dependent.name} 中 {invalidated} 行将重新写入")
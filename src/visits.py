@@ -0,0 +1,206 @@
+# src/visits.py
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .sources import SHIP_PORT_VISITS
+from .staging import read_batches
+
+Time = Any  # datetime、"2024-04-20 00:00:00" 字符串、numpy.datetime64 或 neo4j 的时间类型
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _native(value):
+    return value.to_native() if hasattr(value, "to_native") else value  # neo4j.time.DateTime
+
+
+def to_seconds(value: Time) -> int:
+    """把各种时间表示转换为自 1970-01-01 起的秒数（本地时间，不含时区）"""
+    return int(pd.Timestamp(_native(value)).to_datetime64().astype("datetime64[s]").astype(np.int64))
+
+
+def to_seconds_array(values: Iterable[Time]) -> np.ndarray:
+    """to_seconds 的向量化版本，整列一次解析"""
+    values = [_native(v) for v in values]
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    return pd.to_datetime(values).to_numpy().astype("datetime64[s]").astype(np.int64)
+
+
+def from_seconds(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=int(seconds))
+
+
+def _groups(keys: np.ndarray, count: int):
+    """对已排序的整数键数组返回每个键的 [start, end) 区间"""
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=count), out=offsets[1:])
+    return offsets
+
+
+class VisitTimeline:
+    """
+    进程内的挂靠时间索引
+
+    所有挂靠按 (港口, 到达时间) 和 (船舶, 到达时间) 各排序一次，每个港口/船舶是
+    数组中连续的一段（CSR 布局）。时间窗口查询在该段内二分查找：
+    与窗口相交的挂靠必须在窗口结束前到达、且到达时间不早于 窗口开始 - 该港口最长停靠时长，
+    因此只需检查 O(log n + k) 条记录。港口的在港船舶数由到达/离开事件的扫描线预先算出，
+    任一时刻的在港数和窗口内峰值都是二分查找。
+    """
+
+    def __init__(self, imos: Iterable, port_codes: Iterable, arrivals: Iterable[Time], departures: Iterable[Time]):
+        imos = np.asarray(list(imos), dtype=object)
+        port_codes = np.asarray(list(port_codes), dtype=object)
+        arrival = to_seconds_array(arrivals)
+        departure = to_seconds_array(departures)
+
+        self.port_codes, port_index = np.unique(port_codes.astype(str), return_inverse=True)
+        self.ship_ids, ship_index = np.unique(imos, return_inverse=True)
+        self._port_index = {code: i for i, code in enumerate(self.port_codes.tolist())}
+        self._ship_index = {imo: i for i, imo in enumerate(self.ship_ids.tolist())}
+
+        # 按港口分段、段内按到达时间排序
+        order = np.lexsort((arrival, port_index))
+        self.port_offsets = _groups(port_index[order], len(self.port_codes))
+        self.port_arrival = arrival[order]
+        self.port_departure = departure[order]
+        self.port_ship = ship_index[order]
+        duration = self.port_departure - self.port_arrival
+        # 每个港口都至少有一条挂靠，各段非空
+        self.port_max_dwell = (np.maximum.reduceat(duration, self.port_offsets[:-1])
+                               if len(duration) else np.zeros(0, dtype=np.int64))
+        # 到达时间排序下的停靠时长前缀和，窗口内的总时长/平均时长为 O(log n)
+        self.port_duration_cumsum = np.concatenate(([0], np.cumsum(duration)))
+
+        # 按船舶分段的行程
+        order = np.lexsort((arrival, ship_index))
+        self.ship_offsets = _groups(ship_index[order], len(self.ship_ids))
+        self.ship_arrival = arrival[order]
+        self.ship_departure = departure[order]
+        self.ship_port = port_index[order]
+
+        # 每个港口的扫描线：事件时间排序，同一时刻先离开后到达；running 为事件后的在港数
+        self._sweeps: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.port_arrival)
+
+    @classmethod
+    def from_csv(cls, file_path, batch_size=100000, staging=None):
+        rows = [row for batch in read_batches(SHIP_PORT_VISITS, file_path, batch_size, staging) for row in batch]
+        return cls.from_records(rows)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]):
+        """由 queries.VISITS_QUERY 的查询结果或挂靠CSV的行构建"""
+        records = list(records)
+        return cls((r["imo"] for r in records), (r["port_code"] for r in records),
+                   (r["arrival"] for r in records), (r["departure"] for r in records))
+
+    def _port(self, port_code) -> int:
+        if port_code not in self._port_index:
+            raise KeyError(f"没有该港口的挂靠记录: {port_code}")
+        return self._port_index[port_code]
+
+    def _ship(self, imo) -> int:
+        if imo not in self._ship_index:
+            raise KeyError(f"没有该船舶的挂靠记录: {imo}")
+        return self._ship_index[imo]
+
+    def _overlapping(self, port: int, start: int, end: int) -> np.ndarray:
+        """港口 port 上与 [start, end) 相交的挂靠在 port_* 数组中的下标"""
+        a, b = self.port_offsets[port], self.port_offsets[port + 1]
+        arrival = self.port_arrival[a:b]
+        lo = np.searchsorted(arrival, start - self.port_max_dwell[port], side="left")
+        hi = np.searchsorted(arrival, end, side="left")
+        candidates = np.arange(a + lo, a + hi)
+        return candidates[self.port_departure[candidates] > start]
+
+    def port_occupancy(self, port_code, start: Time, end: Time) -> List[Dict[str, Any]]:
+        """在 [start, end) 期间在港的全部挂靠（含窗口前到达、窗口内仍未离开的），按到达时间排序"""
+        index = self._overlapping(self._port(port_code), to_seconds(start), to_seconds(end))
+        return [{"imo": self.ship_ids[self.port_ship[i]],
+                 "arrival": from_seconds(self.port_arrival[i]),
+                 "departure": from_seconds(self.port_departure[i]),
+                 "duration": float(self.port_departure[i] - self.port_arrival[i]) / 3600}
+                for i in index.tolist()]
+
+    def ships_in_port(self, port_code, at: Time) -> List:
+        """某一时刻在港的船舶"""
+        t = to_seconds(at)
+        index = self._overlapping(self._port(port_code), t, t + 1)
+        return [self.ship_ids[i] for i in self.port_ship[index].tolist()]
+
+    def ship_itinerary(self, imo, start: Optional[Time] = None, end: Optional[Time] = None) -> List[Dict[str, Any]]:
+        """船舶在 [start, end) 内到达的挂靠，按到达时间排序；不给出边界时返回全部"""
+        ship = self._ship(imo)
+        a, b = self.ship_offsets[ship], self.ship_offsets[ship + 1]
+        arrival = self.ship_arrival[a:b]
+        lo = 0 if start is None else np.searchsorted(arrival, to_seconds(start), side="left")
+        hi = len(arrival) if end is None else np.searchsorted(arrival, to_seconds(end), side="left")
+        return [{"port_code": str(self.port_codes[self.ship_port[i]]),
+                 "arrival": from_seconds(self.ship_arrival[i]),
+                 "departure": from_seconds(self.ship_departure[i]),
+                 "duration": float(self.ship_departure[i] - self.ship_arrival[i]) / 3600}
+                for i in range(a + lo, a + hi)]
+
+    def dwell_time(self, port_code, start: Time, end: Time) -> Dict[str, float]:
+        """
+        在 [start, end) 内到达该港口的挂靠的停靠时长统计（小时）
+
+        次数、总时长和平均时长来自前缀和，与窗口内的记录数无关。
+        """
+        port = self._port(port_code)
+        a, b = self.port_offsets[port], self.port_offsets[port + 1]
+        arrival = self.port_arrival[a:b]
+        lo = a + np.searchsorted(arrival, to_seconds(start), side="left")
+        hi = a + np.searchsorted(arrival, to_seconds(end), side="left")
+        visits = int(hi - lo)
+        total = (self.port_duration_cumsum[hi] - self.port_duration_cumsum[lo]) / 3600
+        longest = (self.port_departure[lo:hi] - self.port_arrival[lo:hi]).max() / 3600 if visits else 0.0
+        return {
+            "visits": visits,
+            "total_hours": float(total),
+            "mean_hours": float(total / visits) if visits else 0.0,
+            "max_hours": float(longest),
+        }
+
+    def _sweep(self, port: int) -> Tuple[np.ndarray, np.ndarray]:
+        sweep = self._sweeps.get(port)
+        if sweep is None:
+            a, b = self.port_offsets[port], self.port_offsets[port + 1]
+            times = np.concatenate((self.port_arrival[a:b], self.port_departure[a:b]))
+            deltas = np.concatenate((np.ones(b - a, dtype=np.int64), -np.ones(b - a, dtype=np.int64)))
+            order = np.lexsort((deltas, times))  # 同一时刻 -1 排在 +1 前面
+            sweep = self._sweeps[port] = (times[order], np.cumsum(deltas[order]))
+        return sweep
+
+    def concurrency(self, port_code, at: Time) -> int:
+        """某一时刻的在港船舶数，O(log n)"""
+        times, running = self._sweep(self._port(port_code))
+        i = np.searchsorted(times, to_seconds(at), side="right")
+        return int(running[i - 1]) if i else 0
+
+    def peak_concurrency(self, port_code, start: Optional[Time] = None,
+                         end: Optional[Time] = None) -> Tuple[int, Optional[datetime]]:
+        """窗口内同时在港船舶数的峰值及其首次出现的时刻"""
+        times, running = self._sweep(self._port(port_code))
+        lo = 0 if start is None else np.searchsorted(times, to_seconds(start), side="right")
+        hi = len(times) if end is None else np.searchsorted(times, to_seconds(end), side="left")
+        # 窗口开始时刻已在港的船舶数
+        peak = int(running[lo - 1]) if lo else 0
+        peak_at = None if start is None else from_seconds(to_seconds(start))
+        if hi > lo:
+            i = lo + int(np.argmax(running[lo:hi]))
+            if running[i] > peak:
+                peak, peak_at = int(running[i]), from_seconds(times[i])
+        return peak, peak_at
+
+    def peak_concurrency_all(self) -> Dict[str, int]:
+        """每个港口全时段的在港船舶数峰值"""
+        return {code: int(self._sweep(i)[1].max()) for i, code in enumerate(self.port_codes.tolist())}
@@ -0,0 +1,37 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DATA_DIR = os.path.join(ROOT, "data")
+RELATIONSHIPS_DIR = os.path.join(DATA_DIR, "relationships")
+
+# 与 main.py 中 import_all 示例相同的数据文件
+DATA_FILES = {
+    "companies": os.path.join(DATA_DIR, "航运公司数据.CSV"),
+    "ships": os.path.join(DATA_DIR, "船舶信息.CSV"),
+    "ports": os.path.join(DATA_DIR, "全球港口信息.CSV"),
+    "routes": os.path.join(DATA_DIR, "全球航线数据_rated.CSV"),
+    "cargo": os.path.join(DATA_DIR, "全球货物数据.CSV"),
+    "visits": os.path.join(RELATIONSHIPS_DIR, "船舶港口挂靠记录.CSV"),
+}
+
+
+@pytest.fixture
+def data_files():
+    return dict(DATA_FILES)
+
+
+@pytest.fixture
+def memory_kg():
+    from main import ShippingKnowledgeGraph
+    from src.memory_backend import MemoryGraph
+
+    kg = ShippingKnowledgeGraph(None, None, None, backend=MemoryGraph())
+    yield kg
+    kg.close()
@@ -0,0 +1,35 @@
+# tests/test_admin_export.py
+import csv
+import os
+
+from src.admin_export import export_admin_import, validate_admin_import
+from tests.conftest import DATA_FILES, RELATIONSHIPS_DIR
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_bundled_data_passes_validation(tmp_path):
+    files = dict(DATA_FILES, adaptation=os.path.join(RELATIONSHIPS_DIR, "船舶港口适配表.CSV"))
+    report = export_admin_import(files, tmp_path)
+
+    assert validate_admin_import(tmp_path) == []
+    assert report["nodes"]["ports.csv"]["duplicates"] > 0
+
+
+def test_duplicate_keys_keep_last_row(tmp_path, memory_kg):
+    files = {name: DATA_FILES[name] for name in ("companies", "ships", "ports")}
+    export_admin_import(files, tmp_path)
+    memory_kg.import_all(files)
+    backend = memory_kg.backend
+
+    # 与 MERGE/SET 导入的结果一致：CNSHA 在港口文件中出现两次，保留后一行
+    ports = {row["code:ID(Port)"]: row for row in read_rows(tmp_path / "ports.csv")}
+    assert ports["CNSHA"]["name"] == backend.node("Port", "CNSHA")["name"]
+    ships = {int(row["imo:long"]): row["name"] for row in read_rows(tmp_path / "ships.csv")}
+    assert ships == {imo: backend.node("Ship", imo)["name"] for imo in ships}
+    for row in read_rows(tmp_path / "owns.csv"):
+        owners = backend.neighbours("Ship", int(row[":END_ID(Ship)"]), "OWNS", reverse=True)
+        assert [code for code, _ in owners] == [row[":START_ID(Company)"]]
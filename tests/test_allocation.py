@@ -0,0 +1,92 @@
+# tests/test_allocation.py
+import pytest
+
+from src.allocation import NO_CAPACITY, NO_LANE, NO_SHIP_TYPE, TOO_HEAVY, CargoAllocator
+from src.planner import RoutePlanner
+from src.routing import RouteGraph
+
+
+def edge(from_code, to_code, distance=10):
+    return {"from_code": from_code, "to_code": to_code, "route_name": f"{from_code}-{to_code}",
+            "distance": distance, "weather_score": 1, "rating": None}
+
+
+@pytest.fixture
+def planner():
+    # A -> B -> C，B 的靠泊能力只有 80，C 没有回到 A 的航线
+    graph = RouteGraph([edge("A", "B"), edge("B", "C")])
+    ports = [{"code": "A", "congestion": 1, "max_dwt": 200},
+             {"code": "B", "congestion": 1, "max_dwt": 80},
+             {"code": "C", "congestion": 1, "max_dwt": 200}]
+    return RoutePlanner(graph, ports, [])
+
+
+def bulk_carrier(imo, dwt):
+    return {"imo": imo, "type": "散货船", "dwt": dwt}
+
+
+def assigned(allocation):
+    return dict(zip(allocation.assignments["cargo_id"], allocation.assignments["imo"]))
+
+
+def reasons(allocation):
+    return dict(zip(allocation.unassigned["cargo_id"], allocation.unassigned["reason"]))
+
+
+def test_best_fit_picks_tightest_ship():
+    allocator = CargoAllocator([bulk_carrier("big", 100), bulk_carrier("small", 60)])
+    allocation = allocator.allocate([{"id": 1, "type": "固体散货", "weight": 50},
+                                     {"id": 2, "type": "固体散货", "weight": 40},
+                                     {"id": 3, "type": "固体散货", "weight": 5}])
+    # 50 装入剩余最少的 small，40 只能装 big，5 装入剩余 10 的 small
+    assert assigned(allocation) == {1: "small", 2: "big", 3: "small"}
+    ships = allocation.ships.set_index("imo")
+    assert ships.loc["small", "load"] == 55
+    assert ships.loc["big", "utilization"] == pytest.approx(0.4)
+
+
+def test_reason_codes():
+    allocator = CargoAllocator([bulk_carrier("only", 100)])
+    allocation = allocator.allocate([{"id": 1, "type": "固体散货", "weight": 90},
+                                     {"id": 2, "type": "固体散货", "weight": 20},
+                                     {"id": 3, "type": "固体散货", "weight": 150},
+                                     {"id": 4, "type": "未知货物", "weight": 1}])
+    assert assigned(allocation) == {1: "only"}
+    assert reasons(allocation) == {2: NO_CAPACITY, 3: TOO_HEAVY, 4: NO_SHIP_TYPE}
+    assert allocation.summary()["unassigned_reasons"] == {NO_CAPACITY: 1, TOO_HEAVY: 1, NO_SHIP_TYPE: 1}
+
+
+def test_lane_limits(planner):
+    allocator = CargoAllocator([bulk_carrier("big", 150), bulk_carrier("small", 70)], planner=planner)
+    allocation = allocator.allocate([
+        {"id": 1, "type": "固体散货", "weight": 60, "origin": "A", "destination": "C"},  # 途经 B，上限 80
+        {"id": 2, "type": "固体散货", "weight": 60, "origin": "A", "destination": "C"},
+        {"id": 3, "type": "固体散货", "weight": 100, "origin": "A", "destination": "C"},
+        {"id": 4, "type": "固体散货", "weight": 10, "origin": "C", "destination": "A"},
+        {"id": 5, "type": "固体散货", "weight": 100, "origin": None, "destination": None},
+    ])
+    assert assigned(allocation) == {1: "small", 5: "big"}
+    assert reasons(allocation) == {2: NO_CAPACITY, 3: TOO_HEAVY, 4: NO_LANE}
+
+
+def test_empty_manifest():
+    allocation = CargoAllocator([bulk_carrier("only", 100)]).allocate([])
+    assert allocation.summary()["assigned"] == allocation.summary()["unassigned"] == 0
+    assert allocation.rows() == allocation.unassigned_rows() == []
+
+
+def test_reallocation_removes_stale_carries(memory_kg, data_files):
+    memory_kg.import_all(data_files)
+    first = memory_kg.allocate_cargo()
+    assert memory_kg.backend.relationship_count("CARRIES") == len(first.assignments) > 0
+
+    cargo = memory_kg.backend.cargo_manifest()
+    heavy = [dict(row, weight=row["weight"] * 1e6) for row in cargo]
+    second = memory_kg.allocate_cargo(heavy)
+    assert len(second.assignments) == 0
+    assert memory_kg.backend.relationship_count("CARRIES") == 0
+
+
+def test_allocate_cargo_without_cargo_nodes(memory_kg):
+    allocation = memory_kg.allocate_cargo()
+    assert len(allocation.assignments) == len(allocation.unassigned) == 0
@@ -0,0 +1,171 @@
+# tests/test_analytics.py
+import numpy as np
+import pytest
+
+from src.analytics import (betweenness, company_ports, fleet_overlap, pagerank, port_centrality,
+                           strongly_connected_components, weakly_connected_components)
+from src.snapshot import SNAPSHOT_RELATIONS, GraphSnapshot
+
+PORTS_HEADER = "五位码,港口名称,拥挤程度(1-10),最大靠泊能力(DWT)\n"
+ROUTES_HEADER = "航线编号,航线名称,起始港口五位码,目的港口五位码,航线距离(海里),航线天气影响评分(1-10),评分\n"
+COMPANIES_HEADER = "公司注册码,公司名称,总部所在地\n"
+SHIPS_HEADER = "IMO编号,船舶名称,船舶类型,设计航速(节),主机功率(kW),总吨位,载重吨位(DWT),所属公司ID\n"
+VISITS_HEADER = "船舶编号,港口五位码,到达时间,离开时间,停靠时长(小时)\n"
+
+
+def write_csv(path, header, lines):
+    path.write_text(header + "".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def snapshot(memory_kg, tmp_path):
+    """
+    两个弱连通分量的航线网络：AAAAA -> BBBBB -> CCCCC -> AAAAA 构成环（AAAAA -> BBBBB 有两条航线），
+    DDDDD -> EEEEE 单独一段；CO_1 的船舶挂靠 AAAAA×2、BBBBB×2，CO_2 挂靠 BBBBB、CCCCC，CO_3 挂靠 AAAAA、BBBBB
+    """
+    files = {
+        "ports": write_csv(tmp_path / "ports.csv", PORTS_HEADER,
+                           [f"{code},{code}港,1,100000" for code in ("AAAAA", "BBBBB", "CCCCC", "DDDDD", "EEEEE")]),
+        "routes": write_csv(tmp_path / "routes.csv", ROUTES_HEADER,
+                            ["R1,甲-乙,AAAAA,BBBBB,10,1,1.0", "R2,甲-乙绕行,AAAAA,BBBBB,15,1,1.0",
+                             "R3,乙-丙,BBBBB,CCCCC,20,1,1.0", "R4,丙-甲,CCCCC,AAAAA,30,1,1.0",
+                             "R5,丁-戊,DDDDD,EEEEE,40,1,1.0"]),
+        "companies": write_csv(tmp_path / "companies.csv", COMPANIES_HEADER,
+                               ["CO_1,甲公司,上海", "CO_2,乙公司,深圳", "CO_3,丙公司,宁波"]),
+        "ships": write_csv(tmp_path / "ships.csv", SHIPS_HEADER,
+                           ["1000001,S1,集装箱船,20,1000,1000,50000,CO_1",
+                            "1000002,S2,集装箱船,20,1000,1000,50000,CO_1",
+                            "1000003,S3,集装箱船,20,1000,1000,50000,CO_2",
+                            "1000004,S4,集装箱船,20,1000,1000,50000,CO_3"]),
+        "visits": write_csv(tmp_path / "visits.csv", VISITS_HEADER,
+                            ["1000001,AAAAA,2024-01-01 00:00:00,2024-01-01 10:00:00,10",
+                             "1000001,AAAAA,2024-02-01 00:00:00,2024-02-01 10:00:00,10",
+                             "1000001,BBBBB,2024-03-01 00:00:00,2024-03-01 10:00:00,10",
+                             "1000002,BBBBB,2024-01-05 00:00:00,2024-01-05 10:00:00,10",
+                             "1000003,BBBBB,2024-01-01 00:00:00,2024-01-01 10:00:00,10",
+                             "1000003,CCCCC,2024-02-01 00:00:00,2024-02-01 10:00:00,10",
+                             "1000004,AAAAA,2024-01-01 00:00:00,2024-01-01 10:00:00,10",
+                             "1000004,BBBBB,2024-02-01 00:00:00,2024-02-01 10:00:00,10"]),
+    }
+    memory_kg.import_all(files)
+    return memory_kg.export_snapshot(str(tmp_path / "snapshot"))
+
+
+def ports(snapshot, values):
+    index = snapshot.index("Port")
+    return {code: values[index[code]] for code in index}
+
+
+def test_csr_merges_duplicate_edges(snapshot):
+    routes = snapshot["routes"]
+    index = snapshot.index("Port")
+    a, b = index["AAAAA"], index["BBBBB"]
+    assert routes.edge_count == 4
+    assert routes.neighbours(a).tolist() == [b]
+    edge = routes.offsets[a]
+    assert routes.counts[edge] == 2
+    assert routes.weights[edge] == 10  # 重复边取最小距离
+    assert routes.degree().sum() == routes.edge_count
+    assert routes.sources().tolist() == np.repeat(np.arange(5), np.diff(routes.offsets)).tolist()
+
+
+def test_build_skips_edges_with_unknown_endpoints():
+    relations = {"routes": SNAPSHOT_RELATIONS["routes"]}
+    snapshot = GraphSnapshot.build(lambda label, key: ["AAAAA", "BBBBB"],
+                                   lambda relation: [("AAAAA", "BBBBB", 5.0), ("AAAAA", "ZZZZZ", 1.0)],
+                                   relations)
+    assert snapshot["routes"].offsets.tolist() == [0, 1, 1]
+    assert snapshot["routes"].targets.tolist() == [1]
+
+
+def test_save_load_round_trip(snapshot, tmp_path):
+    snapshot.save(tmp_path / "copy")
+    loaded = GraphSnapshot.load(tmp_path / "copy")
+
+    assert loaded.created == snapshot.created
+    assert set(loaded.nodes) == set(snapshot.nodes)
+    for label, keys in snapshot.nodes.items():
+        assert loaded.nodes[label].tolist() == keys.tolist()
+    assert isinstance(loaded["routes"].offsets, np.memmap)
+    for name, adjacency in snapshot.relations.items():
+        for part in ("offsets", "targets", "counts"):
+            np.testing.assert_array_equal(getattr(loaded[name], part), getattr(adjacency, part))
+    np.testing.assert_array_equal(loaded["routes"].weights, snapshot["routes"].weights)
+    assert loaded["visits"].weights is None
+
+    # 覆盖保存时旧关系的数组一并清除
+    GraphSnapshot(snapshot.nodes, {"routes": snapshot["routes"]}).save(tmp_path / "copy")
+    assert list(GraphSnapshot.load(tmp_path / "copy").relations) == ["routes"]
+    assert not (tmp_path / "copy" / "visits_offsets.npy").exists()
+
+
+def test_connected_components(snapshot):
+    weak = ports(snapshot, weakly_connected_components(snapshot["routes"]))
+    assert weak == {"AAAAA": 0, "BBBBB": 0, "CCCCC": 0, "DDDDD": 1, "EEEEE": 1}
+
+    strong = ports(snapshot, strongly_connected_components(snapshot["routes"]))
+    assert strong["AAAAA"] == strong["BBBBB"] == strong["CCCCC"] == 0
+    assert sorted([strong["DDDDD"], strong["EEEEE"]]) == [1, 2]
+
+
+def test_pagerank(snapshot):
+    rank = pagerank(snapshot["routes"])
+    assert rank.sum() == pytest.approx(1.0)
+    by_port = ports(snapshot, rank)
+    # 环上三个港口对称；EEEEE 没有出边，得分均分给所有港口
+    assert by_port["AAAAA"] == pytest.approx(by_port["BBBBB"])
+    assert by_port["BBBBB"] == pytest.approx(by_port["CCCCC"])
+    assert by_port["AAAAA"] > by_port["EEEEE"] > by_port["DDDDD"]
+    # DDDDD 只有随机跳转和悬挂节点的得分：(1 - d) / n + d * rank(EEEEE) / n
+    assert by_port["DDDDD"] == pytest.approx(0.15 / 5 + 0.85 * by_port["EEEEE"] / 5)
+
+
+def test_betweenness(snapshot):
+    # 环上每个港口只在前一个港口到后一个港口的最短路径上，归一化分母为 (5 - 1) × (5 - 2)
+    exact = ports(snapshot, betweenness(snapshot["routes"]))
+    assert exact == pytest.approx({"AAAAA": 1 / 12, "BBBBB": 1 / 12, "CCCCC": 1 / 12,
+                                   "DDDDD": 0.0, "EEEEE": 0.0})
+    np.testing.assert_allclose(betweenness(snapshot["routes"], samples=5), betweenness(snapshot["routes"]))
+
+    # 抽样时只有被抽中的源点贡献依赖，按 n / samples 放大：源点 X 只为环上的下一个港口贡献 1
+    index = snapshot.index("Port")
+    successor = {index["AAAAA"]: index["BBBBB"], index["BBBBB"]: index["CCCCC"], index["CCCCC"]: index["AAAAA"]}
+    for seed in range(5):
+        sampled = betweenness(snapshot["routes"], samples=2, seed=seed)
+        expected = np.zeros(5)
+        for source in np.random.default_rng(seed).choice(5, size=2, replace=False).tolist():
+            if source in successor:
+                expected[successor[source]] += 5 / 2 / 12
+        np.testing.assert_allclose(sampled, expected)
+
+
+def test_port_centrality(snapshot):
+    table = port_centrality(snapshot, samples=None)
+    assert table["pagerank"].is_monotonic_decreasing
+    row = table.set_index("code").loc["BBBBB"]
+    assert (row["out_degree"], row["in_degree"]) == (1, 1)
+    assert table.set_index("code").loc["EEEEE", "out_degree"] == 0
+
+
+def test_company_ports(snapshot):
+    matrix = company_ports(snapshot)
+    companies, port_index = snapshot.index("Company"), snapshot.index("Port")
+    visits = {(company, port): matrix[i, j] for company, i in companies.items()
+              for port, j in port_index.items() if matrix[i, j]}
+    assert visits == {("CO_1", "AAAAA"): 2, ("CO_1", "BBBBB"): 2, ("CO_2", "BBBBB"): 1,
+                      ("CO_2", "CCCCC"): 1, ("CO_3", "AAAAA"): 1, ("CO_3", "BBBBB"): 1}
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 1024])
+def test_fleet_overlap(snapshot, block_size):
+    overlap = fleet_overlap(snapshot, block_size=block_size)
+    pairs = {frozenset((row.company_a, row.company_b)): (row.shared_ports, row.jaccard)
+             for row in overlap.itertuples()}
+    assert pairs == {
+        frozenset(("CO_1", "CO_3")): (2, 1.0),
+        frozenset(("CO_1", "CO_2")): (1, pytest.approx(1 / 3)),
+        frozenset(("CO_2", "CO_3")): (1, pytest.approx(1 / 3)),
+    }
+    assert overlap["jaccard"].iloc[0] == 1.0
+    assert len(fleet_overlap(snapshot, top=1, block_size=block_size)) == 1
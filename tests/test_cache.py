@@ -0,0 +1,32 @@
+# tests/test_cache.py
+import asyncio
+
+from src.cache import QueryCache
+
+QUERY = "MATCH (p:Port) RETURN p.code AS code"
+
+
+def test_load_racing_with_invalidate_is_not_cached():
+    cache = QueryCache()
+
+    def load():
+        cache.invalidate()  # 加载期间发生写入
+        return [{"code": "CNSHA"}]
+
+    assert cache.get_or_load(QUERY, None, load) == [{"code": "CNSHA"}]
+    assert cache.get(QUERY) == (False, None)
+    assert cache.stats()["stale_loads"] == 1
+
+    assert cache.get_or_load(QUERY, None, lambda: [{"code": "USNYC"}]) == [{"code": "USNYC"}]
+    assert cache.get(QUERY) == (True, [{"code": "USNYC"}])
+
+
+def test_async_load_racing_with_invalidate_is_not_cached():
+    cache = QueryCache()
+
+    async def load():
+        cache.invalidate()
+        return [{"code": "CNSHA"}]
+
+    assert asyncio.run(cache.get_or_load_async(QUERY, None, load)) == [{"code": "CNSHA"}]
+    assert cache.get(QUERY) == (False, None)
@@ -0,0 +1,113 @@
+# tests/test_memory_graph.py
+import pandas as pd
+import pytest
+
+from src.backend import GraphBackend
+
+PORTS_HEADER = "五位码,港口名称,拥挤程度(1-10),最大靠泊能力(DWT)\n"
+ROUTES_HEADER = "航线编号,航线名称,起始港口五位码,目的港口五位码,航线距离(海里),航线天气影响评分(1-10),评分\n"
+
+
+def write_csv(path, header, lines):
+    path.write_text(header + "".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def small_network(tmp_path):
+    ports = write_csv(tmp_path / "ports.csv", PORTS_HEADER,
+                      ["AAAAA,甲港,1,100000", "BBBBB,乙港,2,200000", "CCCCC,丙港,3,300000"])
+    routes = write_csv(tmp_path / "routes.csv", ROUTES_HEADER,
+                       ["R1,甲-乙,AAAAA,BBBBB,10,1,1.0", "R2,乙-丙,BBBBB,CCCCC,10,1,1.0",
+                        "R3,甲-丙,AAAAA,CCCCC,30,1,1.0"])
+    return {"ports": ports, "routes": routes}
+
+
+def test_graph_backend_is_abstract():
+    with pytest.raises(TypeError):
+        GraphBackend()
+
+
+def test_import_all_bundled_data(memory_kg, data_files):
+    memory_kg.import_all(data_files)
+    stats = memory_kg.backend.stats()
+
+    ports = pd.read_csv(data_files["ports"], encoding="utf-8-sig")
+    ships = pd.read_csv(data_files["ships"], encoding="utf-8-sig")
+    assert stats["Port"] == ports["五位码"].nunique()
+    assert stats["Ship"] == ships["IMO编号"].nunique()
+    assert 0 < stats["OWNS"] <= stats["Ship"]
+    assert stats["ROUTE"] == memory_kg.backend.relationship_count("ROUTE") > 0
+    assert stats["VISITED"] > 0
+
+
+def test_routing_reloads_after_route_import(memory_kg, small_network, tmp_path):
+    memory_kg.import_all(small_network)
+    route = memory_kg.find_optimal_route("AAAAA", "CCCCC", weight="distance")
+    assert route["ports"] == ["AAAAA", "BBBBB", "CCCCC"]
+    assert route["total_distance"] == 20
+
+    shortcut = write_csv(tmp_path / "shortcut.csv", ROUTES_HEADER, ["R3,甲-丙,AAAAA,CCCCC,5,1,1.0"])
+    memory_kg.import_routes(shortcut)
+    route = memory_kg.find_optimal_route("AAAAA", "CCCCC", weight="distance")
+    assert route["ports"] == ["AAAAA", "CCCCC"]
+    assert route["total_distance"] == 5
+
+
+def test_sync_upserts_changes_and_detaches_deleted_nodes(memory_kg, small_network, tmp_path):
+    state_file = tmp_path / "sync_state.json"
+    memory_kg.sync_all(small_network, state_file)
+    assert memory_kg.backend.relationship_count("ROUTE") == 3
+
+    write_csv(tmp_path / "ports.csv", PORTS_HEADER, ["AAAAA,甲港,1,100000", "BBBBB,乙港,5,200000"])
+    results = memory_kg.sync_all({"ports": small_network["ports"]}, state_file)
+
+    assert results["ports"] == {"unchanged": 1, "upserted": 1, "deleted": 1}
+    assert memory_kg.backend.node("Port", "BBBBB")["congestion"] == 5
+    assert memory_kg.backend.node("Port", "CCCCC") is None
+    # 删除港口时一并删除它的航线
+    assert memory_kg.backend.relationship_count("ROUTE") == 1
+    assert memory_kg.find_optimal_route("AAAAA", "CCCCC", weight="distance") is None
+
+
+def test_clear(memory_kg, small_network):
+    memory_kg.import_all(small_network)
+    memory_kg.find_optimal_route("AAAAA", "CCCCC")
+
+    memory_kg.clear_database(rel_types=["ROUTE"])
+    assert memory_kg.backend.relationship_count("ROUTE") == 0
+    assert memory_kg.backend.stats()["Port"] == 3
+    assert memory_kg.find_optimal_route("AAAAA", "CCCCC") is None
+
+    memory_kg.clear_database()
+    assert memory_kg.backend.stats() == {}
+
+
+def test_server_side_visit_queries_match_timeline(memory_kg, data_files):
+    memory_kg.import_all({key: data_files[key] for key in ("ships", "ports", "visits")})
+    timeline = memory_kg.visit_timeline
+    port, imo = str(timeline.port_codes[0]), timeline.ship_ids[0]
+    start, end = "2000-01-01 00:00:00", "2100-01-01 00:00:00"
+
+    assert (memory_kg.port_occupancy(port, start, end, server_side=True)
+            == memory_kg.port_occupancy(port, start, end))
+    assert memory_kg.ship_itinerary(imo, server_side=True) == memory_kg.ship_itinerary(imo)
+    assert memory_kg.dwell_time(port, start, end, server_side=True) == pytest.approx(
+        memory_kg.dwell_time(port, start, end))
+
+
+def test_data_importer_writes_models_through_backend():
+    from src.import_data import DataImporter
+    from src.memory_backend import MemoryGraph
+    from src.models import Company, Ship
+
+    backend = MemoryGraph()
+    importer = DataImporter(backend)
+    importer.import_companies([Company("甲航运", 2001, "上海", "集装箱", 2)])
+    importer.import_ships([Ship("远洋一号", "散货船", 50000, 200.0, 14.0, 2010, 12.0, "甲航运"),
+                           Ship("远洋二号", "散货船", 60000, 210.0, 14.5, 2012, 12.5, "乙航运")])
+
+    assert backend.node("Ship", "远洋一号")["deadweight"] == 50000
+    assert backend.node("Ship", "远洋二号") is not None
+    # 所属公司不存在的船舶只合并节点，不建立关系
+    assert [imo for imo, _ in backend.neighbours("Company", "甲航运", "OWNS")] == ["远洋一号"]
@@ -0,0 +1,68 @@
+# tests/test_metrics.py
+from src.metrics import QueryMetrics
+from src.queries import CARRIES_QUERY, PORT_ATTRIBUTES_QUERY, PORT_OCCUPANCY_QUERY, VISITS_QUERY
+from src.snapshot import SNAPSHOT_RELATIONS, edge_query
+
+
+def test_backend_and_snapshot_queries_are_named():
+    metrics = QueryMetrics()
+    assert metrics.name(PORT_ATTRIBUTES_QUERY) == "port_attributes"
+    assert metrics.name(VISITS_QUERY) == "visits"
+    assert metrics.name(CARRIES_QUERY) == "carries.write"
+    assert metrics.name(PORT_OCCUPANCY_QUERY) == "port_occupancy"
+    assert metrics.name(edge_query(SNAPSHOT_RELATIONS["routes"])) == "snapshot.routes"
+
+
+def test_slow_query_is_profiled_once():
+    metrics = QueryMetrics(slow_threshold=0.5)
+    assert metrics.prepare(VISITS_QUERY) == VISITS_QUERY
+    metrics.record(VISITS_QUERY, 1.0)
+    assert metrics.prepare(VISITS_QUERY) == "PROFILE " + VISITS_QUERY
+
+
+class FakeResult:
+    def __init__(self, values):
+        self._values = values
+
+    def __iter__(self):
+        return iter({"key": value} for value in self._values)
+
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    def __init__(self, values):
+        self.values = values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None):
+        return FakeResult(self.values)
+
+
+class FakeDriver:
+    def __init__(self, values):
+        self.values = values
+
+    def session(self, **kwargs):
+        return FakeSession(self.values)
+
+    def close(self):
+        pass
+
+
+def test_snapshot_reads_are_recorded():
+    from main import ShippingKnowledgeGraph
+
+    metrics = QueryMetrics()
+    kg = ShippingKnowledgeGraph(None, None, None, driver=FakeDriver(["CNSHA", "SGSIN"]), metrics=metrics)
+    assert list(kg.backend.node_keys("Port", "code")) == ["CNSHA", "SGSIN"]
+
+    statements = {s["name"]: s for s in metrics.report()["statements"]}
+    assert statements["snapshot.nodes_Port"]["count"] == 1
+    assert statements["snapshot.nodes_Port"]["rows"] == 2
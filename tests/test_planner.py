@@ -0,0 +1,70 @@
+# tests/test_planner.py
+import pytest
+
+from src.planner import RoutePlanner
+from src.routing import RouteGraph
+
+
+def edge(from_code, to_code, distance, weather_score=1):
+    return {"from_code": from_code, "to_code": to_code, "route_name": f"{from_code}-{to_code}",
+            "distance": distance, "weather_score": weather_score, "rating": None}
+
+
+@pytest.fixture
+def graph():
+    # A -> B -> D 短而天气差，A -> C -> D 长而天气好，A -> D 直达最长
+    return RouteGraph([edge("A", "B", 10, 9), edge("B", "D", 10, 9),
+                       edge("A", "C", 20, 1), edge("C", "D", 20, 1),
+                       edge("A", "D", 50, 5)])
+
+
+@pytest.fixture
+def planner(graph):
+    ports = [{"code": "A", "congestion": 1, "max_dwt": 300},
+             {"code": "B", "congestion": 1, "max_dwt": 100},
+             {"code": "C", "congestion": 1, "max_dwt": 200},
+             {"code": "D", "congestion": 1, "max_dwt": 300}]
+    ships = [{"imo": "small", "dwt": 50}, {"imo": "medium", "dwt": 150}, {"imo": "large", "dwt": 250}]
+    return RoutePlanner(graph, ports, ships)
+
+
+def test_shortest_path_by_weight(graph):
+    assert graph.shortest_path("A", "D", weight="distance").ports == ["A", "B", "D"]
+    route = graph.shortest_path("A", "D", weight="weather_score")
+    assert route.ports == ["A", "C", "D"]
+    assert route.total_distance == 40
+    assert graph.shortest_path("D", "A", weight="distance") is None
+
+
+def test_k_shortest_paths_in_cost_order(graph):
+    routes = graph.k_shortest_paths("A", "D", k=3, weight="distance")
+    assert [route.ports for route in routes] == [["A", "B", "D"], ["A", "C", "D"], ["A", "D"]]
+    assert [route.cost for route in routes] == [20, 40, 50]
+
+
+def test_pareto_front_for_small_ship(planner):
+    routes = planner.plan("small", "A", "D")
+    # 直达在距离和天气上都被 A-C-D 支配，但它不经过中间港口，拥挤程度最低
+    assert [route.ports for route in routes] == [["A", "B", "D"], ["A", "C", "D"], ["A", "D"]]
+    assert [route.total_congestion for route in routes] == [3, 3, 2]
+
+
+def test_plan_skips_ports_that_cannot_berth_the_ship(planner):
+    assert [route.ports for route in planner.plan("medium", "A", "D")] == [["A", "C", "D"], ["A", "D"]]
+    assert [route.ports for route in planner.plan("large", "A", "D")] == [["A", "D"]]
+    assert planner.shortest_feasible_path("large", "A", "D", weight="distance").ports == ["A", "D"]
+    assert planner.shortest_feasible_path("large", "A", "B") is None
+
+
+def test_bottleneck_capacity(planner, graph):
+    bottleneck = planner.bottleneck_capacity("A")
+    assert bottleneck[graph.index["B"]] == 100
+    assert bottleneck[graph.index["C"]] == 200
+    assert bottleneck[graph.index["D"]] == 300  # 直达 D 不经过 B、C
+    assert planner.bottleneck_capacity("D")[graph.index["A"]] == float("-inf")
+
+
+def test_plan_fleet_shares_searches_within_a_class(planner):
+    plans = planner.plan_fleet([("small", "A", "D"), ("medium", "A", "D"), ("small", "A", "D")])
+    assert plans[0] is plans[2]
+    assert len(plans[1]) == 2
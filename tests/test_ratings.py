@@ -0,0 +1,51 @@
+# tests/test_ratings.py
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.adapt全球航线数据 import RATING_WEIGHTS, add_rating_column, calculate_rating, calculate_ratings
+from src.staging import StagingCache
+from tests.conftest import DATA_DIR, DATA_FILES
+
+
+@pytest.fixture
+def routes():
+    return pd.read_csv(DATA_FILES["routes"])
+
+
+def test_vectorized_ratings_match_scalar_on_every_row(routes):
+    distance, weather = routes["航线距离(海里)"], routes["航线天气影响评分(1-10)"]
+    ratings = calculate_ratings(distance, weather, methods=tuple(RATING_WEIGHTS))
+    for method in RATING_WEIGHTS:
+        expected = [calculate_rating(d, w, method) for d, w in zip(distance, weather)]
+        assert ratings[method].tolist() == expected, method
+
+
+def test_balanced_ratings_match_stored_column(routes):
+    ratings = calculate_ratings(routes["航线距离(海里)"], routes["航线天气影响评分(1-10)"])
+    assert ratings["balanced"].tolist() == routes["评分"].tolist()
+
+
+def test_decimal_ties_round_like_round():
+    # 420/4、1620/5、12180/7、13820/7 的 balanced 评分都落在 .x5 附近
+    distance = np.array([420, 1620, 12180, 13820])
+    weather = np.array([4, 5, 7, 7])
+    ratings = calculate_ratings(distance, weather)["balanced"].tolist()
+    assert ratings == [calculate_rating(d, w) for d, w in zip(distance.tolist(), weather.tolist())]
+
+
+def test_all_zero_distances_with_column_max():
+    ratings = calculate_ratings(pd.Series([0, 0]), pd.Series([3, 5]), max_distance=None)
+    assert ratings["balanced"].tolist() == [15.0, 25.0]
+
+
+def test_add_rating_column_streams_through_staging(tmp_path):
+    source = os.path.join(DATA_DIR, "全球航线数据.CSV")
+    direct = add_rating_column(source, str(tmp_path / "direct.csv"), batch_size=7)
+    staged = add_rating_column(source, str(tmp_path / "staged.csv"), batch_size=7,
+                               staging=StagingCache(str(tmp_path / "staging"), chunk_size=11))
+    expected = pd.read_csv(DATA_FILES["routes"], encoding="utf-8-sig")
+    for output in (direct, staged):
+        pd.testing.assert_frame_equal(pd.read_csv(output, encoding="utf-8-sig"), expected)
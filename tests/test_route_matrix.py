@@ -0,0 +1,107 @@
+# tests/test_route_matrix.py
+import math
+
+import numpy as np
+import pytest
+
+from src.route_matrix import MATRIX_METHODS, RouteMatrix, graph_fingerprint
+from src.routing import RouteGraph
+from tests.conftest import DATA_FILES
+
+
+def edge(route_name, from_code, to_code, distance, weather_score=1.0):
+    return {"route_name": route_name, "from_code": from_code, "to_code": to_code,
+            "distance": distance, "weather_score": weather_score}
+
+
+def triangle(shortcut_distance):
+    return RouteGraph([edge("R1", "AAAAA", "BBBBB", 10), edge("R2", "BBBBB", "CCCCC", 10),
+                       edge("R3", "AAAAA", "CCCCC", shortcut_distance)])
+
+
+@pytest.fixture(scope="module")
+def bundled():
+    graph = RouteGraph.from_csv(DATA_FILES["routes"])
+    return graph, RouteMatrix.build(graph)
+
+
+@pytest.mark.parametrize("method", MATRIX_METHODS)
+def test_matrix_matches_dijkstra_on_bundled_routes(bundled, method):
+    graph, matrix = bundled
+    reachable = 0
+    for from_code in graph.codes:
+        for to_code in graph.codes:
+            expected = graph.shortest_path(from_code, to_code, method)
+            route = matrix.route(from_code, to_code, method)
+            if expected is None:
+                assert route is None
+                assert matrix.cost(from_code, to_code, method) == math.inf
+                continue
+            reachable += 1
+            assert route == pytest.approx(expected.to_dict())
+            assert matrix.cost(from_code, to_code, method) == expected.cost
+    assert reachable > len(graph.codes)
+
+
+def test_unknown_port_and_method(bundled):
+    graph, matrix = bundled
+    with pytest.raises(KeyError):
+        matrix.route("ZZZZZ", graph.codes[0])
+    with pytest.raises(ValueError):
+        matrix.cost(graph.codes[0], graph.codes[0], "no-such-method")
+
+
+def test_fingerprint_tracks_route_changes():
+    assert graph_fingerprint(triangle(30)) == graph_fingerprint(triangle(30))
+    assert graph_fingerprint(triangle(30)) != graph_fingerprint(triangle(5))
+
+
+def test_load_or_build_reuses_matching_files(tmp_path, monkeypatch):
+    directory = tmp_path / "matrix"
+    built = RouteMatrix.load_or_build(triangle(30), directory, ["distance"])
+    assert isinstance(built.costs, np.memmap)
+    assert built.route("AAAAA", "CCCCC", "distance")["ports"] == ["AAAAA", "BBBBB", "CCCCC"]
+
+    def no_build(*args, **kwargs):
+        raise AssertionError("航线网络未变化时不应重新计算")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(RouteMatrix, "build", classmethod(no_build))
+        loaded = RouteMatrix.load_or_build(triangle(30), directory, ["distance"])
+    assert loaded.fingerprint == built.fingerprint
+    np.testing.assert_array_equal(loaded.costs, built.costs)
+
+
+def test_load_or_build_rebuilds_when_routes_change(tmp_path):
+    directory = tmp_path / "matrix"
+    old = RouteMatrix.load_or_build(triangle(30), directory, ["distance"])
+
+    changed = triangle(5)
+    new = RouteMatrix.load_or_build(changed, directory, ["distance"])
+    assert new.fingerprint == graph_fingerprint(changed) != old.fingerprint
+    assert new.route("AAAAA", "CCCCC", "distance")["ports"] == ["AAAAA", "CCCCC"]
+    assert RouteMatrix.load(directory).cost("AAAAA", "CCCCC", "distance") == 5
+
+
+def test_load_or_build_rebuilds_for_missing_methods(tmp_path):
+    directory = tmp_path / "matrix"
+    RouteMatrix.load_or_build(triangle(30), directory, ["distance"])
+    matrix = RouteMatrix.load_or_build(triangle(30), directory, ["distance", "rating"])
+    assert matrix.methods == ["distance", "rating"]
+    assert RouteMatrix.load(directory).methods == ["distance", "rating"]
+
+
+def test_route_import_drops_matrix(memory_kg, tmp_path):
+    header = "航线编号,航线名称,起始港口五位码,目的港口五位码,航线距离(海里),航线天气影响评分(1-10),评分\n"
+    routes = tmp_path / "routes.csv"
+    routes.write_text(header + "R1,甲-乙,AAAAA,BBBBB,10,1,1.0\nR2,乙-丙,BBBBB,CCCCC,10,1,1.0\n"
+                      "R3,甲-丙,AAAAA,CCCCC,30,1,1.0\n", encoding="utf-8")
+    memory_kg.import_routes(str(routes))
+    memory_kg.use_route_matrix(tmp_path / "matrix", ["distance"])
+    assert memory_kg.find_optimal_route("AAAAA", "CCCCC", weight="distance")["total_distance"] == 20
+
+    routes.write_text(header + "R3,甲-丙,AAAAA,CCCCC,5,1,1.0\n", encoding="utf-8")
+    memory_kg.import_routes(str(routes))
+    assert memory_kg.find_optimal_route("AAAAA", "CCCCC", weight="distance")["ports"] == ["AAAAA", "CCCCC"]
+    memory_kg.use_route_matrix(tmp_path / "matrix", ["distance"])
+    assert memory_kg.find_optimal_route("AAAAA", "CCCCC", weight="distance")["total_distance"] == 5
@@ -0,0 +1,31 @@
+# tests/test_staging.py
+import pandas as pd
+import pytest
+
+from src import sources
+from src.staging import StagingCache
+from tests.conftest import DATA_FILES
+
+
+@pytest.mark.parametrize("use_arrow", [True, False])
+def test_chunked_staging_matches_csv(tmp_path, use_arrow):
+    staging = StagingCache(str(tmp_path), chunk_size=7)
+    staging.use_arrow = use_arrow
+    for name, file_path in DATA_FILES.items():
+        spec = sources.SOURCES[name]
+        expected = pd.concat([pd.DataFrame(batch) for batch in spec.iter_batches(file_path, 10)],
+                             ignore_index=True)
+        batches = list(staging.iter_batches(spec, file_path, 10))
+        assert [len(batch) for batch in batches] == [len(batch) for batch in spec.iter_batches(file_path, 10)]
+        pd.testing.assert_frame_equal(pd.concat([pd.DataFrame(batch) for batch in batches], ignore_index=True),
+                                      expected, check_dtype=False, check_like=True)
+        pd.testing.assert_frame_equal(staging.frame(spec, file_path), expected,
+                                      check_dtype=False, check_like=True)
+
+
+def test_header_only_file_stages_empty(tmp_path):
+    file_path = tmp_path / "ports.csv"
+    file_path.write_text(",".join(sources.PORTS.columns) + "\n", encoding="utf-8")
+    staging = StagingCache(str(tmp_path / "staging"))
+    assert list(staging.iter_batches(sources.PORTS, str(file_path), 10)) == []
+    assert list(staging.frame(sources.PORTS, str(file_path)).columns) == list(sources.PORTS.columns.values())
@@ -0,0 +1,107 @@
+# tests/test_sync.py
+from src.sync import IncrementalSync
+
+
+def graph_state(backend):
+    """全部节点和关系的属性，用于比较两次同步后的图是否一致"""
+    nodes = {label: {table.keys[i]: table.properties(i) for i in table.ids().tolist()}
+             for label, table in backend.nodes.items()}
+    # 关系按两端的合并键比较，节点删除后重建时编号会变
+    rels = {rel_type: sorted(repr((backend.nodes[rels.start_label].keys[rels.start[i]],
+                                   backend.nodes[rels.end_label].keys[rels.end[i]],
+                                   rels.index_keys[i][2:], rels.properties(i)))
+                             for i, alive in enumerate(rels.alive) if alive)
+            for rel_type, rels in backend.relationships.items()}
+    return nodes, rels
+
+
+def test_second_sync_of_unchanged_files_writes_nothing(memory_kg, data_files, tmp_path):
+    state_file = tmp_path / "sync_state.json"
+    memory_kg.sync_all(data_files, state_file)
+    before = graph_state(memory_kg.backend)
+
+    results = memory_kg.sync_all(data_files, state_file)
+
+    for name, stats in results.items():
+        assert stats["upserted"] == 0, name
+        assert stats["deleted"] == 0, name
+    assert graph_state(memory_kg.backend) == before
+
+
+def test_duplicate_keys_keep_last_row_like_full_import(memory_kg, data_files, tmp_path):
+    # CNSHA 在港口文件中出现两次，全量导入时后一行覆盖前一行
+    ports = {"ports": data_files["ports"]}
+    memory_kg.sync_all(ports, tmp_path / "sync_state.json")
+    synced = memory_kg.backend.node("Port", "CNSHA")
+
+    memory_kg.clear_database()
+    memory_kg.import_all(ports)
+    assert memory_kg.backend.node("Port", "CNSHA") == synced
+
+
+def test_duplicate_key_across_batches_keeps_last_row(tmp_path):
+    from src.memory_backend import MemoryGraph
+    from src.sources import PORTS
+    from tests.conftest import DATA_FILES
+
+    backend = MemoryGraph()
+    syncer = IncrementalSync(tmp_path / "sync_state.json")
+    write = lambda query, rows: backend.write(PORTS, rows)
+    syncer.sync(PORTS, DATA_FILES["ports"], write, batch_size=10)
+    last = backend.node("Port", "CNSHA")
+
+    stats = syncer.sync(PORTS, DATA_FILES["ports"], write, batch_size=10)
+    assert backend.node("Port", "CNSHA") == last
+    assert stats["deleted"] == 0
+
+
+def test_visit_time_migration_runs_once_per_state_file(memory_kg, data_files, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(memory_kg.backend, "convert_visit_times", lambda batch_size=10000: calls.append(1) or 0)
+    visits = {key: data_files[key] for key in ("ships", "ports", "visits")}
+    state_file = tmp_path / "sync_state.json"
+    memory_kg.sync_all(visits, state_file)
+    memory_kg.sync_all(visits, state_file)
+    assert len(calls) == 1
+
+    assert IncrementalSync(state_file).migrated("visit_times")
+    memory_kg.sync_all(visits, tmp_path / "other_state.json")
+    assert len(calls) == 2
+
+
+def test_edges_return_with_a_deleted_endpoint(memory_kg, data_files, tmp_path):
+    import pandas as pd
+
+    files = {key: data_files[key] for key in ("companies", "ships", "ports", "visits")}
+    state_file = tmp_path / "sync_state.json"
+    memory_kg.sync_all(files, state_file)
+    full = graph_state(memory_kg.backend)
+    visited = memory_kg.backend.relationship_count("VISITED")
+
+    ships = pd.read_csv(files["ships"], encoding="utf-8-sig")
+    imo = int(pd.read_csv(files["visits"], encoding="utf-8-sig")["船舶编号"].iloc[0])
+    shrunk = tmp_path / "ships.csv"
+    ships[ships["IMO编号"] != imo].to_csv(shrunk, index=False, encoding="utf-8-sig")
+    memory_kg.sync_all(dict(files, ships=str(shrunk)), state_file)
+    assert memory_kg.backend.node("Ship", imo) is None
+    assert memory_kg.backend.relationship_count("VISITED") < visited
+
+    results = memory_kg.sync_all(files, state_file)
+    assert results["visits"]["upserted"] > 0
+    assert graph_state(memory_kg.backend) == full
+
+
+def test_companies_returning_restore_ownership(memory_kg, data_files, tmp_path):
+    import pandas as pd
+
+    files = {key: data_files[key] for key in ("companies", "ships")}
+    state_file = tmp_path / "sync_state.json"
+    memory_kg.sync_all(files, state_file)
+    full = graph_state(memory_kg.backend)
+
+    companies = pd.read_csv(files["companies"], encoding="utf-8-sig")
+    shrunk = tmp_path / "companies.csv"
+    companies.iloc[1:].to_csv(shrunk, index=False, encoding="utf-8-sig")
+    memory_kg.sync_all(dict(files, companies=str(shrunk)), state_file)
+    memory_kg.sync_all(files, state_file)
+    assert graph_state(memory_kg.backend) == full
@@ -0,0 +1,17 @@
+# tests/test_visits.py
+from src.visits import VisitTimeline
+from tests.conftest import DATA_FILES
+
+
+def test_durations_are_python_floats():
+    timeline = VisitTimeline.from_csv(DATA_FILES["visits"])
+    port = str(timeline.port_codes[0])
+    imo = timeline.ship_ids[0]
+
+    occupancy = timeline.port_occupancy(port, "2000-01-01 00:00:00", "2100-01-01 00:00:00")
+    itinerary = timeline.ship_itinerary(imo)
+    assert occupancy and itinerary
+    for visit in occupancy + itinerary:
+        assert type(visit["duration"]) is float
+        assert visit["duration"] == (visit["departure"] - visit["arrival"]).total_seconds() / 3600
+    assert all(type(visit["port_code"]) is str for visit in itinerary)